@@ -0,0 +1,88 @@
+"""
+Compares the memory used to hold findings with the compact `Comment` against
+the previous plain-object representation (one `__dict__`, a freshly stripped
+5-line context list and a tag list per finding).
+
+Usage:
+    python -m benchmarks.bench_comment_memory --files 2000 --tags-per-file 20
+"""
+import argparse
+import gc
+import json
+import tracemalloc
+from typing import Dict, List
+from src.analyzer import Analyzer, Comment
+from src.line_index import LineIndex
+from src.parser import PythonParser
+
+
+class LegacyComment:
+    """
+    The previous Comment representation, kept here as the baseline.
+    """
+
+    def __init__(self, file: str, line_number: int, text: str, context: List[str], tags: List[str]):
+        self.file = file
+        self.line_number = line_number
+        self.text = text
+        self.context = context
+        self.tags = tags
+
+
+def synthetic_file(index: int, tags_per_file: int, lines_between: int = 6) -> str:
+    lines = []
+    for i in range(tags_per_file):
+        lines.append(f"# @TODO: task {i} of module {index}")
+        lines.extend(f"value_{i}_{j} = compute({i}, {j})  # step" for j in range(lines_between))
+    return "\n".join(lines) + "\n"
+
+
+def build_findings(files: int, tags_per_file: int, legacy: bool) -> List:
+    analyzer = Analyzer(project_path=".", tags=["@TODO", "@FIXME"])
+    parser = PythonParser()
+    findings = []
+    for index in range(files):
+        file_path = f"/project/pkg_{index % 50}/module_{index}.py"
+        content = synthetic_file(index, tags_per_file)
+        line_index = LineIndex(content)
+        spans = parser.parse_spans(content, line_index)
+        if legacy:
+            for span in spans:
+                tags = analyzer.tag_matcher.find(span.text)
+                if tags:
+                    findings.append(LegacyComment(file_path, span.line_number, span.text,
+                                                  line_index.context(span.line_number - 1), tags))
+        else:
+            findings.extend(analyzer._extract_comments(file_path, spans, line_index))
+    return findings
+
+
+def measure(files: int, tags_per_file: int, legacy: bool) -> Dict:
+    gc.collect()
+    tracemalloc.start()
+    findings = build_findings(files, tags_per_file, legacy)
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"findings": len(findings), "retained_bytes": retained, "peak_bytes": peak,
+            "bytes_per_finding": retained / max(len(findings), 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory benchmark for Comment storage")
+    parser.add_argument("--files", type=int, default=2000, help="Number of synthetic files")
+    parser.add_argument("--tags-per-file", type=int, default=20, help="Tagged comments per file")
+    args = parser.parse_args()
+
+    legacy = measure(args.files, args.tags_per_file, legacy=True)
+    compact = measure(args.files, args.tags_per_file, legacy=False)
+    result = {
+        "legacy": legacy,
+        "compact": compact,
+        "saving": 1 - compact["retained_bytes"] / legacy["retained_bytes"],
+    }
+    print(json.dumps(result, indent=4))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+End-to-end benchmark of every stage of the pipeline on a synthetic project.
+
+Stages: walk, parse, tag match, full analysis, report write, prompt
+generation and dispatch against the in-process fake backend. Each stage
+reports its throughput (files/s, MB/s and findings/s where they apply) and
+the peak memory it allocates, measured in a separate traced run so that
+tracing does not slow down the timed one.
+
+Results are written as JSON and can be compared against a stored baseline;
+the run fails when a throughput drops by more than the tolerance.
+
+Usage:
+    python -m benchmarks.bench_pipeline --files 2000 --output bench_results.json
+    python -m benchmarks.bench_pipeline --baseline benchmarks/baseline.json
+    python -m benchmarks.bench_pipeline --save-baseline benchmarks/baseline.json
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Tuple
+from benchmarks.synthetic_repo import generate_project
+from src.analyzer import Analyzer
+from src.fake_llm import FakeBackend
+from src.line_index import LineIndex
+from src.openai_assistant import OpenAIAssistant
+from src.parser import ParserFactory
+from src.report import open_report_writer
+from src.tag_matcher import TagMatcher
+from src.walker import FileWalker
+
+TAGS = ["@TODO", "@FIXME", "@REFACTOR", "@IMPROVE", "@OPTIMIZE", "@DEPRECATE", "@REMOVE", "@BUG", "@HACK"]
+
+# Throughput metrics compared against the baseline
+THROUGHPUT_METRICS = ("files_per_s", "mb_per_s", "findings_per_s", "requests_per_s")
+
+
+def run_stage(stage: Callable[[], Dict], repeat: int) -> Dict:
+    """
+    Runs a stage `repeat` times, keeping the fastest run, then once more under tracemalloc for its peak memory.
+
+    The stage returns the amount of work it did (`files`, `bytes`, `findings`, `requests`).
+    """
+    best, work = None, {}
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        work = stage()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    gc.collect()
+    tracemalloc.start()
+    stage()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = {"seconds": round(best, 6), "peak_bytes": peak}
+    seconds = max(best, 1e-9)
+    if "files" in work:
+        result["files_per_s"] = round(work["files"] / seconds, 2)
+    if "bytes" in work:
+        result["mb_per_s"] = round(work["bytes"] / (1024 * 1024) / seconds, 3)
+    if "findings" in work:
+        result["findings_per_s"] = round(work["findings"] / seconds, 2)
+    if "requests" in work:
+        result["requests_per_s"] = round(work["requests"] / seconds, 2)
+    return result
+
+
+def benchmark(root: str, work_dir: str, repeat: int = 3, jobs: int = 1, concurrency: int = 8,
+              latency: float = 0.005) -> Dict[str, Dict]:
+    """
+    Benchmarks every stage on the project under `root`, using `work_dir` for the report.
+    """
+    walker = FileWalker(root)
+    files = [path for path in walker.walk() if os.path.splitext(path)[1] in (".py", ".js", ".java")]
+    contents: List[Tuple[str, str]] = []
+    for path in files:
+        with open(path, 'r', encoding='utf-8') as f:
+            contents.append((path, f.read()))
+    total_bytes = sum(len(content.encode('utf-8')) for _, content in contents)
+    matcher = TagMatcher(TAGS)
+
+    def walk():
+        return {"files": sum(1 for _ in FileWalker(root).walk())}
+
+    def parse():
+        for path, content in contents:
+            parser = ParserFactory.get_parser(os.path.splitext(path)[1])
+            parser.parse_spans(content, LineIndex(content))
+        return {"files": len(contents), "bytes": total_bytes}
+
+    span_texts = []
+    for path, content in contents:
+        parser = ParserFactory.get_parser(os.path.splitext(path)[1])
+        span_texts.extend(span.text for span in parser.parse_spans(content))
+
+    def tag_match():
+        return {"findings": sum(1 for text in span_texts if matcher.find(text))}
+
+    findings: List[Dict] = []
+
+    def analyze():
+        analyzer = Analyzer(project_path=root, tags=TAGS, jobs=jobs, walker=FileWalker(root))
+        findings[:] = [comment.to_dict() for comment in analyzer.iter_comments()]
+        return {"files": len(files), "bytes": total_bytes, "findings": len(findings)}
+
+    report_path = os.path.join(work_dir, "report.json")
+
+    def report_write():
+        with open_report_writer(report_path, "json") as writer:
+            for finding in findings:
+                writer.write(finding)
+        return {"findings": writer.count}
+
+    def make_assistant(backend: Optional[FakeBackend] = None) -> OpenAIAssistant:
+        assistant = OpenAIAssistant(results_path=report_path, api_key=None, concurrency=concurrency,
+                                    backend=backend, max_prompt_tokens=3000, batch_token_target=3000)
+        # Keep the synthetic project untouched: only the dispatch path is measured
+        assistant.save_response = lambda file_path, response: None
+        return assistant
+
+    def prompt_generation():
+        assistant = make_assistant()
+        assistant.prepare_requests()
+        return {"files": len(assistant.batched_prompts), "requests": len(assistant.requests)}
+
+    def dispatch():
+        assistant = make_assistant(FakeBackend(latency=latency, seed=0))
+        assistant.process_results()
+        return {"files": len(assistant.batched_prompts), "requests": len(assistant.requests)}
+
+    stages = [("walk", walk), ("parse", parse), ("tag_match", tag_match), ("analyze", analyze),
+              ("report_write", report_write), ("prompt_generation", prompt_generation), ("dispatch", dispatch)]
+    results = {}
+    for name, stage in stages:
+        results[name] = run_stage(stage, 1 if name == "dispatch" else repeat)
+        print(f"{name:>18}: {results[name]}", file=sys.stderr)
+    return results
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float) -> List[str]:
+    """
+    Returns a description of every throughput that dropped by more than `tolerance` compared to the baseline.
+    """
+    regressions = []
+    for stage, metrics in baseline.items():
+        for metric in THROUGHPUT_METRICS:
+            if metric in metrics and metric in results.get(stage, {}):
+                ratio = results[stage][metric] / metrics[metric] if metrics[metric] else 1.0
+                if ratio < 1 - tolerance:
+                    regressions.append(f"{stage} {metric}: {results[stage][metric]} vs {metrics[metric]} "
+                                       f"in the baseline ({ratio - 1:+.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end pipeline benchmark on a synthetic project")
+    parser.add_argument("--files", type=int, default=1000, help="Number of synthetic files")
+    parser.add_argument("--median-size", type=int, default=4096, help="Median file size in bytes")
+    parser.add_argument("--size-sigma", type=float, default=1.0, help="Spread of the log-normal file size")
+    parser.add_argument("--languages", type=str, default="py=5,js=3,java=2", help="Language mix by extension")
+    parser.add_argument("--tag-density", type=float, default=0.1, help="Fraction of comments carrying a tag")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed of the synthetic project")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per stage; the fastest is kept")
+    parser.add_argument("--jobs", type=int, default=1, help="Worker processes of the analysis stage")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight in the dispatch stage")
+    parser.add_argument("--latency", type=float, default=0.005, help="Latency of the fake backend in seconds")
+    parser.add_argument("--output", type=str, default="bench_results.json", help="Where to write the results")
+    parser.add_argument("--baseline", type=str, default=None, help="Baseline results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Relative throughput drop tolerated before a stage counts as a regression")
+    parser.add_argument("--save-baseline", type=str, default=None, help="Also store the results as a new baseline")
+    args = parser.parse_args()
+    # The per-request progress messages of the assistant would dominate the output
+    logging.disable(logging.INFO)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        project = os.path.join(temp_dir, "project")
+        work_dir = os.path.join(temp_dir, "work")
+        os.makedirs(work_dir)
+        config = generate_project(project, files=args.files, median_size=args.median_size,
+                                  size_sigma=args.size_sigma, languages=args.languages,
+                                  tag_density=args.tag_density, seed=args.seed)
+        stages = benchmark(project, work_dir, repeat=args.repeat, jobs=args.jobs,
+                           concurrency=args.concurrency, latency=args.latency)
+
+    results = {"config": config, "stages": stages}
+    for path in filter(None, [args.output, args.save_baseline]):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=4)
+        print(f"Results written to {path}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get("config") != config:
+            print("Warning: the baseline was recorded with a different synthetic project configuration.")
+        regressions = compare(stages, baseline["stages"], args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        if regressions:
+            exit(1)
+        print(f"No regression beyond {args.tolerance:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Measures the cold-start cost of the command-line tool, based on `python -X importtime`.
+
+Reports the import time of `src.main` with its costliest imports, the wall
+time of a complete scan-only run on a tiny project, and checks that the run
+never loads the LLM stack.
+
+Usage:
+    python -m benchmarks.bench_startup --runs 10 --budget-ms 100
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+# Modules only the LLM stage needs; a scan-only run must not import them
+LLM_MODULES = ("openai", "httpx", "dotenv", "asyncio", "src.openai_assistant", "src.response_cache",
+               "src.fake_llm")
+
+IMPORTTIME_PATTERN = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int, int]]:
+    """
+    Parses `-X importtime` output into (module, self µs, cumulative µs, depth) tuples.
+    """
+    entries = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_PATTERN.match(line)
+        if match:
+            entries.append((match.group(4), int(match.group(1)), int(match.group(2)), len(match.group(3)) // 2))
+    return entries
+
+
+def run_python(args: List[str], cwd: str) -> Tuple[float, str]:
+    start = time.perf_counter()
+    completed = subprocess.run([sys.executable, "-X", "importtime"] + args, cwd=cwd, capture_output=True,
+                               text=True, env={**os.environ, "OPENAI_API_KEY": ""})
+    elapsed = time.perf_counter() - start
+    if completed.returncode != 0:
+        raise RuntimeError(f"Command {args} failed: {completed.stdout}{completed.stderr}")
+    return elapsed, completed.stderr
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start benchmark of the command-line tool")
+    parser.add_argument("--runs", type=int, default=10, help="Number of runs; medians are reported")
+    parser.add_argument("--top", type=int, default=10, help="Number of costliest imports to list")
+    parser.add_argument("--budget-ms", type=float, default=None,
+                        help="Fail if the median scan-only run takes longer than this")
+    args = parser.parse_args()
+
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    import_times: List[int] = []
+    modules: Dict[str, int] = {}
+    for _ in range(args.runs):
+        _, stderr = run_python(["-c", "import src.main"], repo_root)
+        entries = parse_importtime(stderr)
+        import_times.append(next(cumulative for module, _, cumulative, _ in entries if module == "src.main"))
+        for module, _, cumulative, depth in entries:
+            if depth == 1:
+                modules[module] = min(modules.get(module, cumulative), cumulative)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        project = os.path.join(temp_dir, "project")
+        os.makedirs(project)
+        with open(os.path.join(project, "module.py"), 'w', encoding='utf-8') as f:
+            f.write("# @TODO: benchmark startup\nvalue = 1\n")
+        scan_times: List[float] = []
+        loaded = set()
+        for run in range(args.runs):
+            elapsed, stderr = run_python(["-m", "src.main", "--project-path", project, "--scan-only",
+                                          "--no-analysis-cache", "--output",
+                                          os.path.join(temp_dir, "output", f"report_{run}.json")], repo_root)
+            scan_times.append(elapsed)
+            loaded.update(module for module, _, _, _ in parse_importtime(stderr))
+
+    leaked = sorted(module for module in loaded if module.split(".")[0] in LLM_MODULES or module in LLM_MODULES)
+    result = {
+        "import_src_main_ms": round(statistics.median(import_times) / 1000, 2),
+        "scan_only_run_ms": round(statistics.median(scan_times) * 1000, 2),
+        "costliest_imports_ms": {module: round(cumulative / 1000, 2) for module, cumulative in
+                                 sorted(modules.items(), key=lambda item: item[1], reverse=True)[:args.top]},
+        "llm_modules_loaded_by_scan_only": leaked,
+    }
+    print(json.dumps(result, indent=4))
+
+    if leaked:
+        print(f"Error: the scan-only run imported {', '.join(leaked)}")
+        exit(1)
+    if args.budget_ms is not None and result["scan_only_run_ms"] > args.budget_ms:
+        print(f"Error: the scan-only run took {result['scan_only_run_ms']} ms, over the {args.budget_ms} ms budget")
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Generates synthetic projects to benchmark the pipeline on.
+
+The file count, file size distribution (log-normal around a median), language
+mix and tag density are configurable, and the same seed always produces the
+same project.
+
+Usage:
+    python -m benchmarks.synthetic_repo /tmp/synthetic --files 2000 --languages py=5,js=3,java=2
+"""
+import argparse
+import json
+import math
+import os
+import random
+from typing import Dict, List
+
+TAGS = ["@TODO", "@FIXME", "@REFACTOR", "@IMPROVE", "@BUG", "@HACK"]
+
+# Line comment, block comment opening/closing and a code line template for each language
+LANGUAGES = {
+    "py": ("#", '"""', '"""', "value_{i} = compute(value_{j}, {i})"),
+    "js": ("//", "/*", "*/", "const value_{i} = compute(value_{j}, {i});"),
+    "java": ("//", "/*", "*/", "int value{i} = compute(value{j}, {i});"),
+}
+
+
+def parse_language_mix(spec: str) -> Dict[str, float]:
+    """
+    Parses a language mix such as `py=5,js=3,java=2` into weights per file extension.
+    """
+    mix = {}
+    for item in spec.split(","):
+        extension, _, weight = item.partition("=")
+        if extension not in LANGUAGES:
+            raise ValueError(f"Unsupported language '{extension}'; choose from {', '.join(LANGUAGES)}")
+        mix[extension] = float(weight or 1)
+    return mix
+
+
+def synthetic_source(extension: str, size: int, tag_density: float, rng: random.Random) -> str:
+    """
+    Builds a source file of about `size` bytes with comments every few lines,
+    a `tag_density` fraction of which carry a tag.
+    """
+    line_comment, block_open, block_close, code = LANGUAGES[extension]
+    lines: List[str] = []
+    written = 0
+    i = 0
+    while written < size:
+        if i % 8 == 0:
+            tag = f"{rng.choice(TAGS)}: " if rng.random() < tag_density else ""
+            if i % 40 == 0:
+                lines.extend([block_open, f"{tag}Describe block {i}.", "More details here.", block_close])
+            else:
+                lines.append(f"{line_comment} {tag}step {i} of the computation")
+        else:
+            lines.append(code.format(i=i, j=max(i - 1, 0)))
+        written += len(lines[-1]) + 1
+        i += 1
+    return "\n".join(lines) + "\n"
+
+
+def generate_project(root: str, files: int = 1000, median_size: int = 4096, size_sigma: float = 1.0,
+                     languages: str = "py=5,js=3,java=2", tag_density: float = 0.1, files_per_dir: int = 50,
+                     seed: int = 0) -> Dict:
+    """
+    Writes a synthetic project under `root`.
+
+    Args:
+        root (str): Directory to create the project in.
+        files (int): Number of source files.
+        median_size (int): Median file size in bytes.
+        size_sigma (float): Standard deviation of the log of the file size; 0 makes every file the same size.
+        languages (str): Language mix, e.g. `py=5,js=3,java=2`.
+        tag_density (float): Fraction of comments carrying a tag.
+        files_per_dir (int): Number of files per package directory.
+        seed (int): Seed of the random generator.
+
+    Returns:
+        Dict: The settings and the number of files and bytes written.
+    """
+    rng = random.Random(seed)
+    mix = parse_language_mix(languages)
+    extensions, weights = list(mix), list(mix.values())
+    total_bytes = 0
+    for index in range(files):
+        extension = rng.choices(extensions, weights)[0]
+        size = max(64, int(median_size * math.exp(rng.gauss(0.0, size_sigma))))
+        directory = os.path.join(root, f"pkg_{index // files_per_dir:04d}")
+        os.makedirs(directory, exist_ok=True)
+        content = synthetic_source(extension, size, tag_density, rng)
+        with open(os.path.join(directory, f"module_{index:06d}.{extension}"), 'w', encoding='utf-8') as f:
+            f.write(content)
+        total_bytes += len(content)
+    return {
+        "files": files,
+        "bytes": total_bytes,
+        "median_size": median_size,
+        "size_sigma": size_sigma,
+        "languages": languages,
+        "tag_density": tag_density,
+        "seed": seed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic project to benchmark on")
+    parser.add_argument("root", type=str, help="Directory to create the project in")
+    parser.add_argument("--files", type=int, default=1000, help="Number of source files")
+    parser.add_argument("--median-size", type=int, default=4096, help="Median file size in bytes")
+    parser.add_argument("--size-sigma", type=float, default=1.0, help="Spread of the log-normal file size")
+    parser.add_argument("--languages", type=str, default="py=5,js=3,java=2", help="Language mix by extension")
+    parser.add_argument("--tag-density", type=float, default=0.1, help="Fraction of comments carrying a tag")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    args = parser.parse_args()
+
+    stats = generate_project(args.root, files=args.files, median_size=args.median_size, size_sigma=args.size_sigma,
+                             languages=args.languages, tag_density=args.tag_density, seed=args.seed)
+    print(json.dumps(stats, indent=4))
+
+
+if __name__ == "__main__":
+    main()
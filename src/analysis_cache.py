@@ -0,0 +1,127 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+from typing import List, Optional, Tuple
+from src.analyzer import Comment
+from src.parser import PARSER_VERSION
+
+logger = logging.getLogger(__name__)
+
+# (size, mtime in nanoseconds, content hash or None)
+Fingerprint = Tuple[int, int, Optional[str]]
+
+# Files modified this recently cannot be trusted to be unchanged while their size and
+# mtime are: a further change within the same mtime tick would go unnoticed.
+RACY_WINDOW_SECONDS = 2.0
+
+
+class AnalysisCache:
+    """
+    Persistent SQLite cache of the comments extracted from each file.
+
+    Entries are keyed by file path and validated against the file's size,
+    modification time and, optionally, a hash of its content. The whole cache
+    is invalidated when the tag set or the parser version changes.
+    """
+
+    SCHEMA_VERSION = 1
+
+    def __init__(self, db_path: str, tags: List[str], hash_contents: bool = False):
+        """
+        Initializes the AnalysisCache.
+
+        Args:
+            db_path (str): Path to the SQLite database file.
+            tags (List[str]): Tags searched by the Analyzer, in the order they are reported.
+            hash_contents (bool): Also compare a SHA-256 of the content, not only size and mtime.
+        """
+        self.db_path = db_path
+        self.hash_contents = hash_contents
+        self.hits = 0
+        self.misses = 0
+        self.signature = self._signature(tags)
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self.connection = sqlite3.connect(db_path)
+        self._initialize()
+
+    def _signature(self, tags: List[str]) -> str:
+        payload = json.dumps({
+            "schema": self.SCHEMA_VERSION,
+            "parser": PARSER_VERSION,
+            "tags": list(dict.fromkeys(tags)),
+        })
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _initialize(self):
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+            )
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                "path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, "
+                "content_hash TEXT, comments TEXT NOT NULL)"
+            )
+            row = self.connection.execute("SELECT value FROM meta WHERE key = 'signature'").fetchone()
+            if row is None or row[0] != self.signature:
+                if row is not None:
+                    logger.info("Tags or parser version changed; invalidating analysis cache.")
+                self.connection.execute("DELETE FROM files")
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('signature', ?)", (self.signature,)
+                )
+
+    def fingerprint(self, file_path: str) -> Optional[Fingerprint]:
+        """
+        Returns the fingerprint of the file, or None if it cannot be read.
+        """
+        try:
+            stat = os.stat(file_path)
+            content_hash = None
+            if self.hash_contents:
+                with open(file_path, 'rb') as f:
+                    content_hash = hashlib.sha256(f.read()).hexdigest()
+        except OSError:
+            return None
+        return stat.st_size, stat.st_mtime_ns, content_hash
+
+    def lookup(self, file_path: str, fingerprint: Optional[Fingerprint]) -> Optional[List[Comment]]:
+        """
+        Returns the cached comments of the file if its fingerprint is unchanged.
+        """
+        row = None
+        if fingerprint is not None:
+            row = self.connection.execute(
+                "SELECT size, mtime_ns, content_hash, comments FROM files WHERE path = ?", (file_path,)
+            ).fetchone()
+        if row is None or tuple(row[:3]) != fingerprint:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return [Comment.from_dict(data) for data in json.loads(row[3])]
+
+    def store(self, file_path: str, fingerprint: Optional[Fingerprint], comments: List[Comment]):
+        """
+        Records the comments extracted from the file under its fingerprint.
+        """
+        if fingerprint is None:
+            return
+        if time.time() - fingerprint[1] / 1e9 < RACY_WINDOW_SECONDS:
+            return
+        self.connection.execute(
+            "INSERT OR REPLACE INTO files (path, size, mtime_ns, content_hash, comments) VALUES (?, ?, ?, ?, ?)",
+            (file_path, *fingerprint, json.dumps([comment.to_dict() for comment in comments]))
+        )
+
+    def commit(self):
+        self.connection.commit()
+
+    def close(self):
+        self.connection.commit()
+        self.connection.close()
@@ -1,16 +1,47 @@
+import mmap
 import os
-import re
-from typing import List, Dict
-from src.parser import ParserFactory
+import sys
+from typing import List, Dict, Iterable, Iterator, Optional, Tuple, TYPE_CHECKING
+from src.line_index import ContextLines, LineIndex
+from src.metrics import Metrics
+from src.parser import CommentSpan, ParserFactory
+from src.tag_matcher import TagMatcher
+from src.walker import FileWalker
+
+if TYPE_CHECKING:
+    from src.analysis_cache import AnalysisCache
 
 # Data structure to hold extracted comments
 class Comment:
-    def __init__(self, file: str, line_number: int, text: str, context: List[str], tags: List[str]):
-        self.file = file
+    """
+    A tagged comment found in a file.
+
+    Kept compact for runs with millions of findings: no per-instance `__dict__`,
+    interned file paths, shared tag tuples, and context stored as a reference
+    to the file's shared `ContextLines` that is only turned into a list when
+    the comment is serialized.
+    """
+
+    __slots__ = ("file", "line_number", "text", "tags", "_context", "_context_lines")
+
+    # One shared tuple per distinct combination of tags
+    _tag_tuples: Dict[tuple, tuple] = {}
+
+    def __init__(self, file: str, line_number: int, text: str, context: Optional[List[str]], tags: List[str],
+                 context_lines: Optional[ContextLines] = None):
+        self.file = sys.intern(file)
         self.line_number = line_number
         self.text = text
-        self.context = context
-        self.tags = tags
+        self._context = context
+        self._context_lines = context_lines
+        tags = tuple(tags)
+        self.tags = self._tag_tuples.setdefault(tags, tags)
+
+    @property
+    def context(self) -> List[str]:
+        if self._context is not None:
+            return self._context
+        return self._context_lines.context(self.line_number - 1)
 
     def to_dict(self) -> Dict:
         return {
@@ -18,72 +49,284 @@ class Comment:
             "line_number": self.line_number,
             "text": self.text,
             "context": self.context,
-            "tags": self.tags
+            "tags": list(self.tags)
         }
 
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Comment":
+        return cls(
+            file=data["file"],
+            line_number=data["line_number"],
+            text=data["text"],
+            context=data["context"],
+            tags=data["tags"]
+        )
+
 class Analyzer:
-    def __init__(self, project_path: str, tags: List[str]):
+    # Upper bound on the number of files handed to a worker in one task, so
+    # that a chunk of tiny files cannot monopolise a worker for too long.
+    MAX_FILES_PER_CHUNK = 256
+
+    # Chunks submitted ahead per worker: enough to keep workers busy while
+    # results wait for the chunk at the head of the walk.
+    MAX_CHUNKS_IN_FLIGHT_PER_JOB = 2
+
+    # Files at least this large are memory-mapped for the tag prefilter instead of read
+    MMAP_THRESHOLD = 1 << 20
+
+    def __init__(self, project_path: str, tags: List[str], jobs: int = 1, cache: Optional["AnalysisCache"] = None,
+                 paths: Optional[List[str]] = None, walker: Optional[FileWalker] = None,
+                 metrics: Optional[Metrics] = None):
         self.project_path = project_path
+        # When given, only these files are analyzed instead of walking the project
+        self.paths = paths
+        self.walker = walker or FileWalker(project_path)
         self.tags = set(tags)  # Convert to set for faster lookup
+        # Keep the caller's tag order so matched tags are reported identically
+        # in every process, independent of string hash randomisation.
+        self.ordered_tags = list(dict.fromkeys(tags))
+        self.jobs = jobs if jobs > 0 else (os.cpu_count() or 1)
+        self.cache = cache
+        self.metrics = metrics or Metrics()
         self.comments: List[Comment] = []
-        self.tag_patterns = self._compile_tag_patterns()
+        self.tag_matcher = TagMatcher(self.ordered_tags)
+
+    def analyze(self):
+        self.comments.extend(self.iter_comments())
 
-    def _compile_tag_patterns(self) -> List[re.Pattern]:
+    def iter_comments(self) -> Iterator[Comment]:
         """
-        Precompile regex patterns for each tag to optimize matching.
+        Yields the comments of each file as soon as that file has been scanned, in walk order.
+
+        Nothing is accumulated, so findings can be written out while the scan is still running.
         """
-        patterns = []
-        for tag in self.tags:
-            # Escape the tag to handle any special regex characters
-            escaped_tag = re.escape(tag)
-            # Compile a pattern that matches the tag as a whole word
-            pattern = re.compile(rf'\b{escaped_tag}\b')
-            patterns.append(pattern)
-        return patterns
+        for comments in self.iter_file_comments():
+            yield from comments
 
-    def analyze(self):
-        for root, _, files in os.walk(self.project_path):
-            for file in files:
-                file_path = os.path.join(root, file)
-                _, ext = os.path.splitext(file)
-                try:
-                    parser = ParserFactory.get_parser(ext)
-                except ValueError:
-                    continue  # Skip files without a suitable parser
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                comments = parser.parse(content)
-                self._extract_comments(file_path, comments)
-
-    def _extract_comments(self, file_path: str, comments: List[str]):
-        with open(file_path, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-        for comment in comments:
-            # Use regex to detect all tags within the comment
-            matched_tags = []
-            for tag in self.tags:
-                if tag in comment:
-                    matched_tags.append(tag)
+    def iter_file_comments(self) -> Iterator[List[Comment]]:
+        """
+        Yields the list of comments of each file as soon as that file has been scanned, in walk order.
+        """
+        return self.scan_files(self._iter_source_files())
+
+    def scan_files(self, file_paths: Iterable[str]) -> Iterator[List[Comment]]:
+        """
+        Yields the list of comments of each of `file_paths`, in order; they must all have a suitable parser.
+        """
+        try:
+            if self.jobs > 1:
+                file_results = self._iter_parallel(list(file_paths))
+            else:
+                file_results = self._iter_serial(iter(file_paths))
+            for comments in file_results:
+                self.metrics.inc("findings", len(comments))
+                yield comments
+        finally:
+            if self.cache is not None:
+                self.cache.commit()
+
+    def _iter_source_files(self) -> Iterator[str]:
+        """
+        Yields the paths of all files under the project that have a suitable parser.
+        """
+        if self.paths is not None:
+            # Explicit paths, e.g. from git, honour the same ignore rules as the walk
+            candidates = (file_path for file_path in self.paths if not self.walker.is_ignored(file_path))
+        else:
+            candidates = self.metrics.timed_iter("walk", self.walker.walk())
+        for file_path in candidates:
+            _, ext = os.path.splitext(file_path)
+            try:
+                ParserFactory.get_parser(ext)
+            except ValueError:
+                continue  # Skip files without a suitable parser
+            yield file_path
+
+    def _scan_file(self, file_path: str) -> List[Comment]:
+        _, ext = os.path.splitext(file_path)
+        parser = ParserFactory.get_parser(ext)
+        self.metrics.inc("files_scanned")
+        with self.metrics.timer("read"):
+            content = self._read_if_tagged(file_path)
+        if content is None:
+            self.metrics.inc("files_skipped")
+            return []
+        with self.metrics.timer("parse"):
+            line_index = LineIndex(content)
+            # Only comments holding a tag are reported, so the others need not be lexed
+            spans = parser.parse_spans(content, line_index, self.tag_matcher.tags)
+            return self._extract_comments(file_path, spans, line_index)
+
+    def _iter_serial(self, file_paths: Iterator[str]) -> Iterator[List[Comment]]:
+        for file_path in file_paths:
+            fingerprint = None
+            if self.cache is not None:
+                # Reuse cached comments if the file's fingerprint did not change
+                fingerprint = self.cache.fingerprint(file_path)
+                cached = self.cache.lookup(file_path, fingerprint)
+                if cached is not None:
+                    self.metrics.inc("files_cached")
+                    yield cached
+                    continue
+            comments = self._scan_file(file_path)
+            if self.cache is not None:
+                self.cache.store(file_path, fingerprint, comments)
+            yield comments
 
+    def _read_if_tagged(self, file_path: str) -> Optional[str]:
+        """
+        Returns the decoded content of the file, or None if no tag occurs anywhere in its bytes.
+
+        Most files contain no tags, so they are rejected on the raw bytes before
+        any decoding or parsing. Large files are searched through a memory map
+        and only copied into a string when they do contain a tag.
+        """
+        with open(file_path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            self.metrics.inc("bytes_read", size)
+            if size >= self.MMAP_THRESHOLD:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    if not self.tag_matcher.occurs_in(mapped):
+                        return None
+                    data = mapped[:]
+            else:
+                data = f.read()
+                if not self.tag_matcher.occurs_in(data):
+                    return None
+        content = data.decode('utf-8')
+        # Same newline translation as reading in text mode
+        if '\r' in content:
+            content = content.replace('\r\n', '\n').replace('\r', '\n')
+        return content
+
+    def _iter_parallel(self, file_paths: List[str]) -> Iterator[List[Comment]]:
+        """
+        Scans files across a process pool and yields the comments of each file
+        in the same order as `file_paths`, so the output matches a serial scan.
+
+        Chunks are contiguous ranges of `file_paths`, submitted in order with
+        at most `MAX_CHUNKS_IN_FLIGHT_PER_JOB` per worker pending, so the
+        head of the walk is scanned first and results are released as the scan
+        goes instead of all at the end.
+        """
+        # Imported here: the process pool machinery is costly to load and serial scans never need it
+        from collections import deque
+        from concurrent.futures import ProcessPoolExecutor
+
+        results: Dict[int, List[Comment]] = {}
+        fingerprints: Dict[int, Optional[tuple]] = {}
+        pending = []
+        for index, file_path in enumerate(file_paths):
+            if self.cache is not None:
+                fingerprints[index] = self.cache.fingerprint(file_path)
+                cached = self.cache.lookup(file_path, fingerprints[index])
+                if cached is not None:
+                    self.metrics.inc("files_cached")
+                    results[index] = cached
+                    continue
+            pending.append(index)
+
+        next_index = 0
+        if pending:
+            with ProcessPoolExecutor(
+                max_workers=self.jobs,
+                initializer=_init_worker,
+                initargs=(self.project_path, self.ordered_tags),
+            ) as executor:
+                pending_paths = [file_paths[index] for index in pending]
+                chunks = iter(self._balanced_chunks(pending_paths))
+                in_flight = deque()
+
+                def submit_next():
+                    chunk = next(chunks, None)
+                    if chunk is not None:
+                        future = executor.submit(_scan_chunk, [pending_paths[i] for i in chunk])
+                        in_flight.append((future, [pending[i] for i in chunk]))
+
+                for _ in range(self.jobs * self.MAX_CHUNKS_IN_FLIGHT_PER_JOB):
+                    submit_next()
+                while in_flight:
+                    future, indices = in_flight.popleft()
+                    chunk_results, worker_metrics = future.result()
+                    submit_next()
+                    self.metrics.merge(worker_metrics)
+                    for index, comments in zip(indices, chunk_results):
+                        results[index] = comments
+                        if self.cache is not None:
+                            self.cache.store(file_paths[index], fingerprints[index], comments)
+                    # Release every file whose predecessors are all done
+                    while next_index in results:
+                        yield results.pop(next_index)
+                        next_index += 1
+        while next_index in results:
+            yield results.pop(next_index)
+            next_index += 1
+
+    def _balanced_chunks(self, file_paths: List[str]) -> List[List[int]]:
+        """
+        Splits file indices into contiguous chunks of roughly equal size in bytes.
+
+        Chunks follow the order of `file_paths`, and a file larger than the
+        budget gets a chunk of its own, so workers finish them at about the
+        same pace.
+        """
+        sizes = [_file_size(file_path) for file_path in file_paths]
+        budget = max(sum(sizes) // (self.jobs * 4), 1)
+
+        chunks: List[List[int]] = []
+        current: List[int] = []
+        current_size = 0
+        for index, size in enumerate(sizes):
+            if current and (current_size + size > budget or len(current) >= self.MAX_FILES_PER_CHUNK):
+                chunks.append(current)
+                current, current_size = [], 0
+            current.append(index)
+            current_size += size
+        if current:
+            chunks.append(current)
+        return chunks
+
+    def _extract_comments(self, file_path: str, spans: List[CommentSpan], line_index: LineIndex) -> List[Comment]:
+        tagged = []
+        for span in spans:
+            # Detect all tags within the comment in a single pass
+            matched_tags = self.tag_matcher.find(span.text)
             if matched_tags:
-                # Find the line number of the comment
-                for i, line in enumerate(lines):
-                    if comment in line:
-                        context = self._get_context(lines, i)
-                        self.comments.append(Comment(
-                            file=file_path,
-                            line_number=i + 1,
-                            text=comment,
-                            context=context,
-                            tags=matched_tags
-                        ))
-                        break
-
-
-    def _get_context(self, lines: List[str], index: int, context_range: int = 2) -> List[str]:
-        start = max(index - context_range, 0)
-        end = min(index + context_range + 1, len(lines))
-        return [line.strip() for line in lines[start:end]]
+                tagged.append((span, matched_tags))
+        if not tagged:
+            return []
+
+        # Keep only the context lines of this file's findings, shared by all of them
+        context_lines = line_index.context_lines(span.line_number - 1 for span, _ in tagged)
+        return [
+            Comment(
+                file=file_path,
+                line_number=span.line_number,
+                text=span.text,
+                context=None,
+                tags=matched_tags,
+                context_lines=context_lines
+            )
+            for span, matched_tags in tagged
+        ]
 
     def get_comments(self) -> List[Dict]:
         return [comment.to_dict() for comment in self.comments]
+
+
+# Per-process analyzer used by the worker pool in parallel mode
+_worker_analyzer: Optional[Analyzer] = None
+
+def _init_worker(project_path: str, tags: List[str]):
+    global _worker_analyzer
+    _worker_analyzer = Analyzer(project_path=project_path, tags=tags)
+
+def _scan_chunk(file_paths: List[str]) -> Tuple[List[List[Comment]], Dict]:
+    results = [_worker_analyzer._scan_file(file_path) for file_path in file_paths]
+    return results, _worker_analyzer.metrics.take()
+
+def _file_size(file_path: str) -> int:
+    try:
+        return os.path.getsize(file_path)
+    except OSError:
+        return 0
@@ -2,7 +2,9 @@ import json
 import os
 from typing import List, Dict, Optional
 from src.prompt_generator import PromptGenerator # type: ignore
+from src.llm_backend import LLMBackend
 from src.openai_assistant import OpenAIAssistant
+from src.response_cache import ResponseCache
 import logging
 
 # Configure logging
@@ -14,18 +16,24 @@ class Assistant:
     Assistant class responsible for reading analysis results, generating prompts, and interacting with the OpenAI Assistant API.
     """
 
-    def __init__(self, results_path: str, openai_api_key: Optional[str] = None):
+    def __init__(self, results_path: str, openai_api_key: Optional[str] = None,
+                 response_cache: Optional[ResponseCache] = None, backend: Optional[LLMBackend] = None):
         """
         Initializes the Assistant.
 
         Args:
             results_path (str): Path to the analysis results JSON file.
             openai_api_key (Optional[str]): API key for OpenAIAssistant. If provided, enables sending prompts to the Assistant API.
+            response_cache (Optional[ResponseCache]): Cache of previous responses, reused for identical prompts.
+            backend (Optional[LLMBackend]): Service answering the prompts instead of the OpenAI API, e.g. a fake for load tests.
         """
         self.results_path = results_path
         self.results: List[Dict] = []
         self.prompt_generator = PromptGenerator(report_path=self.results_path)
-        self.openai_assistant = OpenAIAssistant(api_key=openai_api_key) if openai_api_key else None
+        # One OpenAIAssistant, and therefore one pooled HTTP client, for all prompts
+        self.openai_assistant = OpenAIAssistant(
+            results_path=results_path, api_key=openai_api_key, response_cache=response_cache, backend=backend
+        ) if openai_api_key or backend else None
 
     def load_results(self):
         """
@@ -0,0 +1,32 @@
+import os
+from contextlib import contextmanager
+from typing import IO, Iterator
+
+
+@contextmanager
+def open_atomic(path: str) -> Iterator[IO[str]]:
+    """
+    Opens a temporary text file in the same directory as `path`, renamed over it once the block
+    completes and its content is on disk, so that readers never see a partial file. The temporary
+    file is removed if the block raises.
+    """
+    import tempfile
+
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def write_atomic(path: str, content: str):
+    """
+    Writes a text file atomically with `open_atomic`.
+    """
+    with open_atomic(path) as f:
+        f.write(content)
@@ -0,0 +1,74 @@
+import hashlib
+import json
+from typing import Dict, Iterator, NamedTuple, Optional
+
+# Endpoint of every request in a batch file
+BATCH_ENDPOINT = "/v1/chat/completions"
+
+
+class BatchResult(NamedTuple):
+    """
+    The outcome of one request of a completed batch job: its response text, or an error message.
+    """
+    custom_id: str
+    content: Optional[str]
+    error: Optional[str]
+
+
+def custom_id(model: str, prompt: str) -> str:
+    """
+    Returns the ID of a request in a batch file, stable across runs for the same model and prompt.
+    """
+    digest = hashlib.sha256(json.dumps([model, prompt]).encode('utf-8')).hexdigest()
+    return f"request-{digest[:32]}"
+
+
+def batch_request_line(request_id: str, model: str, prompt: str) -> str:
+    """
+    Renders a request as a line of a JSONL batch-request file.
+    """
+    return json.dumps({
+        "custom_id": request_id,
+        "method": "POST",
+        "url": BATCH_ENDPOINT,
+        "body": {"model": model, "messages": [{"role": "user", "content": prompt}]},
+    }) + "\n"
+
+
+def _parse_result(record: Dict) -> BatchResult:
+    request_id = record.get("custom_id")
+    if not request_id:
+        raise ValueError("Batch result without a custom_id")
+    error = record.get("error")
+    if error:
+        message = error.get("message", error) if isinstance(error, dict) else error
+        return BatchResult(request_id, None, str(message))
+
+    response = record.get("response") or {}
+    status_code = response.get("status_code", 200)
+    body = response.get("body") or {}
+    if status_code != 200:
+        message = (body.get("error") or {}).get("message", f"status {status_code}")
+        return BatchResult(request_id, None, f"HTTP {status_code}: {message}")
+    try:
+        content = body["choices"][0]["message"]["content"]
+    except (KeyError, IndexError, TypeError):
+        return BatchResult(request_id, None, "Batch result without a completion")
+    return BatchResult(request_id, content, None)
+
+
+def read_batch_results(path: str) -> Iterator[BatchResult]:
+    """
+    Reads the JSONL output file of a batch job, one result per line.
+
+    Raises:
+        ValueError: If a line is not a valid batch result.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield _parse_result(json.loads(line))
+            except (json.JSONDecodeError, ValueError, AttributeError) as e:
+                raise ValueError(f"Invalid batch result on line {line_number} of {path}: {e}")
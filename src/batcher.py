@@ -0,0 +1,90 @@
+import re
+from typing import Dict, List, NamedTuple
+from src.prompt_request import PromptRequest, Segment
+from src.tokens import estimate_tokens
+from src.windowing import strip_code_fence
+
+FILE_BLOCK_PATTERN = re.compile(r'^<<<FILE (.+?)>>>[ \t]*\n(.*?)^<<<END FILE>>>', re.DOTALL | re.MULTILINE)
+
+
+class FilePart(NamedTuple):
+    """
+    The tags of one file and its content, as packed into a multi-file request.
+    """
+    file_path: str
+    lines: List[int]
+    tags: List[str]
+    full_content: str
+
+
+def render_file_block(file_path: str, content: str) -> str:
+    """
+    Renders a file in the block format used both in packed prompts and in their responses.
+    """
+    if not content.endswith("\n"):
+        content += "\n"
+    return f"<<<FILE {file_path}>>>\n{content}<<<END FILE>>>\n"
+
+
+def parse_file_blocks(response: str) -> Dict[str, str]:
+    """
+    Splits the response of a packed request into the updated content of each file.
+    """
+    blocks = {}
+    for match in FILE_BLOCK_PATTERN.finditer(response):
+        blocks[match.group(1).strip()] = strip_code_fence(match.group(2))
+    return blocks
+
+
+class Batcher:
+    """
+    Packs the prompts of small files into multi-file requests up to a token target.
+
+    Uses first-fit decreasing bin packing: files are placed largest first into
+    the first request with enough room left. A file alone in its request keeps
+    the regular single-file prompt.
+    """
+
+    def __init__(self, generator, token_target: int, max_files: int = 10):
+        """
+        Initializes the Batcher.
+
+        Args:
+            generator (PromptGenerator): Generator of single-file and packed prompts.
+            token_target (int): Estimated token budget of a packed prompt.
+            max_files (int): Maximum number of files packed into one request.
+        """
+        self.generator = generator
+        self.token_target = token_target
+        self.max_files = max_files
+
+    def pack(self, parts: List[FilePart]) -> List[PromptRequest]:
+        overhead = estimate_tokens(self.generator.generate_packed_prompt([]))
+        capacity = self.token_target - overhead
+        costs = {
+            part.file_path: estimate_tokens(self.generator.describe_file_part(part) +
+                                            render_file_block(part.file_path, part.full_content))
+            for part in parts
+        }
+
+        bins: List[Dict] = []
+        for part in sorted(parts, key=lambda part: (-costs[part.file_path], part.file_path)):
+            cost = costs[part.file_path]
+            for candidate in bins:
+                if candidate["used"] + cost <= capacity and len(candidate["parts"]) < self.max_files:
+                    candidate["parts"].append(part)
+                    candidate["used"] += cost
+                    break
+            else:
+                bins.append({"parts": [part], "used": cost})
+
+        requests = []
+        for packed in bins:
+            packed_parts = sorted(packed["parts"], key=lambda part: part.file_path)
+            if len(packed_parts) == 1:
+                part = packed_parts[0]
+                prompt = self.generator.generate_batched_prompt(part.file_path, part.lines, part.tags, [], part.full_content)
+            else:
+                prompt = self.generator.generate_packed_prompt(packed_parts)
+            requests.append(PromptRequest(prompt, [Segment(part.file_path) for part in packed_parts]))
+        return requests
@@ -0,0 +1,268 @@
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from typing import Callable, Iterator, Optional
+from src.batcher import parse_file_blocks, render_file_block
+from src.fake_llm_args import add_fake_backend_arguments
+from src.llm_backend import BackendError, LLMBackend
+from src.tokens import CHARS_PER_TOKEN
+from src.windowing import END_MARKER, parse_excerpts
+
+
+class FakeBackend(LLMBackend):
+    """
+    Local stand-in for an LLM API with injected latency and faults, for load-testing the dispatch path offline.
+
+    Latencies follow a log-normal distribution around a median (constant when
+    `latency_sigma` is 0). Each request fails with a 500 at `error_rate`, and
+    after every `rate_limit_every` requests the next `rate_limit_burst` ones are
+    answered with a 429 and a Retry-After header, as an account-wide limit would.
+
+    Answers echo the marked files or excerpts of the prompt unchanged, so packed
+    and windowed requests are split and stitched as usual; other prompts get
+    `response_tokens` tokens of filler. Streamed answers arrive in chunks of
+    `STREAM_CHUNK_TOKENS` tokens, at `tokens_per_second` after the latency.
+    """
+
+    # Size of the chunks of a streamed answer
+    STREAM_CHUNK_TOKENS = 8
+
+    def __init__(self, latency: float = 0.0, latency_sigma: float = 0.0, error_rate: float = 0.0,
+                 rate_limit_every: int = 0, rate_limit_burst: int = 1, retry_after: float = 1.0,
+                 response_tokens: int = 200, tokens_per_second: float = 0.0, seed: Optional[int] = None,
+                 sleep: Callable[[float], None] = time.sleep):
+        """
+        Initializes the FakeBackend.
+
+        Args:
+            latency (float): Median latency of a request in seconds.
+            latency_sigma (float): Standard deviation of the log of the latency; larger values give longer tails.
+            error_rate (float): Probability that a request fails with a 500.
+            rate_limit_every (int): Number of requests between bursts of 429s (0 disables them).
+            rate_limit_burst (int): Number of consecutive requests rejected in each burst.
+            retry_after (float): Retry-After in seconds sent with the 429s.
+            response_tokens (int): Size of the filler answer to prompts without marked code.
+            tokens_per_second (float): Generation speed of streamed answers (0 sends them at once).
+            seed (Optional[int]): Seed of the random generator, for reproducible runs.
+            sleep (Callable[[float], None]): Function used to wait out the latency.
+        """
+        self.latency = latency
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.rate_limit_every = rate_limit_every
+        self.rate_limit_burst = rate_limit_burst
+        self.retry_after = retry_after
+        self.response_tokens = response_tokens
+        self.tokens_per_second = tokens_per_second
+        self.sleep = sleep
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.stats = {"ok": 0, "errors": 0, "rate_limited": 0}
+
+    def sample_latency(self) -> float:
+        with self.lock:
+            noise = self.rng.gauss(0.0, self.latency_sigma) if self.latency_sigma else 0.0
+        return self.latency * math.exp(noise)
+
+    def complete(self, model: str, prompt: str) -> str:
+        self._begin()
+        return self.answer(prompt)
+
+    def stream(self, model: str, prompt: str) -> Iterator[str]:
+        self._begin()
+        answer = self.answer(prompt)
+        chunk_size = self.STREAM_CHUNK_TOKENS * CHARS_PER_TOKEN
+        for start in range(0, len(answer), chunk_size):
+            if start and self.tokens_per_second:
+                self.sleep(self.STREAM_CHUNK_TOKENS / self.tokens_per_second)
+            yield answer[start:start + chunk_size]
+
+    def _begin(self):
+        """
+        Waits out the latency of a request, then raises the injected errors.
+        """
+        with self.lock:
+            self.requests += 1
+            position = self.requests
+            failed = self.rng.random() < self.error_rate
+        self.sleep(self.sample_latency())
+
+        cycle = self.rate_limit_every + self.rate_limit_burst
+        if self.rate_limit_every and (position - 1) % cycle >= self.rate_limit_every:
+            with self.lock:
+                self.stats["rate_limited"] += 1
+            raise BackendError("Rate limit reached", 429, {"retry-after": f"{self.retry_after:g}"})
+        if failed:
+            with self.lock:
+                self.stats["errors"] += 1
+            raise BackendError("Injected server error", 500)
+        with self.lock:
+            self.stats["ok"] += 1
+
+    def answer(self, prompt: str) -> str:
+        files = parse_file_blocks(prompt)
+        if files:
+            return "".join(render_file_block(file_path, content) for file_path, content in files.items())
+        excerpts = parse_excerpts(prompt)
+        if excerpts:
+            return "".join(f"<<<LINES {start}-{end}>>>\n{body}{END_MARKER}\n" for (start, end), body in excerpts.items())
+        return "# " + "x" * max(self.response_tokens * CHARS_PER_TOKEN - 2, 0)
+
+
+class FakeLLMServer:
+    """
+    Serves a FakeBackend over HTTP as an OpenAI-compatible chat completions endpoint.
+
+    Point the OpenAI backend at `url` to exercise the real client, connection
+    pool and HTTP error handling without calling the API.
+    """
+
+    def __init__(self, backend: FakeBackend, host: str = "127.0.0.1", port: int = 0):
+        from http.server import ThreadingHTTPServer
+
+        self.backend = backend
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _handler_class(self):
+        from http.server import BaseHTTPRequestHandler
+
+        backend = self.backend
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                if not self.path.rstrip('/').endswith("/chat/completions"):
+                    self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+                    return
+                try:
+                    request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                    prompt = "\n".join(message["content"] for message in request["messages"])
+                    model = request.get("model", "")
+                except (ValueError, KeyError, TypeError) as e:
+                    self._send_json(400, {"error": {"message": f"Invalid request: {e}"}})
+                    return
+                try:
+                    if request.get("stream"):
+                        chunks = backend.stream(model, prompt)
+                        # Raise the injected errors before the headers are sent
+                        first = next(chunks, "")
+                        self._send_stream(model, first, chunks)
+                        return
+                    content = backend.complete(model, prompt)
+                except BackendError as e:
+                    self._send_json(e.status_code, {"error": {"message": str(e)}}, e.response.headers)
+                    return
+                self._send_json(200, {
+                    "id": f"chatcmpl-fake-{backend.requests}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                                 "finish_reason": "stop"}],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+                })
+
+            def _send_stream(self, model, first, chunks):
+                """
+                Sends the answer as server-sent events of chat completion chunks, in chunked transfer encoding.
+                """
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                created = int(time.time())
+                for delta, finish_reason in [({"role": "assistant", "content": first}, None)] + \
+                        [({"content": chunk}, None) for chunk in chunks] + [({}, "stop")]:
+                    self._send_chunk("data: " + json.dumps({
+                        "id": f"chatcmpl-fake-{backend.requests}",
+                        "object": "chat.completion.chunk",
+                        "created": created,
+                        "model": model,
+                        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+                    }) + "\n\n")
+                self._send_chunk("data: [DONE]\n\n")
+                self.wfile.write(b"0\r\n\r\n")
+
+            def _send_chunk(self, text):
+                data = text.encode('utf-8')
+                self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+                self.wfile.flush()
+
+            def _send_json(self, status_code, payload, headers=None):
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status_code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "FakeLLMServer":
+        self._thread = threading.Thread(target=self.server.serve_forever, name="fake-llm-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+def fake_backend_from_args(args: argparse.Namespace) -> FakeBackend:
+    return FakeBackend(
+        latency=args.fake_latency,
+        latency_sigma=args.fake_latency_sigma,
+        error_rate=args.fake_error_rate,
+        rate_limit_every=args.fake_429_every,
+        rate_limit_burst=args.fake_429_burst,
+        retry_after=args.fake_retry_after,
+        response_tokens=args.fake_response_tokens,
+        tokens_per_second=args.fake_tokens_per_second,
+        seed=args.fake_seed,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local fake of an OpenAI-compatible chat completions API")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Address to listen on")
+    parser.add_argument("--port", type=int, default=8000, help="Port to listen on")
+    add_fake_backend_arguments(parser)
+    args = parser.parse_args()
+
+    server = FakeLLMServer(fake_backend_from_args(args), host=args.host, port=args.port)
+    print(f"Serving fake chat completions at {server.url}")
+    try:
+        server.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+import argparse
+
+
+def add_fake_backend_arguments(parser: argparse.ArgumentParser):
+    """
+    Adds the options configuring a FakeBackend to a command-line parser.
+
+    Kept apart from src.fake_llm so that the main command line can offer them
+    without importing the fake backend and its dependencies.
+    """
+    group = parser.add_argument_group("fake LLM backend")
+    group.add_argument("--fake-latency", type=float, default=0.0, help="Median latency of a fake request in seconds")
+    group.add_argument("--fake-latency-sigma", type=float, default=0.0,
+                       help="Spread of the log-normal latency; larger values give longer tails")
+    group.add_argument("--fake-error-rate", type=float, default=0.0, help="Probability of a fake 500 error")
+    group.add_argument("--fake-429-every", type=int, default=0,
+                       help="Number of requests between bursts of 429 responses (0 disables them)")
+    group.add_argument("--fake-429-burst", type=int, default=1, help="Number of 429 responses in a burst")
+    group.add_argument("--fake-retry-after", type=float, default=1.0, help="Retry-After sent with the 429 responses")
+    group.add_argument("--fake-response-tokens", type=int, default=200,
+                       help="Size of the answer to prompts without marked code")
+    group.add_argument("--fake-tokens-per-second", type=float, default=0.0,
+                       help="Generation speed of streamed fake answers (0 sends them at once)")
+    group.add_argument("--fake-seed", type=int, default=None, help="Random seed of the fake backend")
@@ -0,0 +1,59 @@
+import os
+import subprocess
+from typing import List, Optional
+
+
+def _git(cwd: str, *args: str) -> str:
+    """
+    Runs a git command in the given directory and returns its standard output.
+    """
+    try:
+        completed = subprocess.run(
+            ["git", *args], cwd=cwd, capture_output=True, text=True, check=True
+        )
+    except FileNotFoundError:
+        raise RuntimeError("git is not installed or not on PATH.")
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"git {' '.join(args)} failed: {e.stderr.strip()}")
+    return completed.stdout
+
+
+def changed_files(project_path: str, since: Optional[str] = None, staged: bool = False) -> List[str]:
+    """
+    Lists the added, copied, modified and renamed files of the project according to git.
+
+    Compared against a ref, new files that are not tracked yet count as added,
+    unless git ignores them.
+
+    Args:
+        project_path (str): Project directory inside a git work tree.
+        since (Optional[str]): Compare the working tree against the merge base of this ref and HEAD,
+            so only the changes of the current branch are returned.
+        staged (bool): List the files staged in the index instead.
+
+    Returns:
+        List[str]: Existing files under `project_path`, joined onto `project_path` like the Analyzer's own walk.
+    """
+    if not since and not staged:
+        raise ValueError("Either a ref or the staged set must be requested.")
+
+    toplevel = _git(project_path, "rev-parse", "--show-toplevel").strip()
+    if staged:
+        output = _git(project_path, "diff", "--cached", "--name-only", "--diff-filter=ACMR", "-z")
+    else:
+        base = _git(project_path, "merge-base", since, "HEAD").strip()
+        output = _git(project_path, "diff", "--name-only", "--diff-filter=ACMR", "-z", base)
+        # Untracked files are not part of any diff; --full-name keeps them relative to the top level
+        output += _git(project_path, "ls-files", "--others", "--exclude-standard", "--full-name", "-z")
+
+    project_root = os.path.realpath(project_path)
+    files = []
+    for name in sorted(filter(None, output.split('\0'))):
+        real_path = os.path.realpath(os.path.join(toplevel, name))
+        if not os.path.isfile(real_path):
+            continue  # Deleted from the working tree after being staged
+        relative = os.path.relpath(real_path, project_root)
+        if relative.startswith(os.pardir + os.sep):
+            continue  # Outside the analyzed project
+        files.append(os.path.join(project_path, relative))
+    return files
@@ -0,0 +1,94 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def prompt_hash(model: str, prompts: List[str]) -> str:
+    """
+    Returns the hash of the prompts that produce a file's output, for the given model.
+    """
+    return hashlib.sha256(json.dumps([model, prompts]).encode('utf-8')).hexdigest()
+
+
+class Journal:
+    """
+    Append-only JSONL record of the files whose LLM output has been saved.
+
+    Each line holds a file path, the hash of the prompts that produced its
+    output and the output path. Lines are appended only once the output is
+    fully written, and flushed to disk right away, so an interrupted run can
+    be resumed without sending those prompts again. The latest line of a file
+    wins; a torn last line from a crash is ignored.
+    """
+
+    def __init__(self, path: str):
+        """
+        Initializes the Journal.
+
+        Args:
+            path (str): Path of the journal file, created on the first record.
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        # Entries of previous runs, once loaded
+        self.entries: Dict[str, Dict] = {}
+        self._file = None
+
+    def load(self) -> Dict[str, Dict]:
+        """
+        Reads the entries of previous runs.
+
+        Returns:
+            Dict[str, Dict]: The latest entry of every recorded file, by file path.
+        """
+        entries: Dict[str, Dict] = {}
+        self.entries = entries
+        if not os.path.exists(self.path):
+            return entries
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, start=1):
+                try:
+                    entry = json.loads(line)
+                    entries[entry["file"]] = entry
+                except (ValueError, KeyError, TypeError):
+                    logger.warning(f"Ignoring malformed line {line_number} of the journal {self.path}")
+        return entries
+
+    def record(self, file_path: str, prompt_digest: str, output_path: str):
+        """
+        Appends a completed file to the journal.
+        """
+        line = json.dumps({"file": file_path, "prompt_hash": prompt_digest, "output": output_path}) + "\n"
+        with self.lock:
+            if self._file is None:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                self._file = open(self.path, 'a', encoding='utf-8')
+                # Start on a fresh line if the previous run died in the middle of one
+                if self._file.tell() > 0 and not self._ends_with_newline():
+                    self._file.write("\n")
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def _ends_with_newline(self) -> bool:
+        with open(self.path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def is_done(self, file_path: str, prompt_digest: str) -> bool:
+        """
+        Tells whether a loaded entry covers the file with the same prompts, and its output still exists.
+        """
+        entry: Optional[Dict] = self.entries.get(file_path)
+        return entry is not None and entry.get("prompt_hash") == prompt_digest and os.path.exists(entry.get("output", ""))
+
+    def close(self):
+        with self.lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
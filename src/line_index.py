@@ -0,0 +1,93 @@
+import bisect
+import re
+from array import array
+from typing import Dict, Iterable, List
+
+NEWLINE_PATTERN = re.compile(r'\n')
+
+
+class LineIndex:
+    """
+    Newline-offset index over the content of a single file.
+
+    Maps character offsets to line numbers in O(log n) and returns context
+    lines without re-reading or re-splitting the file.
+    """
+
+    def __init__(self, content: str):
+        self.content = content
+        self.line_starts: List[int] = [0]
+        self.line_starts.extend(match.end() for match in NEWLINE_PATTERN.finditer(content))
+        # A trailing newline does not start a new line (same as `readlines()`)
+        if self.line_starts[-1] == len(content):
+            self.line_starts.pop()
+
+    def __len__(self) -> int:
+        return len(self.line_starts)
+
+    def line_number(self, offset: int) -> int:
+        """
+        Returns the 1-based line number containing the given character offset.
+        """
+        return bisect.bisect_right(self.line_starts, offset)
+
+    def line(self, index: int) -> str:
+        """
+        Returns the line at the given 0-based index, including its newline.
+        """
+        start = self.line_starts[index]
+        end = self.line_starts[index + 1] if index + 1 < len(self.line_starts) else len(self.content)
+        return self.content[start:end]
+
+    def context(self, index: int, context_range: int = 2) -> List[str]:
+        """
+        Returns the stripped lines surrounding the line at the given 0-based index.
+        """
+        start = max(index - context_range, 0)
+        end = min(index + context_range + 1, len(self.line_starts))
+        return [self.line(i).strip() for i in range(start, end)]
+
+    def context_lines(self, indices: Iterable[int], context_range: int = 2) -> "ContextLines":
+        """
+        Extracts the stripped context lines needed around the given 0-based line indices.
+        """
+        needed = set()
+        for index in indices:
+            needed.update(range(max(index - context_range, 0), min(index + context_range + 1, len(self.line_starts))))
+        return ContextLines({i: self.line(i).strip() for i in needed}, len(self.line_starts), context_range)
+
+
+class ContextLines:
+    """
+    The stripped lines of a file that some finding needs as context.
+
+    Shared by all comments of the file, so overlapping context windows are
+    stored once and the rest of the file content can be released. The lines
+    are packed into one string with an offset table instead of one string
+    object per line.
+    """
+
+    __slots__ = ("indices", "offsets", "text", "line_count", "context_range")
+
+    def __init__(self, lines: Dict[int, str], line_count: int, context_range: int = 2):
+        self.indices = array('l', sorted(lines))
+        self.offsets = array('l', [0])
+        for index in self.indices:
+            self.offsets.append(self.offsets[-1] + len(lines[index]))
+        self.text = ''.join(lines[index] for index in self.indices)
+        self.line_count = line_count
+        self.context_range = context_range
+
+    def line(self, index: int) -> str:
+        position = bisect.bisect_left(self.indices, index)
+        if position == len(self.indices) or self.indices[position] != index:
+            raise KeyError(index)
+        return self.text[self.offsets[position]:self.offsets[position + 1]]
+
+    def context(self, index: int) -> List[str]:
+        """
+        Returns the stripped lines surrounding the line at the given 0-based index.
+        """
+        start = max(index - self.context_range, 0)
+        end = min(index + self.context_range + 1, self.line_count)
+        return [self.line(i) for i in range(start, end)]
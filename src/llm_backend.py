@@ -0,0 +1,166 @@
+import logging
+import threading
+from abc import ABC, abstractmethod
+from types import SimpleNamespace
+from typing import Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class BackendError(Exception):
+    """
+    An error answered by an LLM backend, carrying the HTTP status and response
+    headers so that the retry logic can tell transient errors apart and honour Retry-After.
+    """
+
+    def __init__(self, message: str, status_code: int, headers: Optional[Dict[str, str]] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.response = SimpleNamespace(headers=headers or {})
+
+
+class LLMBackend(ABC):
+    """
+    Interface of the services that answer prompts with chat completions.
+    """
+
+    @abstractmethod
+    def complete(self, model: str, prompt: str) -> str:
+        """
+        Sends a single-message chat completion request and returns the content of the answer.
+
+        Raises:
+            Exception: On failure; errors with a `status_code` are retried when transient.
+        """
+
+    def stream(self, model: str, prompt: str) -> Iterator[str]:
+        """
+        Sends a single-message chat completion request and yields the content of the answer as it is generated.
+
+        Backends without streaming yield the whole answer at once.
+        """
+        yield self.complete(model, prompt)
+
+    def is_retryable(self, error: Exception) -> bool:
+        """
+        Tells whether a backend-specific error without a status code may succeed if retried.
+        """
+        return False
+
+    def close(self):
+        """
+        Releases the connections held by the backend.
+        """
+
+
+class OpenAIBackend(LLMBackend):
+    """
+    Chat completions from the OpenAI API, or any API compatible with it, through one pooled client.
+    """
+
+    def __init__(self, api_key: Optional[str], base_url: Optional[str] = None, pool_size: int = 10,
+                 timeout: float = 120.0, keepalive_expiry: float = 60.0):
+        """
+        Initializes the OpenAIBackend.
+
+        Args:
+            api_key (Optional[str]): OpenAI API key.
+            base_url (Optional[str]): URL of an OpenAI-compatible API, e.g. a local fake server.
+            pool_size (int): Maximum number of pooled HTTP connections.
+            timeout (float): Timeout in seconds of a request.
+            keepalive_expiry (float): Seconds an idle pooled connection is kept open for reuse.
+        """
+        self.api_key = api_key
+        self.base_url = base_url
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.keepalive_expiry = keepalive_expiry
+        self._client = None
+        self._client_lock = threading.Lock()
+        self._request_state = threading.local()
+        self.connection_stats = {"requests": 0, "connections_opened": 0}
+
+    @property
+    def client(self) -> "openai.OpenAI":
+        """
+        The OpenAI client, created on first use and reused for every request so
+        that connections (and their TLS sessions) are kept alive between calls.
+        """
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = self._build_client()
+        return self._client
+
+    def _build_client(self) -> "openai.OpenAI":
+        import openai # type: ignore
+
+        # The HTTP library differs between openai releases, so its classes are taken from what openai exports
+        limits_class = type(openai.DEFAULT_CONNECTION_LIMITS)
+        http_client = openai.DefaultHttpxClient(
+            limits=limits_class(
+                max_connections=self.pool_size,
+                max_keepalive_connections=self.pool_size,
+                keepalive_expiry=self.keepalive_expiry,
+            ),
+            timeout=openai.Timeout(self.timeout, connect=min(self.timeout, 10.0)),
+            event_hooks={"request": [self._trace_request]},
+        )
+        logger.debug(f"Created OpenAI client with a pool of {self.pool_size} connections")
+        # Retries are handled by the caller so that they respect the rate limits
+        return openai.OpenAI(api_key=self.api_key, base_url=self.base_url, http_client=http_client, max_retries=0)
+
+    def _trace_request(self, request):
+        """
+        Hooks into the connection events of each HTTP request to tell whether it reused a pooled connection.
+        """
+        self._request_state.new_connection = False
+        request.extensions["trace"] = self._on_connection_event
+
+    def _on_connection_event(self, event_name: str, info: Dict):
+        if event_name == "connection.connect_tcp.complete":
+            self._request_state.new_connection = True
+            with self._client_lock:
+                self.connection_stats["connections_opened"] += 1
+
+    def _log_connection_reuse(self):
+        new_connection = getattr(self._request_state, "new_connection", False)
+        with self._client_lock:
+            self.connection_stats["requests"] += 1
+            requests = self.connection_stats["requests"]
+            opened = self.connection_stats["connections_opened"]
+        logger.debug(
+            f"Request {requests} {'opened a new' if new_connection else 'reused a pooled'} connection "
+            f"({opened} connections opened for {requests} requests)"
+        )
+
+    def complete(self, model: str, prompt: str) -> str:
+        response = self.client.chat.completions.create(
+            model=model,
+            messages=[{"role": "user", "content": prompt}]
+        )
+        self._log_connection_reuse()
+        return response.choices[0].message.content
+
+    def stream(self, model: str, prompt: str) -> Iterator[str]:
+        response = self.client.chat.completions.create(
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+            stream=True,
+        )
+        try:
+            for chunk in response:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            response.close()
+        self._log_connection_reuse()
+
+    def is_retryable(self, error: Exception) -> bool:
+        import openai # type: ignore
+        return isinstance(error, openai.APIConnectionError)
+
+    def close(self):
+        if self._client is not None:
+            self._client.close()
+            self._client = None
@@ -1,11 +1,16 @@
 import argparse
-import json
 import os
-from dotenv import load_dotenv # type: ignore
+from typing import List, Optional, TYPE_CHECKING
 from src.analyzer import Analyzer
-from src.openai_assistant import OpenAIAssistant
+from src.fake_llm_args import add_fake_backend_arguments
+from src.metrics import Metrics
+from src.report import REPORT_FORMATS, open_report_writer
+from src.walker import FileWalker
 
-load_dotenv()
+if TYPE_CHECKING:
+    from src.analysis_cache import AnalysisCache
+    from src.openai_assistant import OpenAIAssistant
+    from src.pipeline import Pipeline
 
 def get_next_report_filename(output_path: str) -> str:
     """
@@ -29,7 +34,79 @@ def main():
     parser.add_argument("--tags", type=str, nargs='+', default=["@TODO", "@FIXME", "@REFACTOR", "@IMPROVE", "@OPTIMIZE", "@DEPRECATE", "@REMOVE", "@BUG", "@HACK"],
                         help="Tags to search for in comments")
     parser.add_argument("--output", type=str, default="report.json", help="Output file for the report")
+    parser.add_argument("--format", type=str, choices=REPORT_FORMATS, default="json",
+                        help="Report format: a JSON array or newline-delimited JSON (one finding per line)")
+    parser.add_argument("--scan-only", "--no-llm", dest="scan_only", action="store_true",
+                        help="Only write the tag report; skip the LLM stage, which needs no API key then")
     parser.add_argument("--verbose", action="store_true", help="Enable verbose output")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="Number of worker processes used to scan files (0 uses all available cores)")
+    scope = parser.add_mutually_exclusive_group()
+    scope.add_argument("--since", type=str, metavar="REF",
+                       help="Only analyze files added or changed on the current branch since the given git ref")
+    scope.add_argument("--staged", action="store_true", help="Only analyze files staged in git")
+    parser.add_argument("--exclude", type=str, nargs='+', default=[], metavar="PATTERN",
+                        help="Files or directories to skip, in .gitignore syntax relative to the project path")
+    parser.add_argument("--include", type=str, nargs='+', default=[], metavar="PATTERN",
+                        help="Only analyze files matching these patterns, in .gitignore syntax")
+    parser.add_argument("--no-gitignore", action="store_true", help="Do not honour .gitignore files")
+    parser.add_argument("--llm-concurrency", type=int, default=1,
+                        help="Maximum number of concurrent OpenAI requests (1 sends them one by one)")
+    parser.add_argument("--llm-pool-size", type=int, default=10,
+                        help="Maximum number of pooled HTTP connections to the OpenAI API")
+    parser.add_argument("--llm-timeout", type=float, default=120.0, help="Timeout in seconds for OpenAI requests")
+    parser.add_argument("--llm-keepalive", type=float, default=60.0,
+                        help="Seconds an idle pooled connection is kept open for reuse")
+    parser.add_argument("--llm-backend", type=str, choices=("openai", "fake"), default="openai",
+                        help="Service answering the prompts: the OpenAI API, or an in-process fake for load tests")
+    parser.add_argument("--base-url", type=str, default=None,
+                        help="URL of an OpenAI-compatible API to use instead of OpenAI, e.g. a local fake server")
+    parser.add_argument("--rpm", type=float, default=None, help="Requests-per-minute budget for the OpenAI API")
+    parser.add_argument("--tpm", type=float, default=None, help="Tokens-per-minute budget for the OpenAI API")
+    parser.add_argument("--max-retries", type=int, default=5,
+                        help="Retries of a request after a rate limit or transient server error")
+    parser.add_argument("--max-prompt-tokens", type=int, default=3000,
+                        help="Estimated token budget per prompt; larger files are sent as windows around the tagged lines")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="Send each file's findings to the LLM while the scan is still running")
+    parser.add_argument("--watch", action="store_true",
+                        help="Keep the report up to date as files change, until interrupted")
+    parser.add_argument("--watch-llm", action="store_true",
+                        help="In watch mode, send the files of tags added while watching to the LLM")
+    parser.add_argument("--watch-interval", type=float, default=0.5,
+                        help="Seconds between two polls of the project for changes, in watch mode")
+    parser.add_argument("--watch-poll", action="store_true",
+                        help="In watch mode, poll the project even if change notifications are available")
+    parser.add_argument("--pipeline-queue-size", type=int, default=64,
+                        help="Scanned files that may wait for dispatch before the scan pauses, in pipelined mode")
+    parser.add_argument("--batch-token-target", type=int, default=3000,
+                        help="Estimated token budget up to which small files are packed into one request (0 disables packing)")
+    parser.add_argument("--max-files-per-request", type=int, default=10,
+                        help="Maximum number of small files packed into one request")
+    batch_mode = parser.add_mutually_exclusive_group()
+    batch_mode.add_argument("--export-batch", type=str, metavar="FILE",
+                            help="Write the OpenAI requests to a JSONL batch-request file and exit without sending them")
+    batch_mode.add_argument("--import-results", type=str, metavar="FILE",
+                            help="Save the responses from the JSONL output file of a batch job created with --export-batch")
+    parser.add_argument("--no-cache", action="store_true", help="Do not use the on-disk cache of OpenAI responses")
+    parser.add_argument("--refresh", action="store_true",
+                        help="Ignore cached OpenAI responses but store the new ones")
+    parser.add_argument("--stream", action="store_true",
+                        help="Stream whole-file answers into their output files as they are generated")
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip files whose output an earlier run saved from the same prompts, as recorded in "
+                             "the journal next to the report (.journal.jsonl)")
+    parser.add_argument("--llm-cache-size", type=int, default=512,
+                        help="Size cap of the OpenAI response cache in MB; least recently used responses are evicted")
+    parser.add_argument("--no-analysis-cache", action="store_true",
+                        help="Re-parse every file instead of reusing the analysis cache in the output directory")
+    parser.add_argument("--hash-contents", action="store_true",
+                        help="Validate analysis cache entries with a content hash in addition to size and mtime")
+    parser.add_argument("--metrics-json", type=str, default=None, metavar="FILE",
+                        help="Where to write the JSON metrics summary (default: next to the report, .metrics.json)")
+    parser.add_argument("--metrics-textfile", type=str, default=None, metavar="FILE",
+                        help="Where to write the metrics for the Prometheus textfile collector (default: next to the report, .prom)")
+    add_fake_backend_arguments(parser)
 
     args = parser.parse_args()
 
@@ -40,6 +117,12 @@ def main():
 
     # Determine the full output path
     output_full_path = os.path.abspath(args.output)
+    if args.format == "ndjson" and output_full_path.endswith(".json"):
+        output_full_path = output_full_path[:-len(".json")] + ".ndjson"
+
+    # The journal of completed LLM outputs is shared by every run writing to the same --output
+    base, _ = os.path.splitext(output_full_path)
+    journal_path = base + ".journal.jsonl"
 
     # Generate the next available report filename
     output_full_path = get_next_report_filename(output_full_path)
@@ -49,32 +132,246 @@ def main():
     if output_dir and not os.path.exists(output_dir):
         os.makedirs(output_dir)
 
-    # Perform analysis
-    analyzer = Analyzer(project_path=args.project_path, tags=args.tags)
-    analyzer.analyze()
-    comments = analyzer.get_comments()
+    # Counters, stage timings and request latencies, written out however the run ends. Like the journal, they
+    # are named after --output rather than the numbered report, so each run replaces the metrics of the last one
+    # and a textfile collector never sees the same series in several files.
+    metrics_path = args.metrics_json or base + ".metrics.json"
+    textfile_path = args.metrics_textfile or base + ".prom"
+    # Files written next to the report, never analyzed even if the report is saved inside the project
+    output_files = [output_full_path, journal_path, metrics_path, textfile_path]
+    metrics = Metrics()
+    try:
+        with metrics.timer("total"):
+            run(args, output_full_path, output_dir, journal_path, metrics, output_files)
+    finally:
+        metrics.write(metrics_path, textfile_path)
+        print(f"Metrics written to {metrics_path} and {textfile_path}")
+
+def run(args: argparse.Namespace, output_full_path: str, output_dir: str, journal_path: str, metrics: Metrics,
+        output_files: List[str]):
+    """
+    Runs the analysis and the LLM stage, recording their metrics.
+    """
+    if args.watch:
+        run_watch(args, output_full_path, output_dir, journal_path, metrics, output_files)
+        return
+
+    # Restrict the analysis to the files touched in git, if requested
+    scoped_files = None
+    if args.since or args.staged:
+        from src.git_scope import changed_files
 
+        try:
+            scoped_files = changed_files(args.project_path, since=args.since, staged=args.staged)
+        except RuntimeError as e:
+            print(f"Error: {e}")
+            exit(1)
+        print(f"Analyzing {len(scoped_files)} changed files.")
+
+    cache = open_analysis_cache(args, output_dir)
+    walker = build_walker(args, output_dir, output_files)
+
+    # In pipelined mode, each file's findings go to the LLM while the scan carries on
+    assistant, pipeline = None, None
+    llm_stage = not (args.scan_only or args.export_batch or args.import_results)
+    if args.pipeline and llm_stage:
+        from src.pipeline import Pipeline
+
+        assistant = build_assistant(args, output_full_path, output_dir, journal_path, metrics)
+        pipeline = Pipeline(assistant, queue_size=args.pipeline_queue_size)
+        pipeline.start()
+
+    # Perform analysis, writing findings to the report as they are found
+    analyzer = Analyzer(project_path=args.project_path, tags=args.tags, jobs=args.jobs, cache=cache,
+                        paths=scoped_files, walker=walker, metrics=metrics)
     try:
-        with open(output_full_path, 'w', encoding='utf-8') as f:
-            json.dump(comments, f, indent=4)
-        print(f"Analysis complete. Report saved to {output_full_path}")
+        with metrics.timer("analysis"), open_report_writer(output_full_path, args.format) as writer:
+            for comments in analyzer.iter_file_comments():
+                findings = [comment.to_dict() for comment in comments]
+                with metrics.timer("report_write"):
+                    for finding in findings:
+                        writer.write(finding)
+                if pipeline is not None and findings:
+                    pipeline.submit(findings[0]["file"], findings)
+        print(f"Analysis complete. {writer.count} findings saved to {output_full_path}")
     except Exception as e:
         print(f"Error writing report to '{output_full_path}': {e}")
         exit(1)
+    finally:
+        metrics.inc("dirs_skipped", walker.skipped_dirs)
+        if cache is not None:
+            cache.close()
+            print(f"Analysis cache: {cache.hits} hits, {cache.misses} misses")
+
+    if args.scan_only:
+        return
+    if assistant is None:
+        assistant = build_assistant(args, output_full_path, output_dir, journal_path, metrics)
+    run_llm_stage(args, assistant, pipeline, scoped_files)
+
+def open_analysis_cache(args: argparse.Namespace, output_dir: str) -> Optional["AnalysisCache"]:
+    """
+    Opens the cache reusing the results of previous runs for unchanged files, unless disabled.
+    """
+    if args.no_analysis_cache:
+        return None
+    from src.analysis_cache import AnalysisCache
+
+    cache_path = os.path.join(output_dir, "analysis_cache.sqlite")
+    return AnalysisCache(cache_path, tags=args.tags, hash_contents=args.hash_contents)
+
+def build_walker(args: argparse.Namespace, output_dir: str, output_files: List[str],
+                 prune_paths: Optional[List[str]] = None) -> FileWalker:
+    """
+    Creates the walker listing the files to analyze.
+
+    Previous outputs are never rescanned. An output directory inside the
+    project is pruned whole; when it is the project itself, or outside it,
+    only the `output_files` and the caches of the run are skipped. The
+    `prune_paths` are pruned as well.
+    """
+    prune_paths = list(prune_paths or [])
+    skip_files = []
+    project_root = os.path.realpath(args.project_path)
+    real_output_dir = os.path.realpath(output_dir)
+    if real_output_dir != project_root and os.path.commonpath([project_root, real_output_dir]) == project_root:
+        prune_paths.append(output_dir)
+    else:
+        prune_paths.append(os.path.join(output_dir, "llm_cache"))
+        skip_files = output_files + [os.path.join(output_dir, "analysis_cache.sqlite")]
+    return FileWalker(
+        args.project_path,
+        exclude=args.exclude,
+        include=args.include,
+        prune_paths=prune_paths,
+        use_gitignore=not args.no_gitignore,
+        skip_files=skip_files,
+    )
+
+def run_watch(args: argparse.Namespace, output_full_path: str, output_dir: str, journal_path: str,
+              metrics: Metrics, output_files: List[str]):
+    """
+    Keeps the report up to date until interrupted, sending the files of new tags to the LLM if requested.
+    """
+    from src.watcher import Watcher
+
+    if args.since or args.staged or args.export_batch or args.import_results:
+        print("Error: --watch cannot be combined with --since, --staged, --export-batch or --import-results.")
+        exit(1)
+
+    prune_paths = []
+    assistant, pipeline = None, None
+    if args.watch_llm and not args.scan_only:
+        from src.pipeline import Pipeline
+
+        assistant = build_assistant(args, output_full_path, output_dir, journal_path, metrics)
+        # Outputs saved inside the project must not come back as new findings
+        llm_output_dir = os.path.normpath(assistant.output_path(os.path.abspath(args.project_path)))
+        if llm_output_dir != os.path.normpath(os.path.abspath(args.project_path)):
+            os.makedirs(llm_output_dir, exist_ok=True)
+            prune_paths.append(llm_output_dir)
+        pipeline = Pipeline(assistant, queue_size=args.pipeline_queue_size)
+        pipeline.start()
+
+    cache = open_analysis_cache(args, output_dir)
+    walker = build_walker(args, output_dir, output_files, prune_paths=prune_paths)
+    analyzer = Analyzer(project_path=args.project_path, tags=args.tags, jobs=args.jobs, cache=cache,
+                        walker=walker, metrics=metrics)
+    watcher = Watcher(analyzer, output_full_path, report_format=args.format, interval=args.watch_interval,
+                      pipeline=pipeline, metrics=metrics, poll=args.watch_poll)
+    try:
+        watcher.watch()
+    except KeyboardInterrupt:
+        print("Stopped watching.")
+    finally:
+        if cache is not None:
+            cache.close()
+
+    if assistant is not None:
+        run_llm_stage(args, assistant, pipeline, None)
+
+def build_assistant(args: argparse.Namespace, output_full_path: str, output_dir: str, journal_path: str,
+                    metrics: Metrics) -> "OpenAIAssistant":
+    """
+    Creates the assistant of the LLM stage.
+
+    The LLM client stack is only imported here, so that scan-only runs start fast and need no API key.
+    """
+    from dotenv import load_dotenv # type: ignore
+    from src.fake_llm import fake_backend_from_args
+    from src.journal import Journal
+    from src.openai_assistant import OpenAIAssistant
+    from src.rate_limiter import RateLimiter, RetryPolicy
+    from src.response_cache import ResponseCache
+
+    load_dotenv()
 
     # Get OpenAI API key from environment
     api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
+    offline = args.export_batch or args.import_results or args.llm_backend == "fake"
+    if not api_key and not offline:
         print("Error: OPENAI_API_KEY not set in environment. Please provide it in a .env file.")
         exit(1)
 
+    # Identical prompts from previous runs are answered from disk
+    response_cache = None
+    if not args.no_cache:
+        response_cache = ResponseCache(
+            os.path.join(output_dir, "llm_cache"),
+            max_bytes=args.llm_cache_size * 1024 * 1024,
+            refresh=args.refresh,
+        )
+
     # Process results with OpenAIAssistant
-    assistant = OpenAIAssistant(
+    return OpenAIAssistant(
         api_key=api_key,
         results_path=output_full_path,
         verbose=args.verbose,
+        concurrency=args.llm_concurrency,
+        pool_size=args.llm_pool_size,
+        timeout=args.llm_timeout,
+        keepalive_expiry=args.llm_keepalive,
+        rate_limiter=RateLimiter(requests_per_minute=args.rpm, tokens_per_minute=args.tpm),
+        retry_policy=RetryPolicy(max_retries=args.max_retries),
+        response_cache=response_cache,
+        max_prompt_tokens=args.max_prompt_tokens,
+        batch_token_target=args.batch_token_target or None,
+        max_files_per_request=args.max_files_per_request,
+        backend=fake_backend_from_args(args) if args.llm_backend == "fake" else None,
+        base_url=args.base_url,
+        metrics=metrics,
+        journal=Journal(journal_path),
+        resume=args.resume,
+        stream=args.stream,
     )
-    assistant.process_results()
+
+def run_llm_stage(args: argparse.Namespace, assistant: "OpenAIAssistant", pipeline: Optional["Pipeline"],
+                  scoped_files: Optional[List[str]]):
+    """
+    Sends the findings to the LLM and saves the responses, or waits for the pipeline to finish doing so.
+    """
+    try:
+        if pipeline is not None:
+            pipeline.finish()
+        elif args.export_batch:
+            count = assistant.export_batch(args.export_batch, files=scoped_files)
+            print(f"Exported {count} requests to {args.export_batch}")
+        elif args.import_results:
+            try:
+                assistant.import_results(args.import_results, files=scoped_files)
+            except (OSError, ValueError) as e:
+                print(f"Error importing batch results: {e}")
+                exit(1)
+        else:
+            assistant.process_results(files=scoped_files)
+    finally:
+        assistant.close()
+        if assistant.response_cache is not None:
+            cache = assistant.response_cache
+            print(f"LLM response cache: {cache.hits} hits, {cache.misses} misses")
+    if assistant.failures:
+        print(f"Error: {len(assistant.failures)} files could not be processed.")
+        exit(1)
 
 if __name__ == "__main__":
     main()
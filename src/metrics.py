@@ -0,0 +1,150 @@
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List
+from src.atomic_file import write_atomic
+
+# Prefix of the exported Prometheus metric names
+METRIC_PREFIX = "refactoring_ai"
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Histogram:
+    """
+    Keeps every observed value to report exact quantiles; runs observe at most a few thousand requests.
+    """
+
+    def __init__(self):
+        self.values: List[float] = []
+        self.total = 0.0
+
+    def observe(self, value: float):
+        self.values.append(value)
+        self.total += value
+
+    def quantile(self, q: float) -> float:
+        """
+        Returns the nearest-rank quantile of the observed values, or 0 without observations.
+        """
+        if not self.values:
+            return 0.0
+        ordered = sorted(self.values)
+        return ordered[max(math.ceil(q * len(ordered)) - 1, 0)]
+
+    def summary(self) -> Dict:
+        summary = {"count": len(self.values), "sum": round(self.total, 6)}
+        for q in QUANTILES:
+            summary[f"p{round(q * 100)}"] = round(self.quantile(q), 6)
+        return summary
+
+
+class Metrics:
+    """
+    Thread-safe counters, cumulative stage timings and latency histograms of a run.
+
+    Timings add up: a stage entered several times (e.g. parsing each file)
+    reports its total wall time. Worker processes collect their own metrics and
+    hand them back with `take` to be merged into the parent's.
+    """
+
+    def __init__(self):
+        self.counters: Dict[str, float] = {}
+        self.timings: Dict[str, float] = {}
+        self.histograms: Dict[str, Histogram] = {}
+        self.lock = threading.Lock()
+
+    def inc(self, name: str, amount: float = 1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def add_time(self, stage: str, seconds: float):
+        with self.lock:
+            self.timings[stage] = self.timings.get(stage, 0.0) + seconds
+
+    def observe(self, name: str, value: float):
+        with self.lock:
+            self.histograms.setdefault(name, Histogram()).observe(value)
+
+    @contextmanager
+    def timer(self, stage: str) -> Iterator[None]:
+        """
+        Adds the wall time spent in the block to the stage.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - start)
+
+    def timed_iter(self, stage: str, iterable: Iterable) -> Iterator:
+        """
+        Yields from the iterable, adding the time spent producing each item to the stage.
+        """
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add_time(stage, time.perf_counter() - start)
+                return
+            self.add_time(stage, time.perf_counter() - start)
+            yield item
+
+    def take(self) -> Dict:
+        """
+        Returns the counters and timings collected so far and resets them.
+        """
+        with self.lock:
+            taken = {"counters": self.counters, "timings": self.timings}
+            self.counters, self.timings = {}, {}
+        return taken
+
+    def merge(self, taken: Dict):
+        """
+        Adds counters and timings returned by `take`, e.g. from a worker process.
+        """
+        for name, amount in taken["counters"].items():
+            self.inc(name, amount)
+        for stage, seconds in taken["timings"].items():
+            self.add_time(stage, seconds)
+
+    def to_dict(self) -> Dict:
+        with self.lock:
+            return {
+                "counters": dict(sorted(self.counters.items())),
+                "stage_seconds": {stage: round(seconds, 6) for stage, seconds in sorted(self.timings.items())},
+                "histograms": {name: histogram.summary() for name, histogram in sorted(self.histograms.items())},
+            }
+
+    def to_prometheus(self) -> str:
+        """
+        Renders the metrics in the Prometheus text exposition format.
+        """
+        summary = self.to_dict()
+        lines = []
+        for name, value in summary["counters"].items():
+            metric = f"{METRIC_PREFIX}_{name}_total"
+            lines += [f"# TYPE {metric} counter", f"{metric} {value:g}"]
+        if summary["stage_seconds"]:
+            metric = f"{METRIC_PREFIX}_stage_seconds"
+            lines.append(f"# TYPE {metric} gauge")
+            lines += [f'{metric}{{stage="{stage}"}} {seconds:g}' for stage, seconds in summary["stage_seconds"].items()]
+        for name, histogram in summary["histograms"].items():
+            metric = f"{METRIC_PREFIX}_{name}"
+            lines.append(f"# TYPE {metric} summary")
+            lines += [f'{metric}{{quantile="{q:g}"}} {histogram[f"p{round(q * 100)}"]:g}' for q in QUANTILES]
+            lines += [f"{metric}_sum {histogram['sum']:g}", f"{metric}_count {histogram['count']}"]
+        return "\n".join(lines) + "\n"
+
+    def write(self, json_path: str, textfile_path: str):
+        """
+        Writes the JSON summary and the Prometheus textfile, each replaced atomically
+        so that a collector never reads a partial file.
+        """
+        write_atomic(json_path, json.dumps(self.to_dict(), indent=4) + "\n")
+        write_atomic(textfile_path, self.to_prometheus())
+
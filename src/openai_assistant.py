@@ -1,18 +1,79 @@
 import os
-import json
+import asyncio
 import logging
-import openai # type: ignore
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, TypeVar
+from src.batch_job import batch_request_line, custom_id, read_batch_results
+from src.atomic_file import open_atomic, write_atomic
+from src.batcher import Batcher, FilePart, parse_file_blocks
+from src.journal import Journal, prompt_hash
+from src.llm_backend import LLMBackend, OpenAIBackend
+from src.metrics import Metrics
+from src.pipeline import FLUSH
 from src.prompt_generator import PromptGenerator  # Adjust import path as necessary
+from src.prompt_request import PromptRequest, Segment
+from src.rate_limiter import RateLimiter, RetryPolicy, is_retryable, retry_after_seconds
+from src.report import load_report
+from src.response_cache import ResponseCache
+from src.tokens import CHARS_PER_TOKEN, estimate_tokens
+from src.windowing import parse_excerpts, stitch
+
+T = TypeVar("T")
 
 class OpenAIAssistant:
-    def __init__(self, results_path: str, api_key: str, model: str = "gpt-4", verbose: bool = False):
+    def __init__(self, results_path: str, api_key: str, model: str = "gpt-4", verbose: bool = False,
+                 concurrency: int = 1, pool_size: int = 10, timeout: float = 120.0, keepalive_expiry: float = 60.0,
+                 rate_limiter: Optional[RateLimiter] = None, retry_policy: Optional[RetryPolicy] = None,
+                 response_cache: Optional[ResponseCache] = None, max_prompt_tokens: Optional[int] = None,
+                 batch_token_target: Optional[int] = None, max_files_per_request: int = 10,
+                 backend: Optional[LLMBackend] = None, base_url: Optional[str] = None,
+                 metrics: Optional[Metrics] = None, journal: Optional[Journal] = None, resume: bool = False,
+                 stream: bool = False):
         self.results_path = results_path
         self.api_key = api_key
         self.output_dir = 'your_project/output'
         self.model = model
         self.verbose = verbose
+        # Maximum number of requests in flight; 1 keeps the sequential path
+        self.concurrency = max(1, concurrency)
+        # Service answering the prompts; by default the OpenAI API through one pooled HTTP client
+        self.backend = backend or OpenAIBackend(
+            api_key=api_key,
+            base_url=base_url,
+            pool_size=max(pool_size, self.concurrency),
+            timeout=timeout,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._lock = threading.Lock()
+        # Prompt counts, retries, cache hits and request latencies of the run
+        self.metrics = metrics or Metrics()
+        # Requests-per-minute / tokens-per-minute budgets and retry behaviour on transient errors
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.retries = 0
+        # Responses of previous runs, keyed by model and prompt
+        self.response_cache = response_cache
+        # Estimated token budget of a single prompt; larger files are sent as windows
+        self.max_prompt_tokens = max_prompt_tokens
+        # Estimated token budget up to which small files are packed together into one request
+        self.batch_token_target = batch_token_target
+        self.max_files_per_request = max_files_per_request
+        # Whole-file answers are streamed straight into their output file instead of buffered
+        self.stream = stream
         self.results = []
         self.batched_prompts = {}
+        self.requests: List[PromptRequest] = []
+        # Excerpts received so far for files split into windows, until all of them are in
+        self._pending_excerpts: Dict[str, Dict] = {}
+        self.failures: Dict[str, Exception] = {}
+        # Records every saved file; with `resume`, files journaled with the same prompts are skipped
+        self.journal = journal
+        self.resume = resume and journal is not None
+        if self.resume:
+            journal.load()
         logging.basicConfig(level=logging.DEBUG if verbose else logging.INFO)
         self.logger = logging.getLogger(__name__)
         self.logger.info(f"Initialized OpenAIAssistant with model: {self.model}")
@@ -20,34 +81,41 @@ class OpenAIAssistant:
     def load_results(self):
         if not os.path.exists(self.results_path):
             raise FileNotFoundError(f"Results file {self.results_path} does not exist.")
-        with open(self.results_path, 'r', encoding='utf-8') as f:
-            self.results = json.load(f)
+        self.results = load_report(self.results_path)
         self.logger.info(f"Loaded results from {self.results_path}")
 
-    def batch_prompts_by_file(self):
+    def batch_prompts_by_file(self, files: Optional[Iterable[str]] = None):
         """
         Groups all tags for the same file and generates a single prompt per file.
+
+        Args:
+            files (Optional[Iterable[str]]): Only batch results for these files, if given.
         """
+        selected = set(files) if files is not None else None
         for result in self.results:
-            file_path = result["file"]
-            line_number = result["line_number"]
-            tags = result.get("tags", [])
-            context = result.get("context", [])
-
-            if file_path not in self.batched_prompts:
-                self.batched_prompts[file_path] = {
-                    "lines": [],
-                    "tags": [],
-                    "context": [],
-                    "full_content": self._load_file_content(file_path)
-                }
-
-            self.batched_prompts[file_path]["lines"].append(line_number)
-            self.batched_prompts[file_path]["tags"].extend(tags)
-            self.batched_prompts[file_path]["context"].extend(context)
+            if selected is not None and result["file"] not in selected:
+                continue
+            self._add_result(result)
 
         self.logger.info(f"Batched prompts for {len(self.batched_prompts)} files.")
 
+    def _add_result(self, result: Dict):
+        """
+        Adds a single analysis result to the batch of its file.
+        """
+        file_path = result["file"]
+        if file_path not in self.batched_prompts:
+            self.batched_prompts[file_path] = {
+                "lines": [],
+                "tags": [],
+                "context": [],
+                "full_content": self._load_file_content(file_path)
+            }
+
+        self.batched_prompts[file_path]["lines"].append(result["line_number"])
+        self.batched_prompts[file_path]["tags"].extend(result.get("tags", []))
+        self.batched_prompts[file_path]["context"].extend(result.get("context", []))
+
     def _load_file_content(self, file_path: str) -> str:
         """
         Loads the full content of the file.
@@ -64,72 +132,474 @@ class OpenAIAssistant:
     def generate_batched_prompts(self):
         """
         Generates prompts for each batch (grouped by file).
+
+        With a batch token target, files small enough to fit are packed
+        together into multi-file requests instead of one request each.
+        """
+        generator = PromptGenerator(self.results_path, metrics=self.metrics)
+        small_files: List[FilePart] = []
+        requests: List[PromptRequest] = []
+        for file_path in self.batched_prompts:
+            small_file = self._generate_file_requests(generator, file_path)
+            if small_file is not None:
+                small_files.append(small_file)
+            else:
+                requests.extend(self.batched_prompts[file_path]["requests"])
+        if small_files:
+            requests.extend(self._pack(generator, small_files))
+        self._add_requests(requests)
+        self.logger.info(f"Generated {len(self.requests)} prompts for {len(self.batched_prompts)} files.")
+
+    def _generate_file_requests(self, generator: PromptGenerator, file_path: str) -> Optional[FilePart]:
         """
-        generator = PromptGenerator(self.results_path)
-        for file_path, batch in self.batched_prompts.items():
-            prompt = generator.generate_batched_prompt(
-                file_path=file_path,
-                lines=batch["lines"],
-                tags=batch["tags"],
-                context=batch["context"],
-                full_content=batch["full_content"]
-            )
-            batch["prompt"] = prompt
-        self.logger.info("Generated batched prompts for all files.")
+        Generates the requests of a file's batch.
+
+        Returns:
+            Optional[FilePart]: The file, if it is small enough to be packed with others instead.
+        """
+        batch = self.batched_prompts[file_path]
+        batch["requests"] = generator.generate_file_requests(
+            file_path=file_path,
+            lines=batch["lines"],
+            tags=batch["tags"],
+            context=batch["context"],
+            full_content=batch["full_content"],
+            max_prompt_tokens=self.max_prompt_tokens
+        )
+        batch["prompt"] = batch["requests"][0].prompt
+        batch["prompt_hash"] = prompt_hash(self.model, [request.prompt for request in batch["requests"]])
+        if self.resume and self.journal.is_done(file_path, batch["prompt_hash"]):
+            self.logger.info(f"Skipping {file_path}: already processed with the same prompts.")
+            self.metrics.inc("files_resumed")
+            batch["requests"] = []
+            return None
+        windows = [window for request in batch["requests"]
+                   for segment in request.segments if segment.windows for window in segment.windows]
+        if windows:
+            self._pending_excerpts[file_path] = {"windows": set(windows), "replacements": {}}
+        elif self.batch_token_target and estimate_tokens(batch["prompt"]) <= self.batch_token_target:
+            return FilePart(file_path, batch["lines"], batch["tags"], batch["full_content"])
+        return None
+
+    def _pack(self, generator: PromptGenerator, small_files: List[FilePart]) -> List[PromptRequest]:
+        packed = Batcher(generator, self.batch_token_target, self.max_files_per_request).pack(small_files)
+        for request in packed:
+            for file_path in request.files:
+                self.batched_prompts[file_path]["requests"] = [request]
+                self.batched_prompts[file_path]["prompt"] = request.prompt
+        self.logger.info(f"Packed {len(small_files)} small files into {len(packed)} requests.")
+        return packed
+
+    def _add_requests(self, requests: List[PromptRequest]):
+        self.requests.extend(requests)
+        self.metrics.inc("prompts", len(requests))
+        self.metrics.inc("prompt_tokens_estimated", sum(estimate_tokens(request.prompt) for request in requests))
 
     def send_to_openai(self, prompt: str) -> str:
         """
         Sends the given prompt to the OpenAI API and returns the response.
         """
-        openai.api_key = self.api_key
         if isinstance(prompt, list):
             # Combine the list into a single string
             prompt = "\n".join(prompt)
 
+        cache_key, cached = self._lookup_cache(prompt)
+        if cached is not None:
+            return cached
+
         self.logger.info("Sending prompt to OpenAI...")
-        try:
-            response = openai.Client().chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}]
-            )
-
-            # Access the response correctly using attributes
-            message = response.choices[0].message.content
-            self.logger.info("Received response from OpenAI.")
-            return message
-        except Exception as e:
-            error_message = f"Error communicating with OpenAI: {e}"
-            self.logger.error(error_message)
-            raise RuntimeError(error_message)
+        message = self._call_with_retries(prompt, lambda: self.backend.complete(self.model, prompt))
+        self.logger.info("Received response from OpenAI.")
+        if cache_key is not None and message is not None:
+            self.response_cache.put(cache_key, message)
+        return message
+
+    def _lookup_cache(self, prompt: str) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Returns the cache key of a prompt and its cached response, if any.
+        """
+        if self.response_cache is None:
+            return None, None
+        cache_key = self.response_cache.key(self.model, prompt)
+        cached = self.response_cache.get(cache_key)
+        if cached is not None:
+            self.metrics.inc("llm_cache_hits")
+            self.logger.info("Using cached response.")
+        else:
+            self.metrics.inc("llm_cache_misses")
+        return cache_key, cached
 
+    def stream_to_file(self, prompt: str, output_path: str):
+        """
+        Sends the given prompt and writes the answer to a file as it is generated.
 
-    def save_response(self, file_path: str, response: str):
+        Chunks go to a temporary file, renamed over `output_path` once the
+        stream completes; a stream broken midway is discarded and retried
+        like any other failed request. Records the time to the first token and
+        the generation speed of each request.
         """
-        Saves the API response to a file in the output directory.
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        cache_key, cached = self._lookup_cache(prompt)
+        if cached is not None:
+            write_atomic(output_path, cached)
+            return
+
+        self.logger.info("Streaming prompt to OpenAI...")
+        self._call_with_retries(prompt, lambda: self._stream_attempt(prompt, output_path))
+        self.logger.info(f"Streamed response to {output_path}")
+        if cache_key is not None:
+            self.response_cache.put_file(cache_key, output_path)
+
+    def _stream_attempt(self, prompt: str, output_path: str):
+        start = time.perf_counter()
+        first_token = None
+        characters = 0
+        with open_atomic(output_path) as f:
+            for chunk in self.backend.stream(self.model, prompt):
+                if first_token is None:
+                    first_token = time.perf_counter()
+                    self.metrics.observe("llm_time_to_first_token_seconds", first_token - start)
+                f.write(chunk)
+                characters += len(chunk)
+        generation_seconds = time.perf_counter() - (first_token or start)
+        if generation_seconds > 0:
+            self.metrics.observe("llm_tokens_per_second", characters / CHARS_PER_TOKEN / generation_seconds)
+
+    def _call_with_retries(self, prompt: str, call: Callable[[], T]) -> T:
+        """
+        Makes one request with `call` within the rate limits, retrying transient errors.
+        """
+        # The completion is usually a rewrite of the prompted code, so budget for it as well
+        estimated_tokens = 2 * estimate_tokens(prompt)
+
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire(estimated_tokens)
+            self.metrics.inc("llm_requests")
+            start = time.perf_counter()
+            try:
+                result = call()
+                self.metrics.observe("llm_request_seconds", time.perf_counter() - start)
+                return result
+            except Exception as e:
+                self.metrics.observe("llm_request_seconds", time.perf_counter() - start)
+                if attempt >= self.retry_policy.max_retries or not self._is_retryable(e):
+                    self.metrics.inc("llm_errors")
+                    error_message = f"Error communicating with the LLM backend: {e}"
+                    self.logger.error(error_message)
+                    raise RuntimeError(error_message)
+                retry_after = retry_after_seconds(e)
+                delay = self.retry_policy.delay(attempt, retry_after)
+                if retry_after is not None:
+                    # The limit is shared by the whole account, so hold back every request
+                    self.rate_limiter.pause(delay)
+                self.logger.warning(f"Transient error from OpenAI ({e}); retry {attempt + 1} in {delay:.1f}s")
+                with self._lock:
+                    self.retries += 1
+                self.metrics.inc("retries")
+                attempt += 1
+                time.sleep(delay)
+
+    def _is_retryable(self, error: Exception) -> bool:
+        return is_retryable(error) or self.backend.is_retryable(error)
+
+    def send_prompt(self, prompt: str) -> Dict:
+        """
+        Sends the given prompt through the shared client and returns the response
+        in the chat-completion dictionary layout used by `Assistant`.
+        """
+        content = self.send_to_openai(prompt)
+        return {"choices": [{"message": {"content": content}}]}
+
+    def close(self):
+        """
+        Closes the pooled connections of the backend and the journal.
+        """
+        self.backend.close()
+        if self.journal is not None:
+            self.journal.close()
+
+
+    def output_path(self, file_path: str) -> str:
+        """
+        Returns where the response for a file is saved in the output directory.
         """
         # Ensure the file path is relative to the project root
         relative_path = os.path.relpath(file_path, start="/app/project")
-        
+
         # Map the relative path to the host's output directory
-        host_output_path = os.path.join("/app/project/output", relative_path)
+        return os.path.join("/app/project/output", relative_path)
+
+    def save_response(self, file_path: str, response: str):
+        """
+        Saves the API response to a file in the output directory.
+
+        The file is replaced atomically, so an interrupted run never leaves a partial output behind.
+        """
+        host_output_path = self.output_path(file_path)
 
         # Ensure the directory structure exists
         os.makedirs(os.path.dirname(host_output_path), exist_ok=True)
-        with open(host_output_path, 'w', encoding='utf-8') as f:
-            f.write(response)
+        write_atomic(host_output_path, response)
         self.logger.info(f"Saved response to {host_output_path}")
 
-    def process_results(self):
+    def _complete(self, file_path: str, content: str):
         """
-        Processes results: generates batched prompts, sends them to OpenAI, and saves the responses.
+        Saves the output of a file, then journals it as done.
+        """
+        self.save_response(file_path, content)
+        self._journal_done(file_path)
+
+    def _journal_done(self, file_path: str):
+        prompt_digest = self.batched_prompts.get(file_path, {}).get("prompt_hash")
+        if self.journal is not None and prompt_digest is not None:
+            self.journal.record(file_path, prompt_digest, self.output_path(file_path))
+
+    def prepare_requests(self, files: Optional[Iterable[str]] = None):
+        """
+        Loads the results and generates the requests to send, without sending them.
         """
         self.load_results()
-        self.batch_prompts_by_file()
-        self.generate_batched_prompts()
+        with self.metrics.timer("prompt_generation"):
+            self.batch_prompts_by_file(files)
+            self.generate_batched_prompts()
+
+    def export_batch(self, batch_path: str, files: Optional[Iterable[str]] = None) -> int:
+        """
+        Writes every request as a line of a JSONL batch-request file, to be run as an offline batch job.
+
+        Each line carries a custom ID derived from the model and prompt, so the
+        results can be mapped back by `import_results` as long as the analyzed
+        files do not change in between.
+
+        Args:
+            batch_path (str): Path of the batch-request file to write.
+            files (Optional[Iterable[str]]): Restrict the export to these files.
+
+        Returns:
+            int: The number of exported requests.
+        """
+        self.prepare_requests(files)
+        with open(batch_path, 'w', encoding='utf-8') as f:
+            for request in self.requests:
+                f.write(batch_request_line(custom_id(self.model, request.prompt), self.model, request.prompt))
+        self.logger.info(f"Exported {len(self.requests)} requests to {batch_path}")
+        return len(self.requests)
+
+    def import_results(self, results_file: str, files: Optional[Iterable[str]] = None):
+        """
+        Saves the responses of a completed batch job exported by `export_batch`.
+
+        The requests are generated again from the report and matched to the
+        results by custom ID. Files whose request failed, or has no result, are
+        recorded in `failures`.
+
+        Args:
+            results_file (str): Path of the JSONL output file of the batch job.
+            files (Optional[Iterable[str]]): Restrict the import to these files.
+        """
+        self.prepare_requests(files)
+        requests = {custom_id(self.model, request.prompt): request for request in self.requests}
+        answered = set()
+        for result in read_batch_results(results_file):
+            request = requests.get(result.custom_id)
+            if request is None:
+                self.logger.warning(f"Ignoring result {result.custom_id}: no matching request, the files may have changed.")
+                continue
+            answered.add(result.custom_id)
+            if result.error is not None:
+                self.logger.error(f"Batch request for {', '.join(request.files)} failed: {result.error}")
+                for file_path in request.files:
+                    self.failures[file_path] = RuntimeError(result.error)
+                continue
+            if self.response_cache is not None:
+                self.response_cache.put(self.response_cache.key(self.model, request.prompt), result.content)
+            self.handle_response(request, result.content)
+
+        for request_id, request in requests.items():
+            if request_id not in answered:
+                for file_path in request.files:
+                    self.failures[file_path] = RuntimeError(f"No batch result for request {request_id}")
+        if self.failures:
+            self.logger.error(f"Import finished with {len(self.failures)} failed files: {', '.join(self.failures)}")
+        self.logger.info(f"Imported {len(answered)} batch results from {results_file}")
+
+    def process_results(self, files: Optional[Iterable[str]] = None):
+        """
+        Processes results: generates batched prompts, sends them to OpenAI, and saves the responses.
+
+        Args:
+            files (Optional[Iterable[str]]): Restrict processing to these files, e.g. those changed in a diff.
+        """
+        self.prepare_requests(files)
+
+        with self.metrics.timer("dispatch"):
+            if self.concurrency > 1:
+                self.failures.update(asyncio.run(self.dispatch_async()))
+            else:
+                for request in self.requests:
+                    if self._streams(request):
+                        self.stream_request(request)
+                    else:
+                        self.handle_response(request, self.send_to_openai(request.prompt))
+
+        if self.failures:
+            self.logger.error(f"Processing finished with {len(self.failures)} failed files: {', '.join(self.failures)}")
+        self.logger.info("Processing of results completed.")
+
+    def _streams(self, request: PromptRequest) -> bool:
+        """
+        Tells whether the answer to a request is streamed to disk: only whole-file
+        answers are, since packed and windowed ones must be parsed in full first.
+        """
+        return self.stream and len(request.segments) == 1 and request.segments[0].windows is None
 
-        for file_path, batch in self.batched_prompts.items():
-            prompt = batch["prompt"]
-            response = self.send_to_openai(prompt)
-            self.save_response(file_path, response)
+    def stream_request(self, request: PromptRequest):
+        """
+        Streams the answer to a whole-file request into the file's output.
+        """
+        file_path = request.segments[0].file_path
+        self.stream_to_file(request.prompt, self.output_path(file_path))
+        self._journal_done(file_path)
+
+    def handle_response(self, request: PromptRequest, response: str):
+        """
+        Saves the response of a request: directly for whole files, split per file
+        for packed requests, or once all windows of a split file have been
+        answered, stitched into the original content.
+        """
+        if len(request.segments) > 1:
+            self._split_packed_response(request, response)
+            return
+        for segment in request.segments:
+            if segment.windows is None:
+                self._complete(segment.file_path, response)
+            else:
+                self._collect_excerpts(segment, response)
+
+    def _split_packed_response(self, request: PromptRequest, response: str):
+        blocks = parse_file_blocks(response)
+        for file_path in request.files:
+            content = blocks.get(file_path)
+            if content is None:
+                error_message = f"Response of a packed request lacks the file {file_path}"
+                self.logger.error(error_message)
+                self.failures[file_path] = RuntimeError(error_message)
+            else:
+                self._complete(file_path, content)
+
+    def _collect_excerpts(self, segment: Segment, response: str):
+        pending = self._pending_excerpts[segment.file_path]
+        excerpts = parse_excerpts(response)
+        for window in segment.windows:
+            body = excerpts.get((window.start, window.end))
+            if body is None:
+                self.logger.warning(
+                    f"Response for {segment.file_path} lacks lines {window.start}-{window.end}; keeping them unchanged."
+                )
+            else:
+                pending["replacements"][(window.start, window.end)] = body
+            pending["windows"].discard(window)
+
+        if not pending["windows"]:
+            full_content = self.batched_prompts[segment.file_path]["full_content"]
+            self._complete(segment.file_path, stitch(full_content, pending["replacements"]))
+            del self._pending_excerpts[segment.file_path]
+
+    async def dispatch_async(self) -> Dict[str, Exception]:
+        """
+        Sends the prepared requests with up to `concurrency` requests in flight.
+
+        Each response is saved as soon as it arrives. A failure only affects its
+        own file: it is logged and returned, and the other requests carry on.
+
+        Returns:
+            Dict[str, Exception]: The error of every file that could not be processed.
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        failures: Dict[str, Exception] = {}
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="openai") as executor:
+            async def dispatch(request: PromptRequest):
+                async with semaphore:
+                    await self._dispatch_request(loop, executor, request, failures)
+
+            await asyncio.gather(*(dispatch(request) for request in self.requests))
+        return failures
+
+    async def dispatch_stream(self, batches: "queue.Queue") -> Dict[str, Exception]:
+        """
+        Generates and sends the requests of each file as its findings arrive, while the scan is still running.
+
+        `batches` yields `(file_path, findings)` tuples and ends with None. A
+        new batch is only taken once a request slot is free, so a bounded queue
+        makes the scan wait whenever dispatch falls behind. Small files are
+        collected until enough of them fill a packed request, or until `FLUSH`
+        is received.
 
-        self.logger.info("Processing of results completed.")
\ No newline at end of file
+        Returns:
+            Dict[str, Exception]: The error of every file that could not be processed.
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        failures: Dict[str, Exception] = {}
+        generator = PromptGenerator(self.results_path, metrics=self.metrics)
+        small_files: List[FilePart] = []
+        tasks = []
+
+        # One more thread than requests in flight, to wait on the queue
+        with ThreadPoolExecutor(max_workers=self.concurrency + 1, thread_name_prefix="openai") as executor:
+            async def dispatch(requests: List[PromptRequest]):
+                self._add_requests(requests)
+                for request in requests:
+                    await semaphore.acquire()
+                    task = asyncio.ensure_future(self._dispatch_request(loop, executor, request, failures))
+                    task.add_done_callback(lambda _: semaphore.release())
+                    tasks.append(task)
+
+            while True:
+                batch = await loop.run_in_executor(executor, batches.get)
+                if batch is None:
+                    break
+                if batch == FLUSH:
+                    if small_files:
+                        await dispatch(self._pack(generator, small_files))
+                        small_files = []
+                    continue
+                file_path, findings = batch
+                try:
+                    # A file submitted again, e.g. after an edit, is prepared afresh
+                    self.batched_prompts.pop(file_path, None)
+                    for result in findings:
+                        self._add_result(result)
+                    small_file = self._generate_file_requests(generator, file_path)
+                except Exception as e:
+                    self.logger.error(f"Failed to prepare {file_path}: {e}")
+                    failures[file_path] = e
+                    continue
+                if small_file is None:
+                    await dispatch(self.batched_prompts[file_path]["requests"])
+                    continue
+                small_files.append(small_file)
+                pending_tokens = sum(estimate_tokens(part.full_content) for part in small_files)
+                if pending_tokens >= self.batch_token_target or len(small_files) >= self.max_files_per_request:
+                    await dispatch(self._pack(generator, small_files))
+                    small_files = []
+            if small_files:
+                await dispatch(self._pack(generator, small_files))
+            await asyncio.gather(*tasks)
+        return failures
+
+    async def _dispatch_request(self, loop: asyncio.AbstractEventLoop, executor: ThreadPoolExecutor,
+                                request: PromptRequest, failures: Dict[str, Exception]):
+        try:
+            if self._streams(request):
+                await loop.run_in_executor(executor, self.stream_request, request)
+            else:
+                response = await loop.run_in_executor(executor, self.send_to_openai, request.prompt)
+                self.handle_response(request, response)
+        except Exception as e:
+            self.logger.error(f"Failed to process {', '.join(request.files)}: {e}")
+            for file_path in request.files:
+                failures[file_path] = e
@@ -1,91 +1,263 @@
+import os
 import re
-from abc import ABC, abstractmethod
-from typing import List
+import sys
+from abc import ABC
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from src.line_index import LineIndex
+
+# Bump whenever parsing or tag matching changes the extracted comments, to invalidate cached analyses
+PARSER_VERSION = 3
+
+# Possessive quantifier suffix, supported from Python 3.11. The lexer matches
+# the same text with plain greedy quantifiers, since its tokens never overlap
+# and its comment group is optional, so it never needs to backtrack; possessive
+# ones only save the engine from recording backtracking points.
+POSSESSIVE = '+' if sys.version_info >= (3, 11) else ''
+
+
+class CommentSpan(NamedTuple):
+    """
+    A single comment line together with its position in the file.
+    """
+    text: str
+    offset: int
+    line_number: int
+
+
+class LexerSpec(NamedTuple):
+    """
+    Comment and string syntax of a language, from which its lexer is built.
+
+    `block_comment` is an (opening, closing, escapes) triple. Strings are
+    (delimiter, multiline) pairs; backslashes escape the next character in
+    every string, and a string that is not multiline ends at the end of its
+    line even if unterminated, so that a stray quote cannot swallow the rest
+    of the file.
+    """
+    line_comments: Tuple[str, ...]
+    block_comment: Tuple[str, str, bool]
+    strings: Tuple[Tuple[str, bool], ...]
+
+
+def _delimited(delimiter: str, escapes: bool, multiline: bool) -> str:
+    """
+    Returns a pattern for the body of a literal up to `delimiter`, excluded.
+    """
+    first, rest = re.escape(delimiter[0]), delimiter[1:]
+    excluded = first + (r'\\' if escapes else '') + ('' if multiline else r'\n')
+    specials = []
+    if escapes:
+        specials.append(r'\\[\s\S]')
+    if rest:
+        # The first character of a multi-character delimiter alone does not end the literal
+        specials.append(first + f'(?!{re.escape(rest)})')
+    normal = f'[^{excluded}]*{POSSESSIVE}'
+    if not specials:
+        return normal
+    return f'{normal}(?:(?:{"|".join(specials)}){normal})*{POSSESSIVE}'
+
+
+def _not_opening(char: str, openers: Tuple[str, ...]) -> str:
+    """
+    Returns a guard ensuring that no comment starts at a position holding `char`.
+    """
+    clashing = [re.escape(opener) for opener in openers if opener[0] == char]
+    return f'(?!{"|".join(clashing)})' if clashing else ''
+
+
+def build_lexer(spec: LexerSpec) -> re.Pattern:
+    """
+    Compiles the lexer of a language into a single pattern, matched from the start of a line.
+
+    A match skips code and whole string literals up to the next comment on
+    the line, which is captured by the `line` or `block` group; neither is set
+    if the line holds no comment. Since strings are consumed with their
+    escapes, comment markers inside them are never mistaken for comments, nor
+    quotes inside comments for strings. Multi-line strings and block comments
+    are consumed whole, past the end of the line. The lexer never
+    backtracks; its quantifiers are possessive where supported.
+    """
+    opening, closing, escapes = spec.block_comment
+    openers = spec.line_comments + (opening,)
+    specials = {opener[0] for opener in openers} | {delimiter[0] for delimiter, _ in spec.strings}
+    tokens = [f"[^{''.join(re.escape(char) for char in sorted(specials))}\\n]+{POSSESSIVE}"]
+    # Longer delimiters first, so that e.g. a triple quote is not read as an empty string
+    for delimiter, multiline in sorted(spec.strings, key=lambda string: -len(string[0])):
+        end = re.escape(delimiter) + (r'|\Z' if multiline else r'|(?=\n)|\Z')
+        tokens.append(_not_opening(delimiter[0], openers) + re.escape(delimiter)
+                      + _delimited(delimiter, True, multiline) + f'(?:{end})')
+    # Any other special character, e.g. a slash dividing numbers in JavaScript
+    for char in sorted(specials - {delimiter[0] for delimiter, _ in spec.strings} - set(openers)):
+        tokens.append(_not_opening(char, openers) + re.escape(char))
+    code = f'(?:{"|".join(tokens)})*{POSSESSIVE}'
+    line = (rf'(?:{"|".join(re.escape(prefix) for prefix in spec.line_comments)})[^\S\n]*{POSSESSIVE}'
+            + rf'(?P<line>[^\n]*{POSSESSIVE})')
+    block = re.escape(opening) + f'(?P<block>{_delimited(closing, escapes, True)})' + re.escape(closing)
+    return re.compile(f'{code}(?:{line}|{block})?')
+
 
 # Abstract Base Class for Parsers
 class Parser(ABC):
     """
-    Abstract base class for parsers. Implements the Template Method pattern.
+    Abstract base class for parsers, driven by the lexer specification of each language.
     """
 
+    # Language-specific syntax, compiled once per class into LEXER, MULTILINE_MARKERS and MARKERS
+    SPEC: LexerSpec
+    LEXER: re.Pattern
+    MULTILINE_MARKERS: Tuple[str, ...]
+    MARKERS: Tuple[str, ...]
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if "SPEC" in cls.__dict__:
+            cls.LEXER = build_lexer(cls.SPEC)
+            # Only these can carry the lexer state over to the next line
+            cls.MULTILINE_MARKERS = cls.SPEC.block_comment[:1] + tuple(
+                delimiter for delimiter, multiline in cls.SPEC.strings if multiline)
+            # Only these can start a comment
+            cls.MARKERS = cls.SPEC.line_comments + cls.MULTILINE_MARKERS
+
+    def iter_comments(self, file_content: str, needles: Optional[Iterable[str]] = None) -> Iterator[re.Match]:
+        """
+        Yields the lexer match of every comment, in order.
+
+        Lines without any marker can hold neither a comment nor the start of a
+        multi-line token, so they are skipped with plain substring searches and
+        the lexer only runs from the start of the lines that have one.
+
+        With `needles`, only the comments holding one of them are needed: lines
+        are then searched for the needles instead of the line comment markers,
+        and comments on lines without any needle may be left out. Lines opening
+        a multi-line token are still lexed, to keep track of strings.
+        """
+        lexer, find = self.LEXER, file_content.find
+        if needles is None:
+            markers = self.MARKERS
+        else:
+            # Tags usually share a prefix such as "@": one search for it is cheaper than one per tag
+            needles = tuple(needles)
+            prefix = os.path.commonprefix(needles)
+            markers = self.MULTILINE_MARKERS + ((prefix,) if prefix else needles)
+        upcoming = [find(marker) for marker in markers]
+        position = 0
+        while True:
+            # Next marker at or after the position, searching again only for the markers left behind
+            candidate = -1
+            for k, found in enumerate(upcoming):
+                if 0 <= found < position:
+                    found = upcoming[k] = find(markers[k], position)
+                if found >= 0 and (candidate < 0 or found < candidate):
+                    candidate = found
+            if candidate < 0:
+                return
+            start = file_content.rfind('\n', position, candidate) + 1 or position
+            match = lexer.match(file_content, start)
+            if match.lastgroup is not None:
+                yield match
+            # Step over an unterminated block comment, which the lexer leaves unmatched
+            end = match.end()
+            position = end if end > start else start + 1
+
     def parse(self, file_content: str) -> List[str]:
         """
         Template method for parsing file content. Extracts single-line and multi-line comments.
         """
-        comments = []
-        # Extract single-line comments
-        single_comments = self.extract_single_line_comments(file_content)
-        comments.extend(single_comments)
+        return [span.text for span in self.parse_spans(file_content)]
 
-        # Extract multi-line comments
-        multi_comments = self.extract_multi_line_comments(file_content)
-        for comment in multi_comments:
-            # Split multi-line comments into individual lines
-            for line in comment.strip().split('\n'):
-                comments.append(line.strip())
+    def parse_spans(self, file_content: str, line_index: Optional[LineIndex] = None,
+                    needles: Optional[Iterable[str]] = None) -> List[CommentSpan]:
+        """
+        Extracts single-line and multi-line comments in a single pass of the lexer,
+        keeping the offset and line number of every comment line.
+
+        Args:
+            file_content (str): Content of the file.
+            line_index (Optional[LineIndex]): Index of `file_content`, built if not provided.
+            needles (Optional[Iterable[str]]): If given, only comments holding one of these, e.g. the
+                searched tags, are guaranteed to be returned; most others are skipped without lexing.
+
+        Returns:
+            List[CommentSpan]: Single-line comments first, then the lines of multi-line comments.
+        """
+        if line_index is None:
+            line_index = LineIndex(file_content)
+        if needles is not None:
+            needles = tuple(needles)
+        spans = []
+        block_spans = []
+
+        for match in self.iter_comments(file_content, needles):
+            kind = match.lastgroup
+            if kind == "line":
+                offset = match.start("line")
+                spans.append(CommentSpan(match.group("line"), offset, line_index.line_number(offset)))
+            elif kind == "block":
+                body = match.group("block")
+                if needles is not None and not any(needle in body for needle in needles):
+                    continue
+                # Split multi-line comments into individual stripped lines
+                offset = match.start("block") + len(body) - len(body.lstrip())
+                for line in body.strip().split('\n'):
+                    text = line.strip()
+                    line_offset = offset + len(line) - len(line.lstrip())
+                    block_spans.append(CommentSpan(text, line_offset, line_index.line_number(line_offset)))
+                    offset += len(line) + 1
 
-        return comments
+        return spans + block_spans
 
-    @abstractmethod
     def extract_single_line_comments(self, file_content: str) -> List[str]:
         """
-        Extract single-line comments based on the language-specific pattern.
+        Extract single-line comments, without the comment marker.
         """
-        pass
+        return [match.group("line") for match in self.iter_comments(file_content) if match.lastgroup == "line"]
 
-    @abstractmethod
     def extract_multi_line_comments(self, file_content: str) -> List[str]:
         """
-        Extract multi-line comments based on the language-specific pattern.
+        Extract the bodies of multi-line comments.
         """
-        pass
+        return [match.group("block") for match in self.iter_comments(file_content) if match.lastgroup == "block"]
 
 
-# Concrete Parser for Python
+# Concrete Parser for Python; docstrings count as multi-line comments
 class PythonParser(Parser):
-    SINGLE_LINE_COMMENT_PATTERN = re.compile(r'#\s*(.*)')
-    MULTI_LINE_COMMENT_PATTERN = re.compile(r'"""([\s\S]*?)"""', re.MULTILINE)
-
-    def extract_single_line_comments(self, file_content: str) -> List[str]:
-        return self.SINGLE_LINE_COMMENT_PATTERN.findall(file_content)
-
-    def extract_multi_line_comments(self, file_content: str) -> List[str]:
-        return self.MULTI_LINE_COMMENT_PATTERN.findall(file_content)
+    SPEC = LexerSpec(
+        line_comments=("#",),
+        block_comment=('"""', '"""', True),
+        strings=(("'''", True), ('"', False), ("'", False)),
+    )
 
 
-# Concrete Parser for JavaScript
+# Concrete Parser for JavaScript and TypeScript
 class JSParser(Parser):
-    SINGLE_LINE_COMMENT_PATTERN = re.compile(r'//\s*(.*)')
-    MULTI_LINE_COMMENT_PATTERN = re.compile(r'/\*([\s\S]*?)\*/', re.MULTILINE)
-
-    def extract_single_line_comments(self, file_content: str) -> List[str]:
-        return self.SINGLE_LINE_COMMENT_PATTERN.findall(file_content)
-
-    def extract_multi_line_comments(self, file_content: str) -> List[str]:
-        return self.MULTI_LINE_COMMENT_PATTERN.findall(file_content)
+    SPEC = LexerSpec(
+        line_comments=("//",),
+        block_comment=("/*", "*/", False),
+        strings=(('"', False), ("'", False), ("`", True)),
+    )
 
 
 # Concrete Parser for Java
 class JavaParser(Parser):
-    SINGLE_LINE_COMMENT_PATTERN = re.compile(r'//\s*(.*)')
-    MULTI_LINE_COMMENT_PATTERN = re.compile(r'/\*([\s\S]*?)\*/', re.MULTILINE)
-
-    def extract_single_line_comments(self, file_content: str) -> List[str]:
-        return self.SINGLE_LINE_COMMENT_PATTERN.findall(file_content)
-
-    def extract_multi_line_comments(self, file_content: str) -> List[str]:
-        return self.MULTI_LINE_COMMENT_PATTERN.findall(file_content)
+    SPEC = LexerSpec(
+        line_comments=("//",),
+        block_comment=("/*", "*/", False),
+        strings=(('"""', True), ('"', False), ("'", False)),
+    )
 
 
 # Factory to get the appropriate parser based on file extension
 class ParserFactory:
-    @staticmethod
-    def get_parser(file_extension: str) -> Parser:
-        if file_extension == '.py':
-            return PythonParser()
-        elif file_extension in ['.js', '.jsx', '.ts', '.tsx']:
-            return JSParser()
-        elif file_extension in ['.java']:
-            return JavaParser()
-        else:
-            raise ValueError(f"No parser available for the extension: {file_extension}")
+    # Parsers are stateless, so one instance per language serves every file
+    PARSERS: Dict[str, Parser] = {}
+    for _parser, _extensions in ((PythonParser(), ('.py',)), (JSParser(), ('.js', '.jsx', '.ts', '.tsx')),
+                                 (JavaParser(), ('.java',))):
+        PARSERS.update(dict.fromkeys(_extensions, _parser))
+    del _parser, _extensions
+
+    @classmethod
+    def get_parser(cls, file_extension: str) -> Parser:
+        try:
+            return cls.PARSERS[file_extension]
+        except KeyError:
+            raise ValueError(f"No parser available for the extension: {file_extension}") from None
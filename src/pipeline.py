@@ -0,0 +1,79 @@
+import asyncio
+import queue
+import threading
+from typing import Dict, List, Optional
+
+# Queued to send the small files waiting to be packed without waiting for more of them
+FLUSH = "flush"
+
+
+class Pipeline:
+    """
+    Overlaps the scan with the LLM stage: the findings of each file are handed
+    to the assistant as soon as the analyzer is done with that file.
+
+    The assistant dispatches from its own thread. Files are passed through a
+    bounded queue, so a scan running ahead of dispatch blocks instead of piling
+    up prompts in memory, and the total time approaches the longer of the two
+    stages rather than their sum.
+    """
+
+    def __init__(self, assistant, queue_size: int = 64):
+        """
+        Initializes the Pipeline.
+
+        Args:
+            assistant (OpenAIAssistant): Generates and sends the prompts of each file.
+            queue_size (int): Maximum number of scanned files waiting for dispatch.
+        """
+        self.assistant = assistant
+        self.queue: "queue.Queue" = queue.Queue(maxsize=max(1, queue_size))
+        self._thread: Optional[threading.Thread] = None
+        self._error: Optional[BaseException] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._consume, name="llm-dispatch", daemon=True)
+        self._thread.start()
+
+    def _consume(self):
+        try:
+            with self.assistant.metrics.timer("dispatch"):
+                failures = asyncio.run(self.assistant.dispatch_stream(self.queue))
+            self.assistant.failures.update(failures)
+        except BaseException as e:
+            self._error = e
+
+    def submit(self, file_path: str, findings: List[Dict]):
+        """
+        Queues the findings of a scanned file for dispatch, waiting while the queue is full.
+        """
+        if findings:
+            self._put((file_path, findings))
+
+    def flush(self):
+        """
+        Sends the small files held back for packing once the files queued before are prepared.
+        """
+        self._put(FLUSH)
+
+    def _put(self, item):
+        # Wait for room in the queue, unless dispatch has stopped for good
+        while True:
+            try:
+                self.queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                if not self._thread.is_alive():
+                    raise RuntimeError(f"LLM dispatch stopped: {self._error}") from self._error
+
+    def finish(self):
+        """
+        Signals the end of the scan and waits until every queued file has been processed.
+        """
+        if self._thread is None:
+            return
+        if self._thread.is_alive():
+            self._put(None)
+        self._thread.join()
+        if self._error is not None:
+            raise RuntimeError(f"LLM dispatch failed: {self._error}") from self._error
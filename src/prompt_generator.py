@@ -3,6 +3,11 @@ import os
 from typing import List, Dict, Optional
 import re
 import logging
+from src.batcher import FilePart, render_file_block
+from src.metrics import Metrics
+from src.prompt_request import PromptRequest, Segment
+from src.tokens import estimate_tokens
+from src.windowing import group_windows, merge_windows, render_excerpt, split_lines
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -77,14 +82,19 @@ class PromptGenerator:
         ".tsx": "TypeScript",
     }
 
-    def __init__(self, report_path: str):
+    # Lines of context kept on each side of a tagged line when a file is too large to send whole
+    WINDOW_RADIUS = 20
+
+    def __init__(self, report_path: str, metrics: Optional[Metrics] = None):
         """
         Initializes the PromptGenerator.
 
         Args:
             report_path (str): Path to the analysis report JSON file.
+            metrics (Optional[Metrics]): Collects the number of files and windows split over the prompt budget.
         """
         self.report_path = report_path
+        self.metrics = metrics or Metrics()
         self.analysis_results: List[Dict] = []
         self.prompts: List[str] = []
 
@@ -175,6 +185,108 @@ class PromptGenerator:
             5. Respond with only the updated code in the provided language.
         """)
 
+    def generate_windowed_prompt(self, file_path: str, lines: List[int], tags: List[str], excerpts: str) -> str:
+        """
+        Generates a prompt for a batch of tags that includes only excerpts of the file around the tagged lines.
+
+        Args:
+            file_path (str): Path to the file.
+            lines (List[int]): Line numbers of the tags covered by the excerpts.
+            tags (List[str]): List of tags in the file.
+            excerpts (str): Excerpts rendered with `render_excerpt`.
+
+        Returns:
+            str: The generated prompt.
+        """
+        tag_list = ", ".join(tags)
+        return (f"""The file contains the following tags requiring attention: {tag_list}
+            File: {file_path}
+            Relevant Lines: {lines}
+
+            The file is too large to include in full. Only the following excerpts are included. Each excerpt starts
+            with a <<<LINES start-end>>> marker giving its line range in the original file and ends with <<<END>>>.
+
+{excerpts}
+            Instructions:
+            1. Provide fixes or improvements for the code in the excerpts where necessary.
+            2. Include any necessary explanations only as inline comments within the code itself.
+            3. Do not write any additional details or explanations outside of the code.
+            4. Once all tasks are complete, remove the comment lines containing the tags that have been addressed.
+            5. Respond with every excerpt: its unchanged <<<LINES start-end>>> marker line, the complete updated code
+               of that excerpt, and a <<<END>>> line. Do not include anything else.
+        """)
+
+    def describe_file_part(self, part: FilePart) -> str:
+        """
+        Describes the tags of one file of a packed prompt.
+        """
+        return f"            - File: {part.file_path}, Tags: {', '.join(part.tags)}, Relevant Lines: {part.lines}\n"
+
+    def generate_packed_prompt(self, parts: List[FilePart]) -> str:
+        """
+        Generates a single prompt covering several small files.
+
+        Args:
+            parts (List[FilePart]): The files to include, with their tags and full content.
+
+        Returns:
+            str: The generated prompt.
+        """
+        tasks = "".join(self.describe_file_part(part) for part in parts)
+        files = "".join(render_file_block(part.file_path, part.full_content) for part in parts)
+        return (f"""The following files contain tags requiring attention:
+{tasks}
+            Each file starts with a <<<FILE path>>> marker line and ends with a <<<END FILE>>> line.
+
+{files}
+            Instructions:
+            1. Provide fixes or improvements for the code of each file where necessary.
+            2. Include any necessary explanations only as inline comments within the code itself.
+            3. Do not write any additional details or explanations outside of the code.
+            4. Once all tasks are complete, remove the comment lines containing the tags that have been addressed.
+            5. Respond with every file: its unchanged <<<FILE path>>> marker line, the complete updated code
+               of that file, and a <<<END FILE>>> line. Do not include anything else.
+        """)
+
+    def generate_file_requests(self, file_path: str, lines: List[int], tags: List[str], context: List[str],
+                               full_content: str, max_prompt_tokens: Optional[int] = None) -> List[PromptRequest]:
+        """
+        Generates the requests for a batch of tags in the same file, keeping each prompt within a token budget.
+
+        The whole file is sent when it fits. Otherwise the prompt only carries
+        merged windows around the tagged lines, spread over several requests if
+        needed, and the responses are later stitched back into the file.
+
+        Args:
+            file_path (str): Path to the file.
+            lines (List[int]): Line numbers of the tags.
+            tags (List[str]): List of tags in the file.
+            context (List[str]): Context for the tags.
+            full_content (str): Full content of the file.
+            max_prompt_tokens (Optional[int]): Estimated token budget of a prompt; unlimited if None.
+
+        Returns:
+            List[PromptRequest]: The requests covering all tagged lines.
+        """
+        prompt = self.generate_batched_prompt(file_path, lines, tags, context, full_content)
+        if max_prompt_tokens is None or estimate_tokens(prompt) <= max_prompt_tokens:
+            return [PromptRequest(prompt, [Segment(file_path)])]
+
+        file_lines = split_lines(full_content)
+        overhead = estimate_tokens(self.generate_windowed_prompt(file_path, lines, tags, ""))
+        budget = max(max_prompt_tokens - overhead, 1)
+        windows = merge_windows(lines, self.WINDOW_RADIUS, len(file_lines))
+
+        requests = []
+        for group in group_windows(file_lines, windows, budget):
+            excerpts = "".join(render_excerpt(file_lines, window) for window in group)
+            group_lines = sorted({line for line in lines if any(w.start <= line <= w.end for w in group)})
+            prompt = self.generate_windowed_prompt(file_path, group_lines, tags, excerpts)
+            requests.append(PromptRequest(prompt, [Segment(file_path, group)]))
+        self.metrics.inc("files_windowed")
+        self.metrics.inc("windows", len(windows))
+        logger.info(f"{file_path} exceeds the prompt budget; sending {len(windows)} windows in {len(requests)} requests.")
+        return requests
 
     def create_prompts(self):
         """
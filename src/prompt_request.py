@@ -0,0 +1,24 @@
+from typing import List, NamedTuple, Optional
+from src.windowing import Window
+
+
+class Segment(NamedTuple):
+    """
+    The part of a file covered by a request: the whole file, or a list of line windows.
+    """
+    file_path: str
+    windows: Optional[List[Window]] = None
+
+
+class PromptRequest:
+    """
+    A prompt ready to be sent, together with the file segments its response applies to.
+    """
+
+    def __init__(self, prompt: str, segments: List[Segment]):
+        self.prompt = prompt
+        self.segments = segments
+
+    @property
+    def files(self) -> List[str]:
+        return [segment.file_path for segment in self.segments]
@@ -0,0 +1,134 @@
+import email.utils
+import random
+import threading
+import time
+from typing import Callable, Optional
+
+# HTTP status codes worth retrying: timeouts, conflicts, rate limits and server errors
+RETRYABLE_STATUS_CODES = {408, 409, 429}
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at a fixed rate.
+
+    Callers reserve capacity up front; the level may go negative and the
+    returned wait tells the caller how long to sleep before using it.
+    """
+
+    def __init__(self, capacity: float, refill_per_second: float, clock: Callable[[], float] = time.monotonic):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.clock = clock
+        self.level = capacity
+        self.updated = clock()
+
+    def reserve(self, amount: float) -> float:
+        """
+        Takes `amount` from the bucket and returns the number of seconds to wait before it is available.
+        """
+        now = self.clock()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.refill_per_second)
+        self.updated = now
+        # A single request larger than the bucket must still be able to go through
+        self.level -= min(amount, self.capacity)
+        return 0.0 if self.level >= 0 else -self.level / self.refill_per_second
+
+
+class RateLimiter:
+    """
+    Enforces requests-per-minute and tokens-per-minute budgets across threads,
+    plus a shared pause when the server asks clients to back off.
+    """
+
+    def __init__(self, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+        self.clock = clock
+        self.sleep = sleep
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute / 60.0, clock) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60.0, clock) if tokens_per_minute else None
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens: int = 0) -> float:
+        """
+        Blocks until a request of the given estimated size fits in the budgets.
+
+        Returns:
+            float: The number of seconds waited.
+        """
+        with self.lock:
+            wait = max(self.paused_until - self.clock(), 0.0)
+            if self.requests is not None:
+                wait = max(wait, self.requests.reserve(1))
+            if self.tokens is not None and tokens:
+                wait = max(wait, self.tokens.reserve(tokens))
+        if wait > 0:
+            self.sleep(wait)
+        return wait
+
+    def pause(self, seconds: float):
+        """
+        Holds back every caller for the given number of seconds, e.g. after a 429 with Retry-After.
+        """
+        with self.lock:
+            self.paused_until = max(self.paused_until, self.clock() + seconds)
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter, overridden by the server's Retry-After when present.
+    """
+
+    def __init__(self, max_retries: int = 5, base_delay: float = 1.0, max_delay: float = 60.0,
+                 rng: Optional[random.Random] = None):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.rng = rng or random.Random()
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        Returns the number of seconds to wait before retry number `attempt` (starting at 0).
+        """
+        if retry_after is not None:
+            # Small jitter so that clients told the same deadline do not all retry at once
+            return min(retry_after, self.max_delay) + self.rng.uniform(0, self.base_delay / 4)
+        return self.rng.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+def is_retryable(error: Exception) -> bool:
+    """
+    Tells whether a request that failed with this error may succeed if sent again.
+    """
+    status_code = getattr(error, "status_code", None)
+    if status_code is not None:
+        return status_code in RETRYABLE_STATUS_CODES or status_code >= 500
+    return isinstance(error, (ConnectionError, TimeoutError))
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """
+    Reads the Retry-After (or retry-after-ms) header of the error's HTTP response, if any.
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value is not None:
+        try:
+            return max(float(value) / 1000.0, 0.0)
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(email.utils.parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,128 @@
+import json
+from abc import ABC, abstractmethod
+from typing import IO, Dict, List, Optional
+
+# Size of the write buffer used for reports
+REPORT_BUFFER_SIZE = 1 << 16
+
+
+class ReportWriter(ABC):
+    """
+    Writes findings to a report file incrementally, one at a time.
+
+    The buffer is flushed whenever a finding for a new source file arrives, so
+    the results of every completed file are on disk while the scan continues.
+    If `file` is given, the report is written to it instead of opening `path`,
+    and it is left open on close.
+    """
+
+    def __init__(self, path: str, file: Optional[IO[str]] = None):
+        self.path = path
+        self.count = 0
+        self._last_file: Optional[str] = None
+        self._owns_file = file is None
+        self._file = file if file is not None else open(path, 'w', encoding='utf-8', buffering=REPORT_BUFFER_SIZE)
+
+    def write(self, finding: Dict, rendered: Optional[str] = None):
+        """
+        Writes a finding, reusing its `render` output if given.
+        """
+        if self._last_file is not None and finding.get("file") != self._last_file:
+            self._file.flush()
+        self._last_file = finding.get("file")
+        self._write(self.render(finding) if rendered is None else rendered)
+        self.count += 1
+
+    @staticmethod
+    @abstractmethod
+    def render(finding: Dict) -> str:
+        """
+        Serializes a finding as it appears in the report, independently of its position.
+        """
+
+    @abstractmethod
+    def _write(self, rendered: str):
+        """
+        Appends a rendered finding to the report.
+        """
+
+    def close(self, complete: bool = True):
+        """
+        Closes the report, or flushes the file it was given.
+
+        Args:
+            complete (bool): Whether every finding was written; an interrupted report is left as is.
+        """
+        if self._owns_file:
+            self._file.close()
+        else:
+            self._file.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close(complete=exc_type is None)
+
+
+class JSONReportWriter(ReportWriter):
+    """
+    Streams a JSON array byte-identical to `json.dump(findings, f, indent=4)`.
+
+    The array is only closed if the report is complete, so that the report of a
+    scan that failed midway does not parse as valid JSON.
+    """
+
+    @staticmethod
+    def render(finding: Dict) -> str:
+        return json.dumps(finding, indent=4).replace("\n", "\n    ")
+
+    def _write(self, rendered: str):
+        prefix = "[\n" if self.count == 0 else ",\n"
+        self._file.write(prefix + "    " + rendered)
+
+    def close(self, complete: bool = True):
+        # Without its closing bracket, the report of a failed scan cannot be mistaken for a complete one
+        if complete and not self._file.closed:
+            self._file.write("[]" if self.count == 0 else "\n]")
+        super().close(complete)
+
+
+class NDJSONReportWriter(ReportWriter):
+    """
+    Writes one JSON object per line (newline-delimited JSON).
+    """
+
+    @staticmethod
+    def render(finding: Dict) -> str:
+        return json.dumps(finding)
+
+    def _write(self, rendered: str):
+        self._file.write(rendered + "\n")
+
+
+REPORT_WRITERS = {"json": JSONReportWriter, "ndjson": NDJSONReportWriter}
+
+REPORT_FORMATS = tuple(REPORT_WRITERS)
+
+
+def report_writer_class(report_format: str) -> type:
+    try:
+        return REPORT_WRITERS[report_format]
+    except KeyError:
+        raise ValueError(f"Unsupported report format: {report_format}") from None
+
+
+def open_report_writer(path: str, report_format: str = "json", file: Optional[IO[str]] = None) -> ReportWriter:
+    return report_writer_class(report_format)(path, file)
+
+
+def load_report(path: str) -> List[Dict]:
+    """
+    Loads a report written in either format.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    if content.lstrip().startswith('['):
+        return json.loads(content)
+    return [json.loads(line) for line in content.splitlines() if line.strip()]
@@ -0,0 +1,125 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """
+    Content-addressed on-disk cache of LLM responses with LRU eviction.
+
+    Each response is stored in its own file named after the hash of the model,
+    prompt and request parameters. File modification times record the last
+    use, so the least recently used entries are evicted first once the cache
+    exceeds its size cap, also across runs.
+    """
+
+    SUFFIX = ".txt"
+
+    def __init__(self, directory: str, max_bytes: int = 512 * 1024 * 1024, refresh: bool = False):
+        """
+        Initializes the ResponseCache.
+
+        Args:
+            directory (str): Directory holding the cached responses.
+            max_bytes (int): Total size above which the least recently used responses are evicted.
+            refresh (bool): Ignore cached responses but store the new ones.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.refresh = refresh
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+        # Key -> size in bytes, ordered from least to most recently used
+        self.entries: "OrderedDict[str, int]" = OrderedDict()
+        self.total_bytes = 0
+        stats = []
+        with os.scandir(directory) as iterator:
+            for entry in iterator:
+                if entry.name.endswith(self.SUFFIX) and entry.is_file():
+                    stat = entry.stat()
+                    stats.append((stat.st_mtime_ns, entry.name[:-len(self.SUFFIX)], stat.st_size))
+        for _, key, size in sorted(stats):
+            self.entries[key] = size
+            self.total_bytes += size
+
+    @staticmethod
+    def key(model: str, prompt: str, params: Optional[Dict] = None) -> str:
+        """
+        Returns the cache key of a request.
+        """
+        payload = json.dumps({"model": model, "prompt": prompt, "params": params or {}}, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + self.SUFFIX)
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Returns the cached response for the key, or None on a miss.
+        """
+        with self.lock:
+            if self.refresh or key not in self.entries:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                response = f.read()
+            os.utime(self._path(key))
+        except OSError:
+            with self.lock:
+                self.total_bytes -= self.entries.pop(key, 0)
+                self.misses += 1
+            return None
+        with self.lock:
+            self.hits += 1
+        return response
+
+    def put(self, key: str, response: str):
+        """
+        Stores a response, evicting the least recently used ones if the cache grows too large.
+        """
+        data = response.encode('utf-8')
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, self._path(key))
+        self._add_entry(key, len(data))
+
+    def put_file(self, key: str, source_path: str):
+        """
+        Stores the content of a file as a response, e.g. one streamed to disk, without loading it in memory.
+        """
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        os.close(fd)
+        shutil.copyfile(source_path, temp_path)
+        os.replace(temp_path, self._path(key))
+        self._add_entry(key, os.path.getsize(self._path(key)))
+
+    def _add_entry(self, key: str, size: int):
+        with self.lock:
+            self.total_bytes += size - self.entries.pop(key, 0)
+            self.entries[key] = size
+            evicted = []
+            while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+                old_key, size = self.entries.popitem(last=False)
+                self.total_bytes -= size
+                evicted.append(old_key)
+        for old_key in evicted:
+            try:
+                os.remove(self._path(old_key))
+            except OSError:
+                pass
+        if evicted:
+            logger.debug(f"Evicted {len(evicted)} responses from the cache")
@@ -0,0 +1,62 @@
+import re
+from typing import Dict, List
+
+
+class TagMatcher:
+    """
+    Finds every configured tag in a comment with a single combined regular expression.
+
+    The tags are merged into a trie-shaped pattern (shared prefixes such as
+    `@` are matched once), so the cost per comment stays flat as the number of
+    tags grows. Tags only match as whole words: `@TODO` does not match `@TODOLIST`.
+    """
+
+    def __init__(self, tags: List[str]):
+        self.tags = list(dict.fromkeys(tags))
+        self.rank = {tag: index for index, tag in enumerate(self.tags)}
+        self.pattern = re.compile(rf'(?<!\w)(?:{self._trie_pattern(self.tags)})(?!\w)') if self.tags else None
+        # Raw UTF-8 byte sequences of the tags, used to reject files before decoding them.
+        # Built through latin-1 so that every byte maps to exactly one character.
+        encoded = [tag.encode('utf-8').decode('latin-1') for tag in self.tags]
+        self.bytes_pattern = re.compile(self._trie_pattern(encoded).encode('latin-1')) if self.tags else None
+
+    @staticmethod
+    def _trie_pattern(tags: List[str]) -> str:
+        """
+        Builds a regular expression equivalent to the alternation of `tags`, factored by common prefixes.
+        """
+        trie: Dict = {}
+        for tag in tags:
+            node = trie
+            for char in tag:
+                node = node.setdefault(char, {})
+            node[''] = {}  # End of a tag
+
+        def build(node: Dict) -> str:
+            terminal = '' in node
+            branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+            if not branches:
+                return ''
+            if len(branches) == 1:
+                body = branches[0]
+                grouped = body if len(body) == 1 else f'(?:{body})'
+            else:
+                grouped = f'(?:{"|".join(branches)})'
+            return f'{grouped}?' if terminal else (grouped if len(branches) > 1 else branches[0])
+
+        return build(trie)
+
+    def occurs_in(self, data) -> bool:
+        """
+        Tells whether any tag's bytes occur in the data (bytes or a memory map), ignoring word boundaries.
+        """
+        return self.bytes_pattern is not None and self.bytes_pattern.search(data) is not None
+
+    def find(self, text: str) -> List[str]:
+        """
+        Returns the distinct tags found in the text, in the order they were configured.
+        """
+        if self.pattern is None:
+            return []
+        found = {match.group() for match in self.pattern.finditer(text)}
+        return sorted(found, key=self.rank.__getitem__)
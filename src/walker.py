@@ -0,0 +1,298 @@
+import os
+import re
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+# Directories that never contain code worth analyzing
+DEFAULT_PRUNED_DIRS = {".git", ".hg", ".svn", "node_modules", "__pycache__", ".venv", "venv", ".tox",
+                       ".mypy_cache", ".pytest_cache"}
+
+
+class IgnoreRule:
+    """
+    A single pattern in .gitignore syntax, matched against paths relative to a base directory.
+    """
+
+    def __init__(self, pattern: str):
+        self.negated = pattern.startswith('!')
+        if self.negated:
+            pattern = pattern[1:]
+        elif pattern.startswith('\\'):
+            pattern = pattern[1:]  # Escaped leading '!' or '#'
+        self.dir_only = pattern.endswith('/')
+        pattern = pattern.rstrip('/')
+        # A slash anywhere but at the end anchors the pattern to the base directory
+        anchored = '/' in pattern
+        pattern = pattern.lstrip('/')
+        prefix = '' if anchored else '(?:.*/)?'
+        self.regex = re.compile(prefix + self._translate(pattern) + r'\Z', re.DOTALL)
+
+    @staticmethod
+    def _translate(pattern: str) -> str:
+        """
+        Translates a gitignore glob into a regular expression.
+        """
+        parts = []
+        i, n = 0, len(pattern)
+        while i < n:
+            char = pattern[i]
+            if pattern.startswith('**/', i):
+                parts.append('(?:.*/)?')
+                i += 3
+                continue
+            if pattern.startswith('**', i):
+                parts.append('.*')
+                i += 2
+                continue
+            if char == '*':
+                parts.append('[^/]*')
+            elif char == '?':
+                parts.append('[^/]')
+            elif char == '[':
+                end = pattern.find(']', i + 2)
+                if end == -1:
+                    parts.append(re.escape(char))
+                else:
+                    body = pattern[i + 1:end]
+                    if body.startswith('!'):
+                        body = '^' + body[1:]
+                    parts.append('[' + body.replace('\\', '\\\\') + ']')
+                    i = end
+            elif char == '\\' and i + 1 < n:
+                i += 1
+                parts.append(re.escape(pattern[i]))
+            else:
+                parts.append(re.escape(char))
+            i += 1
+        return ''.join(parts)
+
+    def matches(self, relative_path: str, is_dir: bool) -> bool:
+        if self.dir_only and not is_dir:
+            return False
+        return self.regex.match(relative_path) is not None
+
+
+def parse_ignore_lines(lines: List[str]) -> List[IgnoreRule]:
+    """
+    Parses the lines of a .gitignore file, skipping blank lines and comments.
+    """
+    rules = []
+    for line in lines:
+        line = line.rstrip('\n').rstrip('\r')
+        if line.endswith(' ') and not line.endswith('\\ '):
+            line = line.rstrip(' ')
+        if not line or line.startswith('#'):
+            continue
+        rules.append(IgnoreRule(line))
+    return rules
+
+
+class FileWalker:
+    """
+    Walks a project with `os.scandir`, pruning ignored directories before descending.
+
+    Honours .gitignore files at every level, extra exclude/include globs (in
+    .gitignore syntax, relative to the root) and a set of always-pruned
+    directories such as `.git`, `node_modules` and virtualenvs. Symlinked
+    directories are followed once; symlink loops and hardlinked duplicates are
+    skipped by inode. Entries are visited in sorted order so walks are reproducible.
+    """
+
+    def __init__(self, root: str, exclude: Optional[List[str]] = None, include: Optional[List[str]] = None,
+                 prune_paths: Optional[List[str]] = None, use_gitignore: bool = True,
+                 pruned_dirs: Optional[Set[str]] = None, skip_files: Optional[List[str]] = None):
+        """
+        Initializes the FileWalker.
+
+        Args:
+            root (str): Directory to walk.
+            exclude (Optional[List[str]]): Patterns of files and directories to skip.
+            include (Optional[List[str]]): If given, only files matching one of these patterns are yielded.
+            prune_paths (Optional[List[str]]): Directories never descended into, e.g. the output directory.
+                The root itself is never pruned.
+            use_gitignore (bool): Honour .gitignore files found while walking.
+            pruned_dirs (Optional[Set[str]]): Directory names always skipped; defaults to DEFAULT_PRUNED_DIRS.
+            skip_files (Optional[List[str]]): Files never yielded, which need not exist yet, e.g. the report.
+        """
+        self.root = root
+        self.exclude = parse_ignore_lines(exclude or [])
+        self.include = parse_ignore_lines(include or [])
+        try:
+            root_stat = os.stat(root)
+            root_key = (root_stat.st_dev, root_stat.st_ino)
+        except OSError:
+            root_key = None
+        self.prune_keys = set()
+        for path in prune_paths or []:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue  # Nothing to prune yet
+            if (stat.st_dev, stat.st_ino) != root_key:
+                self.prune_keys.add((stat.st_dev, stat.st_ino))
+        # Paths relative to the root, compared with those of the walk
+        absolute_root = os.path.abspath(root)
+        self.skip_files = {os.path.relpath(os.path.abspath(path), absolute_root).replace(os.sep, '/')
+                           for path in skip_files or []}
+        self.use_gitignore = use_gitignore
+        self.pruned_dirs = DEFAULT_PRUNED_DIRS if pruned_dirs is None else pruned_dirs
+        self.skipped_dirs = 0
+        # .gitignore rules of each directory, read once for `is_ignored`
+        self._gitignore_cache: Dict[str, List[IgnoreRule]] = {}
+
+    def walk(self) -> Iterator[str]:
+        """
+        Yields the paths of all files that are not ignored, joined onto the root.
+        """
+        visited_dirs: Set[Tuple[int, int]] = set()
+        seen_files: Set[Tuple[int, int]] = set()
+        # Each entry: (directory path, path relative to root, inherited gitignore rules)
+        stack: List[Tuple[str, str, List[Tuple[str, List[IgnoreRule]]]]] = [(self.root, '', [])]
+
+        while stack:
+            dir_path, dir_relative, inherited = stack.pop()
+            try:
+                dir_stat = os.stat(dir_path)
+            except OSError:
+                continue
+            dir_key = (dir_stat.st_dev, dir_stat.st_ino)
+            if dir_key in visited_dirs:
+                continue  # Symlink loop or directory reached twice
+            if dir_key in self.prune_keys:
+                self.skipped_dirs += 1
+                continue
+            visited_dirs.add(dir_key)
+
+            rules = inherited
+            if self.use_gitignore:
+                local_rules = self._read_gitignore(dir_path)
+                if local_rules:
+                    rules = inherited + [(dir_relative, local_rules)]
+
+            try:
+                with os.scandir(dir_path) as iterator:
+                    entries = sorted(iterator, key=lambda entry: entry.name)
+            except OSError:
+                continue
+
+            subdirs = []
+            for entry in entries:
+                relative = f"{dir_relative}/{entry.name}" if dir_relative else entry.name
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    continue
+                if is_dir:
+                    if self._prune_dir(entry.name, entry.path, relative, rules):
+                        self.skipped_dirs += 1
+                    else:
+                        subdirs.append((os.path.join(dir_path, entry.name), relative, rules))
+                    continue
+                if relative in self.skip_files or not entry.is_file() or self._ignored(relative, False, rules):
+                    continue
+                if not self._included(relative):
+                    continue
+                try:
+                    if entry.is_symlink():
+                        target = entry.stat()
+                        file_key = (target.st_dev, target.st_ino)
+                    else:
+                        file_key = (dir_stat.st_dev, entry.inode())
+                except OSError:
+                    continue
+                if file_key in seen_files:
+                    continue  # Hardlink or symlink to a file already yielded
+                seen_files.add(file_key)
+                yield os.path.join(dir_path, entry.name)
+
+            # Push in reverse so directories are visited in sorted order
+            stack.extend(reversed(subdirs))
+
+    def is_ignored(self, path: str) -> bool:
+        """
+        Tells whether the walk would skip a file, e.g. one listed by git rather than walked.
+
+        The directories leading to the file are checked from the root down with
+        the same rules as during the walk, then the file itself. Files outside
+        the root are ignored.
+        """
+        relative = os.path.relpath(path, self.root)
+        if relative == os.curdir or relative.split(os.sep)[0] == os.pardir:
+            return True
+        parts = relative.split(os.sep)
+        rules: List[Tuple[str, List[IgnoreRule]]] = []
+        dir_path, dir_relative = self.root, ''
+        for name in parts[:-1]:
+            if self.use_gitignore:
+                local_rules = self._cached_gitignore(dir_path)
+                if local_rules:
+                    rules = rules + [(dir_relative, local_rules)]
+            dir_path = os.path.join(dir_path, name)
+            dir_relative = f"{dir_relative}/{name}" if dir_relative else name
+            try:
+                dir_stat = os.stat(dir_path)
+            except OSError:
+                return True
+            if (dir_stat.st_dev, dir_stat.st_ino) in self.prune_keys or \
+                    self._prune_dir(name, dir_path, dir_relative, rules):
+                return True
+        if self.use_gitignore:
+            local_rules = self._cached_gitignore(dir_path)
+            if local_rules:
+                rules = rules + [(dir_relative, local_rules)]
+        file_relative = f"{dir_relative}/{parts[-1]}" if dir_relative else parts[-1]
+        if file_relative in self.skip_files:
+            return True
+        return self._ignored(file_relative, False, rules) or not self._included(file_relative)
+
+    def clear_gitignore_cache(self):
+        """
+        Makes `is_ignored` read .gitignore files again, e.g. after one changed.
+        """
+        self._gitignore_cache.clear()
+
+    def _cached_gitignore(self, dir_path: str) -> List[IgnoreRule]:
+        if dir_path not in self._gitignore_cache:
+            self._gitignore_cache[dir_path] = self._read_gitignore(dir_path)
+        return self._gitignore_cache[dir_path]
+
+    def _prune_dir(self, name: str, path: str, relative: str, rules: List[Tuple[str, List[IgnoreRule]]]) -> bool:
+        if name in self.pruned_dirs:
+            return True
+        if os.path.isfile(os.path.join(path, "pyvenv.cfg")):
+            return True  # Virtualenv with a custom name
+        return self._ignored(relative, True, rules)
+
+    def _ignored(self, relative: str, is_dir: bool, rules: List[Tuple[str, List[IgnoreRule]]]) -> bool:
+        """
+        Applies gitignore rules from the root down, then the exclude patterns; the last match wins.
+        """
+        ignored = False
+        for base, base_rules in rules:
+            path = relative[len(base) + 1:] if base else relative
+            for rule in base_rules:
+                if rule.matches(path, is_dir):
+                    ignored = not rule.negated
+        for rule in self.exclude:
+            if rule.matches(relative, is_dir):
+                ignored = not rule.negated
+        return ignored
+
+    def _included(self, relative: str) -> bool:
+        """
+        Applies the include patterns: a file is included if it, or one of its directories, matches one of them.
+        """
+        if not self.include:
+            return True
+        if any(rule.matches(relative, False) for rule in self.include):
+            return True
+        parts = relative.split('/')
+        return any(rule.matches('/'.join(parts[:depth]), True)
+                   for depth in range(1, len(parts)) for rule in self.include)
+
+    @staticmethod
+    def _read_gitignore(dir_path: str) -> List[IgnoreRule]:
+        try:
+            with open(os.path.join(dir_path, ".gitignore"), 'r', encoding='utf-8') as f:
+                return parse_ignore_lines(f.readlines())
+        except (OSError, UnicodeDecodeError):
+            return []
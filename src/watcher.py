@@ -0,0 +1,352 @@
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple, TYPE_CHECKING
+from src.analysis_cache import RACY_WINDOW_SECONDS
+from src.analyzer import Analyzer
+from src.atomic_file import open_atomic
+from src.metrics import Metrics
+from src.parser import ParserFactory
+from src.report import open_report_writer, report_writer_class
+
+if TYPE_CHECKING:
+    from src.pipeline import Pipeline
+
+# (size, mtime in nanoseconds) of a file when it was parsed, or None to parse it again at the next poll,
+# as files modified within RACY_WINDOW_SECONDS may change again unnoticed
+StatKey = Optional[Tuple[int, int]]
+
+
+class WatchedFile(NamedTuple):
+    """
+    The findings of a file, kept along with their serialized form so that rewriting the report is a copy.
+    """
+    stat_key: StatKey
+    findings: List[Dict]
+    rendered: List[str]
+
+
+class ChangeNotifier:
+    """
+    Collects the files that the operating system reports as changed under a directory.
+
+    Relies on the optional `watchdog` package (inotify on Linux, FSEvents on
+    macOS, ReadDirectoryChangesW on Windows). Changes to directories, or to a
+    .gitignore, cannot be narrowed down to a list of files and request a full
+    rescan instead.
+    """
+
+    # Events that do not change the content of a file, such as our own reads
+    IGNORED_EVENTS = {"opened", "closed_no_write"}
+
+    def __init__(self, root: str):
+        from watchdog.events import FileSystemEventHandler  # type: ignore
+        from watchdog.observers import Observer  # type: ignore
+
+        notifier = self
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                notifier._record(event)
+
+        self.changed = threading.Event()
+        self._lock = threading.Lock()
+        self._paths: Set[str] = set()
+        self._rescan = False
+        self.observer = Observer()
+        self.observer.schedule(Handler(), root, recursive=True)
+
+    def start(self):
+        self.observer.start()
+
+    def stop(self):
+        self.observer.stop()
+        self.observer.join()
+
+    def _record(self, event):
+        if event.event_type in self.IGNORED_EVENTS:
+            return
+        paths = [event.src_path] + ([event.dest_path] if getattr(event, "dest_path", None) else [])
+        with self._lock:
+            if event.is_directory:
+                # A modified directory only had entries changed, each reported on its own
+                if event.event_type == "modified":
+                    return
+                self._rescan = True
+            elif any(os.path.basename(path) == ".gitignore" for path in paths):
+                self._rescan = True
+            else:
+                self._paths.update(os.fsdecode(path) for path in paths)
+        self.changed.set()
+
+    def take(self) -> Tuple[Set[str], bool]:
+        """
+        Returns the changed files reported since the last call, and whether a full rescan is needed.
+        """
+        with self._lock:
+            self.changed.clear()
+            paths, rescan = self._paths, self._rescan
+            self._paths, self._rescan = set(), False
+        return paths, rescan
+
+
+class Watcher:
+    """
+    Keeps the report of a project up to date while its files are being edited.
+
+    The project is scanned once, after which only the files reported changed
+    by the operating system are parsed again, through `ChangeNotifier`. The
+    findings of the other files stay in memory, and the report is rewritten
+    atomically whenever a finding changes. Without notifications (watchdog is
+    not installed, or `poll` is set), the project is polled instead: every
+    poll walks the tree and parses the files whose size or modification time
+    changed, which costs a stat per file.
+
+    With a pipeline, the findings of every file that gains a tag after the
+    initial scan are sent to the LLM stage.
+    """
+
+    # Wait after a notification, so that a burst of changes (a save, a checkout) is handled at once
+    DEBOUNCE_SECONDS = 0.05
+
+    def __init__(self, analyzer: Analyzer, report_path: str, report_format: str = "json", interval: float = 0.5,
+                 pipeline: Optional["Pipeline"] = None, metrics: Optional[Metrics] = None, poll: bool = False):
+        """
+        Initializes the Watcher.
+
+        Args:
+            analyzer (Analyzer): Parses the changed files; its walker lists and filters the files of the project.
+            report_path (str): Report kept up to date.
+            report_format (str): Format of the report, "json" or "ndjson".
+            interval (float): Seconds between two polls, or between two checks for the end when notified.
+            pipeline (Optional[Pipeline]): Receives the findings of files with tags added after the initial scan.
+            metrics (Optional[Metrics]): Records the refreshes and the time they take.
+            poll (bool): Poll the project even if change notifications are available.
+        """
+        self.analyzer = analyzer
+        self.walker = analyzer.walker
+        self.report_path = report_path
+        self.report_format = report_format
+        self.interval = interval
+        self.pipeline = pipeline
+        self.metrics = metrics or Metrics()
+        self.poll = poll
+        self.jobs = analyzer.jobs
+        self.render = report_writer_class(report_format).render
+        # Findings of every source file, in walk order
+        self.files: Dict[str, WatchedFile] = {}
+        # Set once the initial scan is done, whose tags are not new
+        self.indexed = False
+
+    def _stat_key(self, file_path: str, now_ns: int) -> StatKey:
+        """
+        Returns the stat key of a file, or raises OSError if it does not exist.
+        """
+        stat = os.stat(file_path)
+        recent = now_ns - stat.st_mtime_ns < int(RACY_WINDOW_SECONDS * 1e9)
+        return None if recent else (stat.st_size, stat.st_mtime_ns)
+
+    def _stat_source_files(self) -> Dict[str, StatKey]:
+        """
+        Returns the stat key of every file of the project that has a suitable parser.
+        """
+        now_ns = time.time_ns()
+        stat_keys: Dict[str, StatKey] = {}
+        for file_path in self.walker.walk():
+            try:
+                ParserFactory.get_parser(os.path.splitext(file_path)[1])
+                stat_keys[file_path] = self._stat_key(file_path, now_ns)
+            except (ValueError, OSError):
+                continue  # No suitable parser, or removed since the walk
+        return stat_keys
+
+    def refresh(self, changed_paths: Optional[Iterable[str]] = None) -> bool:
+        """
+        Parses the files added or changed since the last refresh and forgets the removed ones.
+
+        Args:
+            changed_paths (Optional[Iterable[str]]): Files reported changed, e.g. by notifications, which
+                are the only ones checked; by default, the whole project is walked.
+
+        Returns:
+            bool: Whether any finding was added, changed or removed.
+        """
+        with self.metrics.timer("watch_refresh"):
+            if changed_paths is None:
+                stat_keys = self._stat_source_files()
+                to_parse = [file_path for file_path, key in stat_keys.items() if key is None
+                            or file_path not in self.files or self.files[file_path].stat_key != key]
+                removed = [file_path for file_path in self.files if file_path not in stat_keys]
+            else:
+                stat_keys, removed = self._stat_changed_files(changed_paths)
+                to_parse = list(stat_keys)
+
+            updated = any(self.files[file_path].findings for file_path in removed)
+            parsed = self._parse(to_parse)
+            submitted = False
+            for file_path, findings in parsed.items():
+                previous = self.files[file_path].findings if file_path in self.files else []
+                if findings != previous:
+                    updated = True
+                if self.pipeline is not None and self.indexed and self._new_tags(previous, findings):
+                    self.pipeline.submit(file_path, findings)
+                    submitted = True
+            if submitted:
+                self.pipeline.flush()
+
+            if changed_paths is None:
+                files = {}
+                for file_path, key in stat_keys.items():
+                    watched = self._updated(file_path, key, parsed)
+                    if watched is not None:
+                        files[file_path] = watched
+                self.files = files
+            else:
+                added = False
+                for file_path in removed:
+                    del self.files[file_path]
+                for file_path, key in stat_keys.items():
+                    watched = self._updated(file_path, key, parsed)
+                    if watched is not None:
+                        added = added or file_path not in self.files
+                        self.files[file_path] = watched
+                if added:
+                    # Keep the report in walk order
+                    self.files = dict(sorted(self.files.items(), key=lambda item: self._walk_order(item[0])))
+            self.indexed = True
+        self.metrics.inc("watch_refreshes")
+        self.metrics.inc("watch_files_parsed", len(parsed))
+        return updated
+
+    def _stat_changed_files(self, changed_paths: Iterable[str]) -> Tuple[Dict[str, StatKey], List[str]]:
+        """
+        Returns the stat keys of the changed files that the walk would yield, and the files that were removed.
+        """
+        now_ns = time.time_ns()
+        stat_keys: Dict[str, StatKey] = {}
+        removed = []
+        for file_path in changed_paths:
+            try:
+                ParserFactory.get_parser(os.path.splitext(file_path)[1])
+            except ValueError:
+                continue
+            try:
+                key = self._stat_key(file_path, now_ns)
+                exists = os.path.isfile(file_path)
+            except OSError:
+                key, exists = None, False
+            if exists and not self.walker.is_ignored(file_path):
+                stat_keys[file_path] = key
+            elif file_path in self.files:
+                removed.append(file_path)
+        return stat_keys, removed
+
+    def _updated(self, file_path: str, key: StatKey, parsed: Dict[str, List[Dict]]) -> Optional[WatchedFile]:
+        """
+        Returns the entry of a file after a refresh, or None if it is new and could not be parsed.
+        """
+        if file_path in parsed:
+            findings = parsed[file_path]
+            return WatchedFile(key, findings, [self.render(finding) for finding in findings])
+        watched = self.files.get(file_path)
+        if watched is None:
+            return None
+        # Unchanged, or changed but unreadable: keep the findings and retry the latter next time
+        return watched if key == watched.stat_key else watched._replace(stat_key=None)
+
+    def _walk_order(self, file_path: str) -> Tuple:
+        """
+        Sort key placing files in walk order: the files of a directory first, then its subdirectories, by name.
+        """
+        parts = os.path.relpath(file_path, self.walker.root).split(os.sep)
+        return tuple((1, name) for name in parts[:-1]) + ((0, parts[-1]),)
+
+    def _parse(self, file_paths: List[str]) -> Dict[str, List[Dict]]:
+        """
+        Returns the findings of each file, leaving out those that could not be read, e.g. while being written.
+        """
+        parsed: Dict[str, List[Dict]] = {}
+        if not file_paths:
+            return parsed
+        # A few edited files are not worth starting a process pool for
+        self.analyzer.jobs = self.jobs if len(file_paths) > Analyzer.MAX_FILES_PER_CHUNK else 1
+        try:
+            for file_path, comments in zip(file_paths, self.analyzer.scan_files(file_paths)):
+                parsed[file_path] = [comment.to_dict() for comment in comments]
+        except (OSError, ValueError) as e:
+            print(f"Warning: {len(file_paths) - len(parsed)} changed files will be parsed again: {e}")
+        return parsed
+
+    @staticmethod
+    def _new_tags(previous: List[Dict], findings: List[Dict]) -> bool:
+        """
+        Returns whether `findings` hold a tagged comment that `previous` did not.
+        """
+        seen: Set[Tuple[str, Tuple[str, ...]]] = {(finding["text"], tuple(finding["tags"])) for finding in previous}
+        return any((finding["text"], tuple(finding["tags"])) not in seen for finding in findings)
+
+    def write_report(self) -> int:
+        """
+        Replaces the report with the current findings.
+
+        Returns:
+            int: Number of findings written.
+        """
+        with self.metrics.timer("report_write"), open_atomic(self.report_path) as f, \
+                open_report_writer(self.report_path, self.report_format, f) as writer:
+            for watched in self.files.values():
+                for finding, rendered in zip(watched.findings, watched.rendered):
+                    writer.write(finding, rendered)
+        return writer.count
+
+    def _start_notifier(self) -> Optional[ChangeNotifier]:
+        if self.poll:
+            return None
+        try:
+            notifier = ChangeNotifier(self.walker.root)
+            notifier.start()
+        except ImportError:
+            print(f"watchdog is not installed; polling for changes every {self.interval:g} s.")
+            return None
+        except OSError as e:
+            # E.g. the inotify watch limit is reached
+            print(f"Warning: change notifications unavailable ({e}); polling every {self.interval:g} s.")
+            return None
+        return notifier
+
+    def watch(self, stop: Optional[threading.Event] = None):
+        """
+        Scans the project and writes the report, then keeps it up to date until `stop` is set.
+
+        Args:
+            stop (Optional[threading.Event]): Ends the loop once set; without it, the loop runs until interrupted.
+        """
+        stop = stop or threading.Event()
+        # Started before the initial scan, so that no change made during it is missed
+        notifier = self._start_notifier()
+        try:
+            self.refresh()
+            count = self.write_report()
+            mode = "notified of" if notifier is not None else "polling for"
+            print(f"Watching {len(self.files)} files, {mode} changes. {count} findings saved to {self.report_path}")
+            while not stop.is_set():
+                if notifier is None:
+                    if stop.wait(self.interval):
+                        break
+                    changed_paths = None
+                else:
+                    if not notifier.changed.wait(self.interval):
+                        continue
+                    time.sleep(self.DEBOUNCE_SECONDS)
+                    changed_paths, rescan = notifier.take()
+                    if rescan:
+                        self.walker.clear_gitignore_cache()
+                        changed_paths = None
+                started = time.perf_counter()
+                if self.refresh(changed_paths):
+                    count = self.write_report()
+                    elapsed_ms = (time.perf_counter() - started) * 1000
+                    print(f"Report updated in {elapsed_ms:.0f} ms: {count} findings in {self.report_path}")
+        finally:
+            if notifier is not None:
+                notifier.stop()
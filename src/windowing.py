@@ -0,0 +1,119 @@
+import re
+from typing import Dict, List, NamedTuple, Tuple
+from src.tokens import CHARS_PER_TOKEN, estimate_tokens
+
+END_MARKER = "<<<END>>>"
+# Upper bound of the characters added by the markers around an excerpt
+MARKER_CHARS = 48
+EXCERPT_PATTERN = re.compile(r'^<<<LINES (\d+)-(\d+)>>>[ \t]*\n(.*?)^<<<END>>>', re.DOTALL | re.MULTILINE)
+FENCE_PATTERN = re.compile(r'\A```[^\n]*\n(.*?)\n?```\s*\Z', re.DOTALL)
+LINE_PATTERN = re.compile(r'[^\n]*\n|[^\n]+\Z')
+
+
+def split_lines(content: str) -> List[str]:
+    """
+    Splits content into lines keeping their ends, numbered like `LineIndex`.
+
+    Unlike `str.splitlines`, only "\\n" ends a line: form feeds and other
+    Unicode line breaks stay inside their line.
+    """
+    return LINE_PATTERN.findall(content)
+
+
+class Window(NamedTuple):
+    """
+    A range of lines of a file, 1-based and inclusive.
+    """
+    start: int
+    end: int
+
+
+def merge_windows(lines: List[int], radius: int, line_count: int) -> List[Window]:
+    """
+    Builds the windows of `radius` lines around each tagged line, merging those that overlap or touch.
+    """
+    windows: List[Window] = []
+    for line in sorted(set(lines)):
+        start, end = max(line - radius, 1), min(line + radius, line_count)
+        if windows and start <= windows[-1].end + 1:
+            windows[-1] = Window(windows[-1].start, max(end, windows[-1].end))
+        else:
+            windows.append(Window(start, end))
+    return windows
+
+
+def render_excerpt(file_lines: List[str], window: Window) -> str:
+    """
+    Renders a window as a marked excerpt, in the format expected back from the model.
+    """
+    body = "".join(file_lines[window.start - 1:window.end])
+    if not body.endswith("\n"):
+        body += "\n"
+    return f"<<<LINES {window.start}-{window.end}>>>\n{body}{END_MARKER}\n"
+
+
+def split_windows(file_lines: List[str], windows: List[Window], budget: int) -> List[Window]:
+    """
+    Splits windows whose excerpt alone exceeds the token budget into consecutive smaller windows.
+
+    A single line larger than the budget cannot be split and is kept as its own window.
+    """
+    limit = budget * CHARS_PER_TOKEN - MARKER_CHARS
+    result = []
+    for window in windows:
+        start = window.start
+        while start <= window.end:
+            end, chars = start, len(file_lines[start - 1])
+            while end < window.end and chars + len(file_lines[end]) <= limit:
+                chars += len(file_lines[end])
+                end += 1
+            result.append(Window(start, end))
+            start = end + 1
+    return result
+
+
+def group_windows(file_lines: List[str], windows: List[Window], budget: int) -> List[List[Window]]:
+    """
+    Groups consecutive windows into as few requests as possible, each within the token budget.
+    """
+    groups: List[List[Window]] = []
+    used = 0
+    for window in split_windows(file_lines, windows, budget):
+        cost = estimate_tokens(render_excerpt(file_lines, window))
+        if groups and used + cost <= budget:
+            groups[-1].append(window)
+            used += cost
+        else:
+            groups.append([window])
+            used = cost
+    return groups
+
+
+def strip_code_fence(body: str) -> str:
+    """
+    Returns the content of a block the model wrapped in a Markdown code fence, or the block unchanged.
+    """
+    fenced = FENCE_PATTERN.match(body.strip("\n"))
+    return fenced.group(1) + "\n" if fenced else body
+
+
+def parse_excerpts(response: str) -> Dict[Tuple[int, int], str]:
+    """
+    Extracts the updated excerpts from a model response, keyed by their original line range.
+    """
+    excerpts = {}
+    for match in EXCERPT_PATTERN.finditer(response):
+        excerpts[(int(match.group(1)), int(match.group(2)))] = strip_code_fence(match.group(3))
+    return excerpts
+
+
+def stitch(full_content: str, replacements: Dict[Tuple[int, int], str]) -> str:
+    """
+    Replaces the given line ranges of the original content with the updated excerpts.
+    """
+    file_lines = split_lines(full_content)
+    for (start, end), body in sorted(replacements.items(), reverse=True):
+        if body and not body.endswith("\n") and end < len(file_lines):
+            body += "\n"
+        file_lines[start - 1:end] = [body]
+    return "".join(file_lines)
@@ -0,0 +1,88 @@
+import os
+import time
+import pytest
+from src.analyzer import Analyzer
+from src.analysis_cache import AnalysisCache
+
+TAGS = ["@TODO", "@FIXME"]
+
+@pytest.fixture
+def cached_project(tmpdir):
+    """
+    Sets up a small project whose files are old enough to be cached.
+    """
+    project_dir = tmpdir.mkdir("project")
+    project_dir.join("a.py").write("# @TODO: first\nx = 1\n")
+    project_dir.join("b.js").write("// @FIXME: second\nlet y = 2;\n")
+    past = time.time() - 60
+    for name in ("a.py", "b.js"):
+        os.utime(project_dir.join(name).strpath, (past, past))
+    return project_dir
+
+def run_analysis(project_dir, cache_path, tags=TAGS, **kwargs):
+    cache = AnalysisCache(cache_path, tags=tags, **kwargs)
+    analyzer = Analyzer(project_path=project_dir.strpath, tags=tags, cache=cache)
+    analyzer.analyze()
+    cache.close()
+    return analyzer.get_comments(), cache
+
+def test_unchanged_files_are_served_from_cache(cached_project, tmpdir):
+    """
+    Test that a second run reuses the cached comments of unchanged files.
+    """
+    cache_path = tmpdir.join("cache.sqlite").strpath
+    first, cache = run_analysis(cached_project, cache_path)
+    assert (cache.hits, cache.misses) == (0, 2)
+
+    second, cache = run_analysis(cached_project, cache_path)
+    assert (cache.hits, cache.misses) == (2, 0)
+    assert second == first
+
+def test_modified_file_is_reparsed(cached_project, tmpdir):
+    """
+    Test that only the file whose fingerprint changed is parsed again.
+    """
+    cache_path = tmpdir.join("cache.sqlite").strpath
+    run_analysis(cached_project, cache_path)
+
+    cached_project.join("a.py").write("# @TODO: first\n# @TODO: added\n")
+    comments, cache = run_analysis(cached_project, cache_path)
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert [comment["text"] for comment in comments if comment["file"].endswith("a.py")] == ["@TODO: first", "@TODO: added"]
+
+def test_changing_tags_invalidates_cache(cached_project, tmpdir):
+    """
+    Test that a different tag set does not reuse results computed for the old one.
+    """
+    cache_path = tmpdir.join("cache.sqlite").strpath
+    run_analysis(cached_project, cache_path)
+
+    comments, cache = run_analysis(cached_project, cache_path, tags=["@TODO"])
+    assert (cache.hits, cache.misses) == (0, 2)
+    assert [comment["tags"] for comment in comments] == [["@TODO"]]
+
+def test_parser_version_invalidates_cache(cached_project, tmpdir, monkeypatch):
+    """
+    Test that bumping the parser version invalidates every entry.
+    """
+    cache_path = tmpdir.join("cache.sqlite").strpath
+    run_analysis(cached_project, cache_path)
+
+    monkeypatch.setattr("src.analysis_cache.PARSER_VERSION", -1)
+    _, cache = run_analysis(cached_project, cache_path)
+    assert (cache.hits, cache.misses) == (0, 2)
+
+def test_content_hash_detects_same_size_edit(cached_project, tmpdir):
+    """
+    Test that content hashing catches an edit that keeps size and mtime.
+    """
+    cache_path = tmpdir.join("cache.sqlite").strpath
+    file_path = cached_project.join("a.py").strpath
+    stat = os.stat(file_path)
+    run_analysis(cached_project, cache_path, hash_contents=True)
+
+    cached_project.join("a.py").write("# @FIXME: first\nx = 1\n"[:stat.st_size])
+    os.utime(file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    comments, cache = run_analysis(cached_project, cache_path, hash_contents=True)
+    assert cache.misses == 1
+    assert any(comment["tags"] == ["@FIXME"] and comment["file"] == file_path for comment in comments)
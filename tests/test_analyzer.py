@@ -2,6 +2,7 @@ import pytest
 import os
 import json
 from src.analyzer import Analyzer
+from src.walker import FileWalker
 
 @pytest.fixture
 def setup_sample_project(tmpdir):
@@ -238,3 +239,128 @@ def test_tag_detection_case_sensitivity(setup_sample_project, tmpdir):
     for comment in report:
         for tag in comment['tags']:
             assert tag.isupper(), f"Tag with incorrect case detected: {tag}"
+
+def test_parallel_scan_matches_serial(setup_sample_project):
+    """
+    Test that scanning with a process pool produces exactly the same report as a serial scan.
+    """
+    project_path = setup_sample_project
+    tags = ["@TODO", "@FIXME", "@REFACTOR", "@IMPROVE", "@BUG", "@HACK"]
+
+    # Add a nested directory so the files are spread over several chunks
+    nested_dir = os.path.join(project_path, "nested")
+    os.makedirs(nested_dir)
+    for i in range(10):
+        with open(os.path.join(nested_dir, f"module_{i}.py"), 'w', encoding='utf-8') as f:
+            f.write(f"# @TODO: task {i}\n" + "x = 1\n" * (i * 50) + "# @FIXME: issue @HACK\n")
+
+    serial = Analyzer(project_path=project_path, tags=tags)
+    serial.analyze()
+
+    parallel = Analyzer(project_path=project_path, tags=tags, jobs=3)
+    parallel.analyze()
+
+    assert json.dumps(parallel.get_comments(), indent=4) == json.dumps(serial.get_comments(), indent=4)
+    assert len(serial.get_comments()) == 26
+
+    # Counters collected in the worker processes are merged into the parent's
+    for name in ("files_scanned", "files_skipped", "bytes_read", "findings"):
+        assert parallel.metrics.counters.get(name) == serial.metrics.counters.get(name)
+    assert serial.metrics.counters["findings"] == 26
+
+def test_parallel_chunks_follow_walk_order(tmpdir):
+    """
+    Test that parallel chunks are contiguous walk-order ranges, so the head of the walk is scanned first.
+    """
+    files = []
+    for i, size in enumerate([10, 5000, 10, 10, 3000, 10, 10, 10]):
+        source = tmpdir.join(f"module_{i}.py")
+        source.write("x" * size)
+        files.append(source.strpath)
+
+    chunks = Analyzer(project_path=tmpdir.strpath, tags=["@TODO"], jobs=2)._balanced_chunks(files)
+
+    assert [index for chunk in chunks for index in chunk] == list(range(len(files)))
+    assert [1] in chunks and len(chunks) > 2
+
+def test_explicit_paths_honour_walker_rules(tmpdir):
+    """
+    Test that files given explicitly, e.g. by git, are still filtered by the walker's exclude patterns.
+    """
+    project_dir = tmpdir.mkdir("scoped")
+    project_dir.join("app.py").write("# @TODO: kept\n")
+    project_dir.mkdir("vendor").join("lib.py").write("# @TODO: excluded\n")
+    paths = [project_dir.join("app.py").strpath, project_dir.join("vendor", "lib.py").strpath]
+
+    analyzer = Analyzer(project_path=project_dir.strpath, tags=["@TODO"], paths=paths,
+                        walker=FileWalker(project_dir.strpath, exclude=["vendor/"]))
+    analyzer.analyze()
+
+    assert [comment["text"] for comment in analyzer.get_comments()] == ["@TODO: kept"]
+
+def test_duplicate_comment_text_gets_own_line_number(tmpdir):
+    """
+    Test that identical comments on different lines are reported with their own line numbers.
+    """
+    project_dir = tmpdir.mkdir("duplicates")
+    project_dir.join("dup.py").write("# @TODO: same\nx = 1\n# @TODO: same\n")
+
+    analyzer = Analyzer(project_path=project_dir.strpath, tags=["@TODO"])
+    analyzer.analyze()
+    comments = analyzer.get_comments()
+
+    assert [comment["line_number"] for comment in comments] == [1, 3]
+    assert comments[1]["context"] == ["# @TODO: same", "x = 1", "# @TODO: same"]
+
+def test_iter_comments_streams_findings(setup_sample_project):
+    """
+    Test that iter_comments yields the same findings as analyze without storing them.
+    """
+    tags = ["@TODO", "@FIXME", "@REFACTOR", "@IMPROVE", "@BUG", "@HACK"]
+    expected = Analyzer(project_path=setup_sample_project, tags=tags)
+    expected.analyze()
+
+    streaming = Analyzer(project_path=setup_sample_project, tags=tags)
+    streamed = [comment.to_dict() for comment in streaming.iter_comments()]
+
+    assert streamed == expected.get_comments()
+    assert streaming.comments == []
+
+def test_comments_are_compact_and_share_context(tmpdir):
+    """
+    Test that comments use slots, share one context store per file and still serialize the full context.
+    """
+    project_dir = tmpdir.mkdir("compact")
+    project_dir.join("close.py").write("a = 1\n# @TODO: one\n# @FIXME: two\nb = 2\n\n\n\nc = 3\n")
+
+    analyzer = Analyzer(project_path=project_dir.strpath, tags=["@TODO", "@FIXME"])
+    analyzer.analyze()
+    first, second = analyzer.comments
+
+    assert not hasattr(first, "__dict__")
+    assert first._context_lines is second._context_lines
+    assert first.file is second.file
+    assert first.to_dict()["context"] == ["a = 1", "# @TODO: one", "# @FIXME: two", "b = 2"]
+    assert second.to_dict()["context"] == ["a = 1", "# @TODO: one", "# @FIXME: two", "b = 2", ""]
+    assert first.to_dict()["tags"] == ["@TODO"]
+
+def test_prefilter_and_memory_mapped_files(tmpdir, monkeypatch):
+    """
+    Test that untagged files are rejected before parsing and that large files are read through mmap.
+    """
+    project_dir = tmpdir.mkdir("prefilter")
+    project_dir.join("plain.py").write("# nothing to see\n")
+    project_dir.join("large.py").write_binary(b"x = 1\r\n" * 2000 + b"# @TODO: in a big file\r\n")
+
+    monkeypatch.setattr(Analyzer, "MMAP_THRESHOLD", 4096)
+    parsed = []
+    original = Analyzer._extract_comments
+    monkeypatch.setattr(Analyzer, "_extract_comments",
+                        lambda self, file_path, spans, line_index: parsed.append(file_path) or original(self, file_path, spans, line_index))
+
+    analyzer = Analyzer(project_path=project_dir.strpath, tags=["@TODO"])
+    analyzer.analyze()
+
+    assert [os.path.basename(path) for path in parsed] == ["large.py"]
+    assert analyzer.get_comments()[0]["line_number"] == 2001
+    assert analyzer.get_comments()[0]["context"][-1] == "# @TODO: in a big file"
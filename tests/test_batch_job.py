@@ -0,0 +1,37 @@
+import json
+import pytest
+from src.batch_job import batch_request_line, custom_id, read_batch_results
+
+def test_custom_id_is_stable():
+    assert custom_id("gpt-4", "prompt") == custom_id("gpt-4", "prompt")
+    assert custom_id("gpt-4", "prompt") != custom_id("gpt-4", "other prompt")
+    assert custom_id("gpt-4", "prompt") != custom_id("gpt-4o", "prompt")
+
+def test_batch_request_line():
+    record = json.loads(batch_request_line("request-1", "gpt-4", "Fix this"))
+    assert record == {
+        "custom_id": "request-1",
+        "method": "POST",
+        "url": "/v1/chat/completions",
+        "body": {"model": "gpt-4", "messages": [{"role": "user", "content": "Fix this"}]},
+    }
+
+def test_read_batch_results(tmpdir):
+    results = tmpdir.join("results.jsonl")
+    results.write("\n".join(json.dumps(record) for record in [
+        {"custom_id": "ok", "response": {"status_code": 200, "body": {"choices": [{"message": {"content": "code"}}]}}, "error": None},
+        {"custom_id": "http", "response": {"status_code": 500, "body": {"error": {"message": "server error"}}}, "error": None},
+        {"custom_id": "failed", "response": None, "error": {"code": "expired", "message": "batch expired"}},
+    ]) + "\n")
+
+    parsed = {result.custom_id: result for result in read_batch_results(results.strpath)}
+
+    assert (parsed["ok"].content, parsed["ok"].error) == ("code", None)
+    assert parsed["http"].content is None and "server error" in parsed["http"].error
+    assert parsed["failed"].error == "batch expired"
+
+def test_read_batch_results_rejects_invalid_lines(tmpdir):
+    results = tmpdir.join("results.jsonl")
+    results.write("not json\n")
+    with pytest.raises(ValueError, match="line 1"):
+        list(read_batch_results(results.strpath))
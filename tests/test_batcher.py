@@ -0,0 +1,39 @@
+from src.batcher import Batcher, FilePart, parse_file_blocks, render_file_block
+from src.prompt_generator import PromptGenerator
+from src.tokens import estimate_tokens
+
+def make_part(name, size):
+    return FilePart(name, [1], ["@TODO"], "# @TODO: task\n" + "x = 1\n" * size)
+
+def test_pack_fills_requests_within_target():
+    """
+    Test that files are packed first-fit decreasing, each prompt staying within the token target.
+    """
+    generator = PromptGenerator("report.json")
+    parts = [make_part(f"file_{i}.py", size) for i, size in enumerate([200, 10, 150, 10, 60, 10])]
+    requests = Batcher(generator, token_target=700).pack(parts)
+
+    assert sorted(path for request in requests for path in request.files) == sorted(part.file_path for part in parts)
+    assert len(requests) < len(parts)
+    for request in requests:
+        assert estimate_tokens(request.prompt) <= 700
+        assert all(segment.windows is None for segment in request.segments)
+
+def test_pack_respects_max_files():
+    generator = PromptGenerator("report.json")
+    parts = [make_part(f"file_{i}.py", 1) for i in range(7)]
+    requests = Batcher(generator, token_target=10000, max_files=3).pack(parts)
+
+    assert [len(request.files) for request in requests] == [3, 3, 1]
+
+def test_single_file_keeps_regular_prompt():
+    generator = PromptGenerator("report.json")
+    part = make_part("alone.py", 5)
+    [request] = Batcher(generator, token_target=10000).pack([part])
+
+    assert request.prompt == generator.generate_batched_prompt("alone.py", [1], ["@TODO"], [], part.full_content)
+    assert "<<<FILE" not in request.prompt
+
+def test_parse_file_blocks_round_trip():
+    response = render_file_block("a.py", "a = 1") + "noise\n" + render_file_block("b.py", "```python\nb = 2\n```\n")
+    assert parse_file_blocks(response) == {"a.py": "a = 1\n", "b.py": "b = 2\n"}
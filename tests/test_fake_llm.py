@@ -0,0 +1,99 @@
+import json
+import urllib.error
+import urllib.request
+import pytest
+from src.batcher import render_file_block
+from src.fake_llm import FakeBackend, FakeLLMServer
+from src.llm_backend import BackendError
+from src.rate_limiter import is_retryable, retry_after_seconds
+
+def test_rate_limit_bursts():
+    """
+    Test that every `rate_limit_every` requests are followed by a burst of retryable 429s with Retry-After.
+    """
+    backend = FakeBackend(rate_limit_every=2, rate_limit_burst=2, retry_after=3, sleep=lambda seconds: None)
+    outcomes = []
+    for _ in range(8):
+        try:
+            backend.complete("gpt-4", "prompt")
+            outcomes.append("ok")
+        except BackendError as e:
+            assert is_retryable(e) and retry_after_seconds(e) == 3.0
+            outcomes.append(e.status_code)
+
+    assert outcomes == ["ok", "ok", 429, 429, "ok", "ok", 429, 429]
+    assert backend.stats == {"ok": 4, "errors": 0, "rate_limited": 4}
+
+def test_error_rate_and_latency_are_reproducible():
+    def run():
+        sleeps = []
+        backend = FakeBackend(latency=0.2, latency_sigma=0.5, error_rate=0.3, seed=7, sleep=sleeps.append)
+        errors = 0
+        for _ in range(200):
+            try:
+                backend.complete("gpt-4", "prompt")
+            except BackendError as e:
+                assert e.status_code == 500
+                errors += 1
+        return sleeps, errors
+
+    sleeps, errors = run()
+    assert (sleeps, errors) == run()
+    assert 30 <= errors <= 90
+    assert min(sleeps) < 0.2 < max(sleeps)
+
+def test_answers_echo_marked_code():
+    backend = FakeBackend(response_tokens=10)
+    packed = render_file_block("a.py", "a = 1") + render_file_block("b.py", "b = 2")
+    assert backend.complete("gpt-4", "Files:\n" + packed) == packed
+    excerpt = "<<<LINES 3-4>>>\nx = 3\ny = 4\n<<<END>>>\n"
+    assert backend.complete("gpt-4", "Excerpts:\n" + excerpt) == excerpt
+    assert len(backend.complete("gpt-4", "plain prompt")) == 40
+
+def test_server_speaks_chat_completions():
+    """
+    Test that the HTTP stand-in answers like the chat completions API, including 429s with Retry-After.
+    """
+    backend = FakeBackend(rate_limit_every=1, rate_limit_burst=1, retry_after=2, response_tokens=5)
+    with FakeLLMServer(backend) as server:
+        def post(payload):
+            request = urllib.request.Request(f"{server.url}/chat/completions", data=json.dumps(payload).encode(),
+                                             headers={"Content-Type": "application/json"})
+            with urllib.request.urlopen(request, timeout=5) as response:
+                return json.loads(response.read())
+
+        payload = {"model": "gpt-4", "messages": [{"role": "user", "content": "hello"}]}
+        answer = post(payload)
+        assert answer["choices"][0]["message"]["content"] == "# " + "x" * 18
+
+        with pytest.raises(urllib.error.HTTPError) as error:
+            post(payload)
+        assert error.value.code == 429
+        assert error.value.headers["retry-after"] == "2"
+
+def test_streamed_answers_match_complete_ones():
+    sleeps = []
+    backend = FakeBackend(response_tokens=20, tokens_per_second=80, sleep=sleeps.append)
+    chunks = list(backend.stream("gpt-4", "plain prompt"))
+    assert "".join(chunks) == backend.complete("gpt-4", "plain prompt")
+    assert [len(chunk) for chunk in chunks] == [32, 32, 16]
+    # The latency, then one pause per chunk after the first
+    assert sleeps == [0.0, 0.1, 0.1, 0.0]
+
+def test_server_streams_server_sent_events():
+    """
+    Test that `stream: true` requests are answered with chat completion chunks, ending with [DONE].
+    """
+    backend = FakeBackend(response_tokens=20)
+    with FakeLLMServer(backend) as server:
+        payload = {"model": "gpt-4", "messages": [{"role": "user", "content": "hello"}], "stream": True}
+        request = urllib.request.Request(f"{server.url}/chat/completions", data=json.dumps(payload).encode(),
+                                         headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=5) as response:
+            assert response.headers["Content-Type"] == "text/event-stream"
+            events = [line[len("data: "):] for line in response.read().decode().splitlines() if line]
+
+    assert events[-1] == "[DONE]"
+    chunks = [json.loads(event)["choices"][0] for event in events[:-1]]
+    assert "".join(chunk["delta"].get("content", "") for chunk in chunks) == "# " + "x" * 78
+    assert chunks[-1]["finish_reason"] == "stop"
@@ -0,0 +1,76 @@
+import os
+import subprocess
+import pytest
+from src.analyzer import Analyzer
+from src.git_scope import changed_files
+
+def git(cwd, *args):
+    subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True)
+
+@pytest.fixture
+def git_project(tmpdir):
+    """
+    Sets up a git repository with a committed base and a feature branch.
+    """
+    repo = tmpdir.mkdir("repo")
+    git(repo.strpath, "init", "-q", "-b", "main")
+    git(repo.strpath, "config", "user.email", "test@example.com")
+    git(repo.strpath, "config", "user.name", "Test")
+    project = repo.mkdir("project")
+    project.join("old.py").write("# @TODO: untouched\n")
+    project.join("edited.py").write("x = 1\n")
+    repo.join("outside.py").write("# @TODO: not in project\n")
+    git(repo.strpath, "add", ".")
+    git(repo.strpath, "commit", "-q", "-m", "base")
+    git(repo.strpath, "checkout", "-q", "-b", "feature")
+    return repo, project
+
+def test_changed_files_since_ref(git_project):
+    """
+    Test that only files changed on the branch and inside the project are returned.
+    """
+    repo, project = git_project
+    project.join("edited.py").write("# @FIXME: changed\nx = 1\n")
+    project.join("added.js").write("// @TODO: new file\n")
+    repo.join("outside.py").write("# @TODO: changed outside\n")
+    git(repo.strpath, "add", ".")
+    git(repo.strpath, "commit", "-q", "-m", "feature work")
+    project.join("old.py").remove()
+
+    files = changed_files(project.strpath, since="main")
+    assert files == [os.path.join(project.strpath, "added.js"), os.path.join(project.strpath, "edited.py")]
+
+    analyzer = Analyzer(project_path=project.strpath, tags=["@TODO", "@FIXME"], paths=files)
+    analyzer.analyze()
+    assert sorted(comment["text"] for comment in analyzer.get_comments()) == ["@FIXME: changed", "@TODO: new file"]
+
+def test_changed_files_since_ref_includes_untracked_files(git_project):
+    """
+    Test that new files not yet added to git are returned, unless git ignores them.
+    """
+    repo, project = git_project
+    repo.join(".gitignore").write("*.log.py\n")
+    project.join("untracked.py").write("# @TODO: not added yet\n")
+    project.join("debug.log.py").write("# @TODO: ignored\n")
+    repo.join("outside_untracked.py").write("# @TODO: not in project\n")
+
+    assert changed_files(project.strpath, since="main") == [os.path.join(project.strpath, "untracked.py")]
+
+def test_changed_files_staged(git_project):
+    """
+    Test that the staged set ignores unstaged edits.
+    """
+    repo, project = git_project
+    project.join("edited.py").write("# @FIXME: staged\n")
+    git(repo.strpath, "add", "project/edited.py")
+    project.join("old.py").write("# @TODO: unstaged edit\n")
+
+    assert changed_files(project.strpath, staged=True) == [os.path.join(project.strpath, "edited.py")]
+
+def test_changed_files_unknown_ref(git_project):
+    """
+    Test that an unknown ref is reported as a RuntimeError.
+    """
+    _, project = git_project
+    with pytest.raises(RuntimeError):
+        changed_files(project.strpath, since="does-not-exist")
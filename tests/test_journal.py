@@ -0,0 +1,47 @@
+import os
+from src.journal import Journal, prompt_hash
+
+def test_record_and_load(tmpdir):
+    """
+    Test that the latest entry of each file wins and that entries survive reopening the journal.
+    """
+    path = tmpdir.join("report.journal.jsonl").strpath
+    journal = Journal(path)
+    journal.record("a.py", "hash-1", "out/a.py")
+    journal.record("b.py", "hash-2", "out/b.py")
+    journal.record("a.py", "hash-3", "out/a.py")
+    journal.close()
+
+    entries = Journal(path).load()
+    assert entries == {
+        "a.py": {"file": "a.py", "prompt_hash": "hash-3", "output": "out/a.py"},
+        "b.py": {"file": "b.py", "prompt_hash": "hash-2", "output": "out/b.py"},
+    }
+
+def test_torn_last_line_is_ignored(tmpdir):
+    """
+    Test that a line cut short by a crash is skipped, and that the next record starts on a fresh line.
+    """
+    path = tmpdir.join("report.journal.jsonl")
+    path.write('{"file": "a.py", "prompt_hash": "h", "output": "out/a.py"}\n{"file": "b.py", "prom')
+
+    journal = Journal(path.strpath)
+    assert set(journal.load()) == {"a.py"}
+    journal.record("c.py", "h", "out/c.py")
+    journal.close()
+    assert set(Journal(path.strpath).load()) == {"a.py", "c.py"}
+
+def test_is_done_requires_same_prompts_and_existing_output(tmpdir):
+    output = tmpdir.join("a.py")
+    output.write("done")
+    journal = Journal(tmpdir.join("report.journal.jsonl").strpath)
+    digest = prompt_hash("gpt-4", ["prompt"])
+    journal.record("a.py", digest, output.strpath)
+    journal.close()
+
+    journal.load()
+    assert journal.is_done("a.py", digest)
+    assert not journal.is_done("a.py", prompt_hash("gpt-4", ["other prompt"]))
+    assert not journal.is_done("b.py", digest)
+    os.remove(output.strpath)
+    assert not journal.is_done("a.py", digest)
@@ -0,0 +1,72 @@
+import json
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_scan_only_writes_report_without_llm_stack(tmpdir):
+    """
+    Test that a scan-only run needs no API key and never imports the LLM client stack.
+    """
+    project = tmpdir.mkdir("project")
+    project.join("module.py").write("# @TODO: scan only\nvalue = 1\n")
+    report = tmpdir.join("output", "report.json")
+    script = (
+        "import sys\n"
+        "from src.main import main\n"
+        f"sys.argv = ['main', '--project-path', {project.strpath!r}, '--output', {report.strpath!r}, '--no-llm']\n"
+        "main()\n"
+        "print('LOADED', sorted(m for m in sys.modules if m.split('.')[0] in ('openai', 'httpx', 'dotenv', 'asyncio')"
+        " or m == 'src.openai_assistant'))\n"
+    )
+    env = {key: value for key, value in os.environ.items() if key != "OPENAI_API_KEY"}
+    completed = subprocess.run([sys.executable, "-c", script], cwd=REPO_ROOT, capture_output=True, text=True, env=env)
+
+    assert completed.returncode == 0, completed.stderr
+    assert "LOADED []" in completed.stdout
+    assert [finding["text"] for finding in json.loads(report.read())] == ["@TODO: scan only"]
+
+def test_report_inside_project_root_keeps_findings(tmpdir):
+    """
+    Test that saving the report in the project root prunes only the outputs, not the whole project.
+    """
+    project = tmpdir.mkdir("project")
+    project.join("module.py").write("# @TODO: in the root\nvalue = 1\n")
+    project.mkdir("pkg").join("helper.py").write("# @FIXME: in a package\n")
+    report = project.join("report.json")
+    script = (
+        "import sys\n"
+        "from src.main import main\n"
+        f"sys.argv = ['main', '--project-path', {project.strpath!r}, '--output', {report.strpath!r}, '--scan-only']\n"
+        "main()\n"
+    )
+    for _ in range(2):
+        completed = subprocess.run([sys.executable, "-c", script], cwd=REPO_ROOT, capture_output=True, text=True)
+        assert completed.returncode == 0, completed.stderr
+
+    expected = ["@TODO: in the root", "@FIXME: in a package"]
+    assert [finding["text"] for finding in json.loads(report.read())] == expected
+    assert [finding["text"] for finding in json.loads(project.join("report_001.json").read())] == expected
+
+def test_metrics_paths_do_not_follow_report_numbering(tmpdir):
+    """
+    Test that repeated runs replace one metrics file and one textfile instead of adding numbered ones.
+    """
+    project = tmpdir.mkdir("project")
+    project.join("module.py").write("# @TODO: metrics\n")
+    output = tmpdir.mkdir("output")
+    script = (
+        "import sys\n"
+        "from src.main import main\n"
+        f"sys.argv = ['main', '--project-path', {project.strpath!r}, '--output', "
+        f"{output.join('report.json').strpath!r}, '--scan-only']\n"
+        "main()\n"
+    )
+    for _ in range(3):
+        completed = subprocess.run([sys.executable, "-c", script], cwd=REPO_ROOT, capture_output=True, text=True)
+        assert completed.returncode == 0, completed.stderr
+
+    names = sorted(os.listdir(output.strpath))
+    assert [name for name in names if name.endswith((".prom", ".metrics.json"))] == ["report.metrics.json", "report.prom"]
+    assert "report_002.json" in names
@@ -0,0 +1,55 @@
+import json
+from src.metrics import Histogram, Metrics
+
+def test_histogram_quantiles():
+    histogram = Histogram()
+    for value in range(1, 101):
+        histogram.observe(value / 100)
+    assert histogram.summary() == {"count": 100, "sum": 50.5, "p50": 0.5, "p95": 0.95, "p99": 0.99}
+    assert Histogram().quantile(0.5) == 0.0
+
+def test_timers_accumulate_and_merge():
+    metrics = Metrics()
+    with metrics.timer("parse"):
+        pass
+    assert list(metrics.timed_iter("walk", [1, 2, 3])) == [1, 2, 3]
+    metrics.inc("files_scanned", 2)
+
+    worker = Metrics()
+    worker.inc("files_scanned", 3)
+    worker.add_time("parse", 1.5)
+    metrics.merge(worker.take())
+
+    assert worker.counters == {} and worker.timings == {}
+    assert metrics.counters == {"files_scanned": 5}
+    assert 1.5 <= metrics.timings["parse"] < 2.0
+    assert "walk" in metrics.timings
+
+def test_write_json_and_prometheus_textfile(tmpdir):
+    metrics = Metrics()
+    metrics.inc("prompts", 4)
+    metrics.add_time("dispatch", 2.5)
+    for value in (0.1, 0.2, 0.3, 0.4):
+        metrics.observe("llm_request_seconds", value)
+
+    json_path, textfile_path = tmpdir.join("report.metrics.json"), tmpdir.join("report.prom")
+    metrics.write(json_path.strpath, textfile_path.strpath)
+
+    summary = json.loads(json_path.read())
+    assert summary["counters"] == {"prompts": 4}
+    assert summary["stage_seconds"] == {"dispatch": 2.5}
+    assert summary["histograms"]["llm_request_seconds"]["p50"] == 0.2
+    assert textfile_path.read().splitlines() == [
+        "# TYPE refactoring_ai_prompts_total counter",
+        "refactoring_ai_prompts_total 4",
+        "# TYPE refactoring_ai_stage_seconds gauge",
+        'refactoring_ai_stage_seconds{stage="dispatch"} 2.5',
+        "# TYPE refactoring_ai_llm_request_seconds summary",
+        'refactoring_ai_llm_request_seconds{quantile="0.5"} 0.2',
+        'refactoring_ai_llm_request_seconds{quantile="0.95"} 0.4',
+        'refactoring_ai_llm_request_seconds{quantile="0.99"} 0.4',
+        "refactoring_ai_llm_request_seconds_sum 1",
+        "refactoring_ai_llm_request_seconds_count 4",
+    ]
+    # No temporary files are left behind
+    assert sorted(path.basename for path in tmpdir.listdir()) == ["report.metrics.json", "report.prom"]
@@ -0,0 +1,465 @@
+import json
+import os
+import pytest
+from src.openai_assistant import OpenAIAssistant
+
+@pytest.fixture
+def project_results(tmpdir):
+    """
+    Creates two source files and a report referencing both of them.
+    """
+    first = tmpdir.join("first.py")
+    first.write("# @TODO: first\n")
+    second = tmpdir.join("second.py")
+    second.write("# @FIXME: second\n")
+    results = [
+        {"file": first.strpath, "line_number": 1, "text": "@TODO: first", "context": ["# @TODO: first"], "tags": ["@TODO"]},
+        {"file": second.strpath, "line_number": 1, "text": "@FIXME: second", "context": ["# @FIXME: second"], "tags": ["@FIXME"]},
+    ]
+    results_path = tmpdir.join("report.json")
+    results_path.write(json.dumps(results))
+    return results_path.strpath, first.strpath, second.strpath
+
+def test_process_results_restricted_to_files(project_results, monkeypatch):
+    """
+    Test that only the requested files are sent to OpenAI.
+    """
+    results_path, first, second = project_results
+    assistant = OpenAIAssistant(results_path=results_path, api_key="dummy_api_key")
+    sent, saved = [], []
+    monkeypatch.setattr(assistant, "send_to_openai", lambda prompt: sent.append(prompt) or "response")
+    monkeypatch.setattr(assistant, "save_response", lambda file_path, response: saved.append(file_path))
+
+    assistant.process_results(files=[second])
+
+    assert saved == [second]
+    assert len(sent) == 1 and second in sent[0]
+
+def test_concurrent_dispatch_isolates_failures(tmpdir, monkeypatch):
+    """
+    Test that the async mode bounds concurrency, saves each response and keeps going after a failure.
+    """
+    import threading
+    import time
+
+    results = []
+    for i in range(8):
+        source = tmpdir.join(f"file_{i}.py")
+        source.write(f"# @TODO: task {i}\n")
+        results.append({"file": source.strpath, "line_number": 1, "text": f"@TODO: task {i}",
+                        "context": [], "tags": ["@TODO"]})
+    results_path = tmpdir.join("report.json")
+    results_path.write(json.dumps(results))
+
+    assistant = OpenAIAssistant(results_path=results_path.strpath, api_key="dummy_api_key", concurrency=3)
+    lock = threading.Lock()
+    in_flight = {"now": 0, "max": 0}
+    saved = []
+
+    def fake_send(prompt):
+        with lock:
+            in_flight["now"] += 1
+            in_flight["max"] = max(in_flight["max"], in_flight["now"])
+        time.sleep(0.05)
+        with lock:
+            in_flight["now"] -= 1
+        if "file_3.py" in prompt:
+            raise RuntimeError("Error communicating with OpenAI: 500")
+        return "response"
+
+    monkeypatch.setattr(assistant, "send_to_openai", fake_send)
+    monkeypatch.setattr(assistant, "save_response", lambda file_path, response: saved.append(file_path))
+
+    assistant.process_results()
+
+    assert in_flight["max"] == 3
+    assert len(saved) == 7
+    assert list(assistant.failures) == [tmpdir.join("file_3.py").strpath]
+
+class FakeCompletions:
+    """
+    Stands in for `client.chat.completions`, emitting the connection events the HTTP layer would.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.calls = 0
+
+    def create(self, model, messages):
+        from types import SimpleNamespace
+        self.backend._trace_request(SimpleNamespace(extensions={}))
+        if self.calls == 0:
+            self.backend._on_connection_event("connection.connect_tcp.complete", {})
+        self.calls += 1
+        message = SimpleNamespace(content=f"answer to {messages[0]['content']}")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+def test_client_is_created_once_and_connections_reused(project_results, monkeypatch, caplog):
+    """
+    Test that all requests go through one pooled client and that connection reuse is logged.
+    """
+    from types import SimpleNamespace
+    import logging
+
+    results_path, _, _ = project_results
+    assistant = OpenAIAssistant(results_path=results_path, api_key="dummy_api_key", verbose=True)
+    built = []
+
+    def build_client():
+        client = SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions(assistant.backend)), close=lambda: None)
+        built.append(client)
+        return client
+
+    monkeypatch.setattr(assistant.backend, "_build_client", build_client)
+
+    with caplog.at_level(logging.DEBUG, logger="src.llm_backend"):
+        assert assistant.send_to_openai("one") == "answer to one"
+        assert assistant.send_prompt("two") == {"choices": [{"message": {"content": "answer to two"}}]}
+        assert assistant.send_to_openai("three") == "answer to three"
+
+    assert len(built) == 1
+    assert assistant.backend.connection_stats == {"requests": 3, "connections_opened": 1}
+    assert "Request 1 opened a new connection" in caplog.text
+    assert "Request 3 reused a pooled connection (1 connections opened for 3 requests)" in caplog.text
+
+def test_openai_backend_sends_real_requests_to_fake_server():
+    """
+    Test that the pooled client built by OpenAIBackend completes and streams requests against a local server.
+    """
+    pytest.importorskip("openai")
+    from src.fake_llm import FakeBackend, FakeLLMServer
+    from src.llm_backend import OpenAIBackend
+
+    with FakeLLMServer(FakeBackend(response_tokens=4)) as server:
+        backend = OpenAIBackend(api_key="dummy_api_key", base_url=server.url, pool_size=2, timeout=5.0)
+        try:
+            answers = [backend.complete("gpt-4", f"prompt {k}") for k in range(3)]
+            streamed = "".join(backend.stream("gpt-4", "prompt"))
+        finally:
+            backend.close()
+
+    assert all(answers) and streamed == answers[0]
+    assert backend.connection_stats["requests"] == 4
+    assert 1 <= backend.connection_stats["connections_opened"] <= 2
+
+def test_send_to_openai_retries_transient_errors(project_results, monkeypatch):
+    """
+    Test that 429 and 5xx responses are retried, honouring Retry-After, while other errors fail immediately.
+    """
+    from types import SimpleNamespace
+    from src.rate_limiter import RetryPolicy
+
+    class StatusError(Exception):
+        def __init__(self, status_code, headers=None):
+            super().__init__(f"HTTP {status_code}")
+            self.status_code = status_code
+            self.response = SimpleNamespace(headers=headers or {})
+
+    outcomes = [StatusError(429, {"retry-after": "2"}), StatusError(502), "fixed code", StatusError(400)]
+
+    def create(model, messages):
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=outcome))])
+
+    results_path, _, _ = project_results
+    assistant = OpenAIAssistant(results_path=results_path, api_key="dummy_api_key",
+                                retry_policy=RetryPolicy(max_retries=3, base_delay=1.0))
+    assistant.backend._client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    sleeps = []
+    monkeypatch.setattr("src.openai_assistant.time.sleep", sleeps.append)
+    monkeypatch.setattr(assistant.rate_limiter, "sleep", sleeps.append)
+
+    assert assistant.send_to_openai("prompt") == "fixed code"
+    assert assistant.retries == 2
+    assert 2.0 <= sleeps[0] <= 2.25
+
+    with pytest.raises(RuntimeError):
+        assistant.send_to_openai("prompt")
+    assert assistant.retries == 2
+
+def test_send_to_openai_uses_response_cache(project_results, tmpdir):
+    """
+    Test that an identical prompt is answered from the cache without calling the API.
+    """
+    from types import SimpleNamespace
+    from src.response_cache import ResponseCache
+
+    calls = []
+
+    def create(model, messages):
+        calls.append(messages[0]["content"])
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=f"answer {len(calls)}"))])
+
+    results_path, _, _ = project_results
+    cache = ResponseCache(tmpdir.join("llm_cache").strpath)
+    assistant = OpenAIAssistant(results_path=results_path, api_key="dummy_api_key", response_cache=cache)
+    assistant.backend._client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+    assert assistant.send_to_openai("same prompt") == "answer 1"
+    assert assistant.send_to_openai("same prompt") == "answer 1"
+    assert assistant.send_prompt("same prompt") == {"choices": [{"message": {"content": "answer 1"}}]}
+    assert assistant.send_to_openai("other prompt") == "answer 2"
+    assert calls == ["same prompt", "other prompt"]
+    assert (cache.hits, cache.misses) == (2, 2)
+
+def test_large_file_is_sent_as_windows_and_stitched(tmpdir, monkeypatch):
+    """
+    Test that a file over the prompt budget is sent as windows and the updated windows are stitched back.
+    """
+    from src.windowing import parse_excerpts
+
+    lines = [f"value_{i} = {i}\n" for i in range(1, 2001)]
+    lines[99] = "# @TODO: first task\n"
+    lines[1499] = "# @FIXME: second task\n"
+    source = tmpdir.join("big.py")
+    source.write("".join(lines))
+    results = [
+        {"file": source.strpath, "line_number": 100, "text": "@TODO: first task", "context": [], "tags": ["@TODO"]},
+        {"file": source.strpath, "line_number": 1500, "text": "@FIXME: second task", "context": [], "tags": ["@FIXME"]},
+    ]
+    results_path = tmpdir.join("report.json")
+    results_path.write(json.dumps(results))
+
+    assistant = OpenAIAssistant(results_path=results_path.strpath, api_key="dummy_api_key", max_prompt_tokens=400)
+    prompts, saved = [], {}
+
+    def fake_send(prompt):
+        prompts.append(prompt)
+        # Answer every excerpt with its tag comments resolved
+        answer = ""
+        for (start, end), body in parse_excerpts(prompt).items():
+            body = body.replace("# @TODO: first task", "done_first = True").replace("# @FIXME: second task", "done_second = True")
+            answer += f"<<<LINES {start}-{end}>>>\n{body}<<<END>>>\n"
+        return answer
+
+    monkeypatch.setattr(assistant, "send_to_openai", fake_send)
+    monkeypatch.setattr(assistant, "save_response", lambda file_path, response: saved.update({file_path: response}))
+    assistant.process_results()
+
+    from src.tokens import estimate_tokens
+    assert len(prompts) >= 1
+    assert all(estimate_tokens(prompt) <= 400 for prompt in prompts)
+    assert "value_1000 = 1000" not in "".join(prompts)
+
+    expected = "".join(lines).replace("# @TODO: first task", "done_first = True").replace("# @FIXME: second task", "done_second = True")
+    assert saved == {source.strpath: expected}
+
+def test_small_files_are_packed_and_split_back(tmpdir, monkeypatch):
+    """
+    Test that small files share requests within the token target and each file gets its own block of the response.
+    """
+    from src.batcher import parse_file_blocks
+    from src.tokens import estimate_tokens
+
+    results = []
+    for i in range(12):
+        source = tmpdir.join(f"file_{i}.py")
+        source.write(f"# @TODO: task {i}\nvalue = {i}\n")
+        results.append({"file": source.strpath, "line_number": 1, "text": f"@TODO: task {i}",
+                        "context": [], "tags": ["@TODO"]})
+    results_path = tmpdir.join("report.json")
+    results_path.write(json.dumps(results))
+
+    assistant = OpenAIAssistant(results_path=results_path.strpath, api_key="dummy_api_key",
+                                batch_token_target=1000, max_files_per_request=5)
+    prompts, saved = [], {}
+
+    def fake_send(prompt):
+        prompts.append(prompt)
+        blocks = parse_file_blocks(prompt)
+        return "".join(f"<<<FILE {path}>>>\n{body.replace('# @TODO', '# done')}<<<END FILE>>>\n"
+                       for path, body in blocks.items())
+
+    monkeypatch.setattr(assistant, "send_to_openai", fake_send)
+    monkeypatch.setattr(assistant, "save_response", lambda file_path, response: saved.update({file_path: response}))
+    assistant.process_results()
+
+    assert len(prompts) == 3
+    assert all(estimate_tokens(prompt) <= 1000 for prompt in prompts)
+    assert saved == {result["file"]: f"# done: task {i}\nvalue = {i}\n" for i, result in enumerate(results)}
+    assert not assistant.failures
+
+def test_packed_response_missing_a_file_is_a_failure(project_results, monkeypatch):
+    """
+    Test that a file left out of a packed response is reported as failed while the others are saved.
+    """
+    results_path, first, second = project_results
+    assistant = OpenAIAssistant(results_path=results_path, api_key="dummy_api_key", batch_token_target=1000)
+    saved = {}
+    monkeypatch.setattr(assistant, "send_to_openai", lambda prompt: f"<<<FILE {first}>>>\n```python\nfixed\n```\n<<<END FILE>>>\n")
+    monkeypatch.setattr(assistant, "save_response", lambda file_path, response: saved.update({file_path: response}))
+    assistant.process_results()
+
+    assert saved == {first: "fixed\n"}
+    assert list(assistant.failures) == [second]
+
+def test_export_batch_and_import_results(project_results, tmpdir, monkeypatch):
+    """
+    Test that exported requests can be answered offline and their results imported back per file.
+    """
+    results_path, first, second = project_results
+    batch_path = tmpdir.join("batch.jsonl")
+    exporter = OpenAIAssistant(results_path=results_path, api_key=None)
+    monkeypatch.setattr(exporter, "send_to_openai", lambda prompt: pytest.fail("export must not send requests"))
+    assert exporter.export_batch(batch_path.strpath) == 2
+
+    # Answer the batch locally, failing the request for the second file
+    lines = []
+    for line in batch_path.read().splitlines():
+        request = json.loads(line)
+        prompt = request["body"]["messages"][0]["content"]
+        if second in prompt:
+            lines.append({"custom_id": request["custom_id"], "response": None, "error": {"message": "expired"}})
+        else:
+            body = {"choices": [{"message": {"content": "fixed first"}}]}
+            lines.append({"custom_id": request["custom_id"], "response": {"status_code": 200, "body": body}, "error": None})
+    lines.append({"custom_id": "request-unknown", "response": {"status_code": 200, "body": {}}, "error": None})
+    output_path = tmpdir.join("output.jsonl")
+    output_path.write("\n".join(json.dumps(line) for line in lines))
+
+    importer = OpenAIAssistant(results_path=results_path, api_key=None)
+    saved = {}
+    monkeypatch.setattr(importer, "save_response", lambda file_path, response: saved.update({file_path: response}))
+    importer.import_results(output_path.strpath)
+
+    assert saved == {first: "fixed first"}
+    assert list(importer.failures) == [second]
+
+def test_dispatch_through_fake_backend_retries_bursts(tmpdir, monkeypatch):
+    """
+    Test the whole dispatch path against the fake backend: packed and windowed requests survive 429 bursts.
+    """
+    from src.fake_llm import FakeBackend
+    from src.rate_limiter import RetryPolicy
+
+    results = []
+    for i in range(6):
+        source = tmpdir.join(f"file_{i}.py")
+        source.write(f"# @TODO: task {i}\nvalue = {i}\n")
+        results.append({"file": source.strpath, "line_number": 1, "text": f"@TODO: task {i}", "context": [], "tags": ["@TODO"]})
+    big = tmpdir.join("big.py")
+    big.write("# @FIXME: big\n" + "".join(f"value_{i} = {i}\n" for i in range(2000)))
+    results.append({"file": big.strpath, "line_number": 1, "text": "@FIXME: big", "context": [], "tags": ["@FIXME"]})
+    results_path = tmpdir.join("report.json")
+    results_path.write(json.dumps(results))
+
+    backend = FakeBackend(rate_limit_every=1, rate_limit_burst=1, retry_after=0.5, sleep=lambda seconds: None)
+    assistant = OpenAIAssistant(results_path=results_path.strpath, api_key=None, concurrency=3, backend=backend,
+                                retry_policy=RetryPolicy(max_retries=10), max_prompt_tokens=400,
+                                batch_token_target=400)
+    monkeypatch.setattr("src.openai_assistant.time.sleep", lambda seconds: None)
+    monkeypatch.setattr(assistant.rate_limiter, "sleep", lambda seconds: None)
+    saved = {}
+    monkeypatch.setattr(assistant, "save_response", lambda file_path, response: saved.update({file_path: response}))
+    assistant.process_results()
+
+    assert not assistant.failures
+    assert assistant.retries == backend.stats["rate_limited"] > 0
+    assert saved == {result["file"]: open(result["file"]).read() for result in results}
+
+def test_metrics_count_prompts_retries_and_latency(project_results, monkeypatch):
+    from src.fake_llm import FakeBackend
+
+    results_path, _, _ = project_results
+    backend = FakeBackend(rate_limit_every=1, rate_limit_burst=1, retry_after=0, sleep=lambda seconds: None)
+    assistant = OpenAIAssistant(results_path=results_path, api_key=None, backend=backend)
+    monkeypatch.setattr("src.openai_assistant.time.sleep", lambda seconds: None)
+    monkeypatch.setattr(assistant, "save_response", lambda file_path, response: None)
+    assistant.process_results()
+
+    counters = assistant.metrics.counters
+    assert counters["prompts"] == 2 and counters["prompt_tokens_estimated"] > 0
+    assert counters["llm_requests"] == 3 and counters["retries"] == 1
+    assert assistant.metrics.histograms["llm_request_seconds"].summary()["count"] == 3
+    assert {"prompt_generation", "dispatch"} <= set(assistant.metrics.timings)
+
+def test_resume_skips_journaled_files(project_results, tmpdir, monkeypatch):
+    """
+    Test that a resumed run only resends files without a journaled output for the same prompts.
+    """
+    from src.fake_llm import FakeBackend
+    from src.journal import Journal
+
+    results_path, first, second = project_results
+    journal_path = tmpdir.join("report.journal.jsonl").strpath
+    monkeypatch.setattr(OpenAIAssistant, "output_path",
+                        lambda self, file_path: tmpdir.join("output", os.path.basename(file_path)).strpath)
+
+    def run(resume):
+        backend = FakeBackend(sleep=lambda seconds: None)
+        assistant = OpenAIAssistant(results_path=results_path, api_key=None, backend=backend,
+                                    journal=Journal(journal_path), resume=resume)
+        assistant.process_results()
+        assistant.close()
+        return assistant, backend
+
+    _, backend = run(resume=False)
+    assert backend.stats["ok"] == 2
+    assert set(Journal(journal_path).load()) == {first, second}
+    assert tmpdir.join("output", "first.py").check()
+
+    assistant, backend = run(resume=True)
+    assert backend.stats["ok"] == 0 and assistant.metrics.counters["files_resumed"] == 2
+
+    # A changed prompt or a deleted output is sent again
+    tmpdir.join("first.py").write("# @TODO: first, changed\n")
+    tmpdir.join("output", "second.py").remove()
+    assistant, backend = run(resume=True)
+    assert backend.stats["ok"] == 2 and assistant.metrics.counters.get("files_resumed", 0) == 0
+
+def test_stream_writes_outputs_and_records_latency(project_results, tmpdir, monkeypatch):
+    """
+    Test that streamed answers land in the output files, with time-to-first-token and tokens/s metrics.
+    """
+    from src.fake_llm import FakeBackend
+    from src.response_cache import ResponseCache
+
+    results_path, first, second = project_results
+    monkeypatch.setattr(OpenAIAssistant, "output_path",
+                        lambda self, file_path: tmpdir.join("output", os.path.basename(file_path)).strpath)
+    cache = ResponseCache(tmpdir.join("cache").strpath)
+    backend = FakeBackend(response_tokens=40, tokens_per_second=10000)
+    assistant = OpenAIAssistant(results_path=results_path, api_key=None, backend=backend, response_cache=cache,
+                                stream=True, concurrency=2)
+    assistant.process_results()
+
+    assert not assistant.failures
+    assert tmpdir.join("output", "first.py").read() == "# " + "x" * 158
+    histograms = assistant.metrics.histograms
+    assert histograms["llm_time_to_first_token_seconds"].summary()["count"] == 2
+    assert histograms["llm_tokens_per_second"].summary()["count"] == 2
+    # Streamed answers are cached like buffered ones
+    assert cache.get(cache.key(assistant.model, assistant.requests[0].prompt)) == "# " + "x" * 158
+
+def test_broken_stream_leaves_no_partial_output(project_results, tmpdir, monkeypatch):
+    """
+    Test that a stream failing midway is retried, and never leaves a partial output behind.
+    """
+    from src.fake_llm import FakeBackend
+    from src.llm_backend import BackendError
+
+    results_path, first, _ = project_results
+    output = tmpdir.join("output", "first.py")
+    monkeypatch.setattr(OpenAIAssistant, "output_path", lambda self, file_path: output.strpath)
+    monkeypatch.setattr("src.openai_assistant.time.sleep", lambda seconds: None)
+    backend = FakeBackend(response_tokens=40)
+    attempts = []
+
+    def stream(model, prompt):
+        attempts.append(prompt)
+        chunks = FakeBackend.stream(backend, model, prompt)
+        yield next(chunks)
+        if len(attempts) == 1:
+            assert not output.check()
+            raise BackendError("Connection reset", 503)
+        yield from chunks
+
+    backend.stream = stream
+    assistant = OpenAIAssistant(results_path=results_path, api_key=None, backend=backend, stream=True)
+    assistant.process_results(files=[first])
+
+    assert len(attempts) == 2 and assistant.retries == 1
+    assert output.read() == "# " + "x" * 158
+    assert os.listdir(output.dirname) == ["first.py"]
@@ -138,3 +138,127 @@ def test_mixed_comments():
     assert "@DEPRECATE" in tagged_comments[1], "Expected '@DEPRECATE' in the second comment"
     assert "@BUG" in tagged_comments[2], "Expected '@BUG' in the third comment"
     assert "@REFACTOR" in tagged_comments[3], "Expected '@REFACTOR' in the fourth comment"
+
+def test_parse_spans_line_numbers():
+    parser = PythonParser()
+    file_content = '''\
+def foo():
+    # @TODO: fix this
+    return 42
+
+def bar():
+    # @TODO: fix this
+    """
+    first line
+
+    @FIXME: second line
+    """
+'''
+    spans = parser.parse_spans(file_content)
+    assert [(span.text, span.line_number) for span in spans] == [
+        ("@TODO: fix this", 2),
+        ("@TODO: fix this", 6),
+        ("first line", 8),
+        ("", 9),
+        ("@FIXME: second line", 10),
+    ]
+    for span in spans:
+        assert file_content[span.offset:span.offset + len(span.text)] == span.text
+
+def test_comment_markers_inside_strings_are_ignored():
+    python_content = '''\
+url = "https://example.com/#@TODO"
+hashtag = '# @FIXME not a comment'
+escaped = "quote \\" # @BUG still in the string"
+block = \'\'\'
+# @HACK inside a multi-line string
+\'\'\'
+value = 1  # @TODO: real comment
+'''
+    assert PythonParser().parse(python_content) == ["@TODO: real comment"]
+
+    js_content = '''\
+const url = "http://example.com"; // @TODO: real comment
+const re = '/* @FIXME not a comment */';
+const template = `line
+// @BUG inside a template literal
+`;
+'''
+    assert JSParser().parse(js_content) == ["@TODO: real comment"]
+
+    java_content = '''\
+String block = """
+    // @HACK inside a text block
+    """;
+char slash = '/'; /* @TODO: real block */
+'''
+    assert JavaParser().parse(java_content) == ["@TODO: real block"]
+
+def test_quotes_inside_comments_do_not_open_strings():
+    content = '''\
+# it's a comment with one quote
+# @TODO: found despite the quote above
+'''
+    assert PythonParser().parse(content) == ["it's a comment with one quote", "@TODO: found despite the quote above"]
+
+    js_content = '''\
+/* don't "quote" me */
+// @FIXME: found
+'''
+    assert JSParser().parse(js_content) == ["@FIXME: found", "don't \"quote\" me"]
+
+def test_unterminated_literals_stay_local():
+    """
+    Test that an unterminated string ends with its line and an unterminated block comment is skipped.
+    """
+    assert PythonParser().parse('broken = "no end # @BUG\n# @TODO: next line\n') == ["@TODO: next line"]
+    assert JSParser().parse('/* never closed\n// @TODO: after it\n') == ["@TODO: after it"]
+
+def test_empty_comment_does_not_capture_next_line():
+    assert PythonParser().parse("#\nvalue = 1\n") == [""]
+
+def test_parser_factory_caches_instances():
+    assert ParserFactory.get_parser(".ts") is ParserFactory.get_parser(".js")
+    assert isinstance(ParserFactory.get_parser(".java"), JavaParser)
+    with pytest.raises(ValueError):
+        ParserFactory.get_parser(".rb")
+
+def test_lexer_without_possessive_quantifiers_matches_the_same(monkeypatch):
+    """
+    Test that the lexer built for Python < 3.11, without possessive quantifiers, extracts the same comments.
+    """
+    import src.parser as parser_module
+
+    content = '''\
+x = "a # b" + 'c \\' # d'  # @TODO: first
+s = """doc @FIXME
+more"""
+# trailing
+/* not a block in Python */
+'''
+    expected = [(match.lastgroup, match.group(match.lastgroup)) for match in PythonParser().iter_comments(content)]
+    monkeypatch.setattr(parser_module, "POSSESSIVE", "")
+    monkeypatch.setattr(PythonParser, "LEXER", parser_module.build_lexer(PythonParser.SPEC))
+    assert "*+" not in PythonParser.LEXER.pattern
+    assert [(match.lastgroup, match.group(match.lastgroup)) for match in PythonParser().iter_comments(content)] == expected
+    assert len(expected) == 3
+
+def test_parse_spans_with_needles_keeps_tagged_comments():
+    """
+    Test that with needles only the comments holding one are needed, while strings are still tracked.
+    """
+    content = '''\
+# plain comment
+x = "@TODO in a string"  # @FIXME: tagged
+s = """
+# @BUG inside a docstring, not a line comment
+"""
+@decorator  # untagged
+# @TODO: last
+'''
+    spans = PythonParser().parse_spans(content, needles=["@TODO", "@FIXME", "@BUG"])
+    tagged = [span.text for span in spans if "@" in span.text]
+    assert tagged == ["@FIXME: tagged", "@TODO: last", "# @BUG inside a docstring, not a line comment"]
+    assert "plain comment" not in [span.text for span in spans]
+    full = {span for span in PythonParser().parse_spans(content)}
+    assert set(spans) <= full
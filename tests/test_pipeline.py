@@ -0,0 +1,111 @@
+import threading
+import time
+import pytest
+from src.fake_llm import FakeBackend
+from src.openai_assistant import OpenAIAssistant
+from src.pipeline import Pipeline
+
+def make_findings(tmpdir, count, prefix="file"):
+    files = []
+    for i in range(count):
+        source = tmpdir.join(f"{prefix}_{i}.py")
+        source.write(f"# @TODO: task {i}\nvalue = {i}\n")
+        files.append((source.strpath, [{"file": source.strpath, "line_number": 1, "text": f"@TODO: task {i}",
+                                        "context": [], "tags": ["@TODO"]}]))
+    return files
+
+@pytest.fixture
+def saved(monkeypatch):
+    saved = {}
+    monkeypatch.setattr(OpenAIAssistant, "save_response",
+                        lambda self, file_path, response: saved.update({file_path: response}))
+    return saved
+
+def test_pipeline_processes_every_file(tmpdir, saved):
+    """
+    Test that files submitted while the scan runs are all sent, packed in batches of small files.
+    """
+    files = make_findings(tmpdir, 6)
+    assistant = OpenAIAssistant(results_path=tmpdir.join("report.json").strpath, api_key=None, concurrency=2,
+                                backend=FakeBackend(latency=0.01, seed=0), batch_token_target=1000,
+                                max_files_per_request=3)
+    pipeline = Pipeline(assistant, queue_size=2)
+    pipeline.start()
+    for file_path, findings in files:
+        pipeline.submit(file_path, findings)
+    pipeline.submit("empty.py", [])
+    pipeline.finish()
+
+    assert not assistant.failures
+    assert saved == {file_path: open(file_path).read() for file_path, _ in files}
+    assert sorted(len(request.files) for request in assistant.requests) == [3, 3]
+    assert "dispatch" in assistant.metrics.timings
+
+def test_pipeline_applies_backpressure(tmpdir, saved):
+    """
+    Test that submitting blocks while dispatch is stalled and the queue is full.
+    """
+    release = threading.Event()
+    backend = FakeBackend(sleep=lambda seconds: None)
+    complete = backend.complete
+    backend.complete = lambda model, prompt: release.wait() and complete(model, prompt)
+    assistant = OpenAIAssistant(results_path=tmpdir.join("report.json").strpath, api_key=None, concurrency=1,
+                                backend=backend)
+    pipeline = Pipeline(assistant, queue_size=1)
+    pipeline.start()
+
+    files = make_findings(tmpdir, 4)
+    producer = threading.Thread(target=lambda: [pipeline.submit(*file) for file in files])
+    producer.start()
+    producer.join(timeout=0.5)
+    # One file is in flight, the next one waits for a request slot and one more fills the queue
+    assert producer.is_alive()
+
+    release.set()
+    producer.join(timeout=5)
+    assert not producer.is_alive()
+    pipeline.finish()
+    assert len(saved) == 4 and not assistant.failures
+
+def test_pipeline_reports_dispatch_errors(tmpdir, monkeypatch):
+    assistant = OpenAIAssistant(results_path=tmpdir.join("report.json").strpath, api_key=None,
+                                backend=FakeBackend(sleep=lambda seconds: None))
+
+    async def crash(batches):
+        raise ValueError("boom")
+
+    monkeypatch.setattr(assistant, "dispatch_stream", crash)
+    pipeline = Pipeline(assistant, queue_size=1)
+    pipeline.start()
+    with pytest.raises(RuntimeError, match="boom"):
+        for file_path, findings in make_findings(tmpdir, 3):
+            pipeline.submit(file_path, findings)
+        pipeline.finish()
+
+def test_pipeline_flush_sends_pending_small_files(tmpdir, saved):
+    """
+    Test that a flush sends the small files held back for packing, and that a file submitted again is re-read.
+    """
+    files = make_findings(tmpdir, 2)
+    assistant = OpenAIAssistant(results_path=tmpdir.join("report.json").strpath, api_key=None,
+                                backend=FakeBackend(sleep=lambda seconds: None), batch_token_target=1000,
+                                max_files_per_request=3)
+    pipeline = Pipeline(assistant, queue_size=2)
+    pipeline.start()
+    for file_path, findings in files:
+        pipeline.submit(file_path, findings)
+    pipeline.flush()
+    deadline = time.monotonic() + 5
+    while len(saved) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert sorted(saved) == sorted(file_path for file_path, _ in files)
+
+    file_path, findings = files[0]
+    with open(file_path, 'w') as f:
+        f.write("# @TODO: task 0, edited\nvalue = 0\n")
+    pipeline.submit(file_path, findings)
+    pipeline.finish()
+
+    assert not assistant.failures
+    assert "task 0, edited" in assistant.requests[-1].prompt
+    assert [len(request.files) for request in assistant.requests] == [2, 1]
@@ -0,0 +1,87 @@
+import random
+from types import SimpleNamespace
+import pytest
+from src.rate_limiter import RateLimiter, RetryPolicy, TokenBucket, is_retryable, retry_after_seconds
+
+class FakeClock:
+    """
+    Manual clock whose sleep advances time instead of blocking.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+class StatusError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(headers=headers or {})
+
+def test_token_bucket_refills_over_time():
+    clock = FakeClock()
+    bucket = TokenBucket(capacity=10, refill_per_second=1, clock=clock)
+    assert bucket.reserve(10) == 0
+    assert bucket.reserve(5) == 5
+    clock.now += 5
+    assert bucket.reserve(1) == 1
+
+def test_requests_per_minute_budget():
+    clock = FakeClock()
+    limiter = RateLimiter(requests_per_minute=60, clock=clock, sleep=clock.sleep)
+    for _ in range(60):
+        limiter.acquire()
+    assert clock.slept == []
+    limiter.acquire()
+    limiter.acquire()
+    assert clock.now == pytest.approx(2.0)
+
+def test_tokens_per_minute_budget_and_oversized_requests():
+    clock = FakeClock()
+    limiter = RateLimiter(tokens_per_minute=6000, clock=clock, sleep=clock.sleep)
+    limiter.acquire(3000)
+    limiter.acquire(3000)
+    limiter.acquire(1000)
+    assert clock.now == pytest.approx(10.0)
+    # Larger than the whole budget: waits for a full bucket but does not block forever
+    limiter.acquire(100000)
+    assert clock.now == pytest.approx(70.0)
+
+def test_pause_holds_back_all_callers():
+    clock = FakeClock()
+    limiter = RateLimiter(clock=clock, sleep=clock.sleep)
+    limiter.pause(12)
+    assert limiter.acquire() == 12
+    assert limiter.acquire() == 0
+
+def test_retry_policy_backoff_and_retry_after():
+    policy = RetryPolicy(base_delay=1.0, max_delay=30.0, rng=random.Random(1))
+    for attempt in range(8):
+        assert 0 <= policy.delay(attempt) <= min(30.0, 2 ** attempt)
+    assert 7.0 <= policy.delay(0, retry_after=7.0) <= 7.25
+    assert policy.delay(0, retry_after=600.0) <= 30.25
+
+@pytest.mark.parametrize("error, expected", [
+    (StatusError(429), True),
+    (StatusError(503), True),
+    (StatusError(400), False),
+    (StatusError(401), False),
+    (ConnectionResetError(), True),
+    (ValueError("bad"), False),
+])
+def test_is_retryable(error, expected):
+    assert is_retryable(error) == expected
+
+def test_retry_after_headers():
+    assert retry_after_seconds(StatusError(429, {"retry-after": "3"})) == 3.0
+    assert retry_after_seconds(StatusError(429, {"retry-after-ms": "1500", "retry-after": "9"})) == 1.5
+    assert retry_after_seconds(StatusError(429, {"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"})) == 0.0
+    assert retry_after_seconds(StatusError(429)) is None
+    assert retry_after_seconds(ValueError()) is None
@@ -0,0 +1,60 @@
+import json
+import pytest
+from src.report import load_report, open_report_writer
+
+FINDINGS = [
+    {"file": "/p/a.py", "line_number": 1, "text": "@TODO: \"quoted\"", "context": ["# @TODO", "x = 1"], "tags": ["@TODO"]},
+    {"file": "/p/a.py", "line_number": 3, "text": "@BUG: ünïcode", "context": [], "tags": ["@BUG", "@HACK"]},
+    {"file": "/p/b.js", "line_number": 7, "text": "@FIXME", "context": ["a\tb"], "tags": ["@FIXME"]},
+]
+
+@pytest.mark.parametrize("count", [0, 1, 3])
+def test_json_writer_matches_json_dump(tmpdir, count):
+    """
+    Test that the streamed JSON report is byte-identical to json.dump with indent=4.
+    """
+    path = tmpdir.join("report.json").strpath
+    with open_report_writer(path, "json") as writer:
+        for finding in FINDINGS[:count]:
+            writer.write(finding)
+
+    with open(path, 'r', encoding='utf-8') as f:
+        assert f.read() == json.dumps(FINDINGS[:count], indent=4)
+    assert load_report(path) == FINDINGS[:count]
+
+def test_json_writer_leaves_failed_report_unterminated(tmpdir):
+    """
+    Test that the JSON array is not closed when the scan raises, so that the truncated report does not parse.
+    """
+    path = tmpdir.join("report.json").strpath
+    with pytest.raises(RuntimeError):
+        with open_report_writer(path, "json") as writer:
+            writer.write(FINDINGS[0])
+            raise RuntimeError("scan failed")
+
+    with open(path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    assert content == "[\n    " + json.dumps(FINDINGS[0], indent=4).replace("\n", "\n    ")
+    with pytest.raises(json.JSONDecodeError):
+        load_report(path)
+
+def test_ndjson_writer(tmpdir):
+    """
+    Test that the NDJSON report has one finding per line and is flushed per source file.
+    """
+    path = tmpdir.join("report.ndjson").strpath
+    with open_report_writer(path, "ndjson") as writer:
+        writer.write(FINDINGS[0])
+        writer.write(FINDINGS[1])
+        writer.write(FINDINGS[2])
+        # Findings of a.py were flushed when the first finding of b.js arrived
+        with open(path, 'r', encoding='utf-8') as f:
+            assert len(f.read().splitlines()) == 2
+
+    with open(path, 'r', encoding='utf-8') as f:
+        assert [json.loads(line) for line in f] == FINDINGS
+    assert load_report(path) == FINDINGS
+
+def test_unknown_format(tmpdir):
+    with pytest.raises(ValueError):
+        open_report_writer(tmpdir.join("report.xml").strpath, "xml")
@@ -0,0 +1,67 @@
+import os
+import time
+from src.response_cache import ResponseCache
+
+def test_get_and_put(tmpdir):
+    cache = ResponseCache(tmpdir.join("cache").strpath)
+    key = ResponseCache.key("gpt-4", "prompt")
+    assert cache.get(key) is None
+    cache.put(key, "response ✓")
+    assert cache.get(key) == "response ✓"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # Persisted on disk for the next run
+    assert ResponseCache(tmpdir.join("cache").strpath).get(key) == "response ✓"
+
+def test_key_depends_on_model_prompt_and_params():
+    keys = {
+        ResponseCache.key("gpt-4", "prompt"),
+        ResponseCache.key("gpt-4o", "prompt"),
+        ResponseCache.key("gpt-4", "prompt "),
+        ResponseCache.key("gpt-4", "prompt", {"temperature": 0}),
+    }
+    assert len(keys) == 4
+    assert ResponseCache.key("gpt-4", "p", {"a": 1, "b": 2}) == ResponseCache.key("gpt-4", "p", {"b": 2, "a": 1})
+
+def test_least_recently_used_entries_are_evicted(tmpdir):
+    directory = tmpdir.join("cache").strpath
+    cache = ResponseCache(directory, max_bytes=30)
+    cache.put("a", "x" * 10)
+    cache.put("b", "x" * 10)
+    cache.put("c", "x" * 10)
+    assert cache.get("a") is not None  # "b" is now the least recently used
+    cache.put("d", "x" * 10)
+
+    assert cache.get("b") is None
+    assert all(cache.get(key) is not None for key in "acd")
+    assert sorted(os.listdir(directory)) == ["a.txt", "c.txt", "d.txt"]
+
+def test_recency_survives_restart(tmpdir):
+    directory = tmpdir.join("cache").strpath
+    cache = ResponseCache(directory)
+    cache.put("old", "x" * 10)
+    cache.put("new", "x" * 10)
+    past = time.time() - 100
+    os.utime(os.path.join(directory, "old.txt"), (past, past))
+
+    restarted = ResponseCache(directory, max_bytes=25)
+    restarted.put("newest", "x" * 10)
+    assert restarted.get("old") is None
+    assert restarted.get("new") is not None
+
+def test_refresh_ignores_cached_responses(tmpdir):
+    directory = tmpdir.join("cache").strpath
+    ResponseCache(directory).put("k", "stale")
+    cache = ResponseCache(directory, refresh=True)
+    assert cache.get("k") is None
+    cache.put("k", "fresh")
+    assert ResponseCache(directory).get("k") == "fresh"
+
+def test_put_file(tmpdir):
+    source = tmpdir.join("streamed.txt")
+    source.write("streamed response")
+    cache = ResponseCache(tmpdir.join("cache").strpath)
+    key = ResponseCache.key("gpt-4", "prompt")
+    cache.put_file(key, source.strpath)
+    assert cache.get(key) == "streamed response"
+    assert cache.total_bytes == len("streamed response")
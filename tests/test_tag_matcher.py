@@ -0,0 +1,34 @@
+import pytest
+from src.tag_matcher import TagMatcher
+
+def test_finds_all_tags_in_configured_order():
+    matcher = TagMatcher(["@TODO", "@FIXME", "@BUG"])
+    assert matcher.find("@BUG: crash, @TODO: fix it, @BUG again") == ["@TODO", "@BUG"]
+
+@pytest.mark.parametrize("text", ["@TODOLIST: not a tag", "email@TODO", "@TODO_later", "@todo lowercase"])
+def test_only_whole_word_tags_match(text):
+    assert TagMatcher(["@TODO"]).find(text) == []
+
+def test_tags_sharing_prefixes():
+    matcher = TagMatcher(["@FIX", "@FIXME", "@TODO", "@TODOLIST"])
+    assert matcher.find("@FIXME then @TODOLIST") == ["@FIXME", "@TODOLIST"]
+    assert matcher.find("@FIX: (@TODO)") == ["@FIX", "@TODO"]
+
+def test_special_characters_are_escaped():
+    matcher = TagMatcher(["@C++", "NOTE.", "@TODO"])
+    assert matcher.find("@C++ and NOTE. are tags, NOTEx is not") == ["@C++", "NOTE."]
+
+def test_many_custom_tags():
+    tags = [f"@TAG{i}" for i in range(500)]
+    matcher = TagMatcher(tags)
+    assert matcher.find("see @TAG42 and @TAG499 but not @TAG4200") == ["@TAG42", "@TAG499"]
+
+def test_no_tags():
+    assert TagMatcher([]).find("@TODO") == []
+
+def test_occurs_in_raw_bytes():
+    matcher = TagMatcher(["@TODO", "@ÄNDERN"])
+    assert matcher.occurs_in(b"x = 1  # @TODOLIST")
+    assert matcher.occurs_in("# @ÄNDERN".encode('utf-8'))
+    assert not matcher.occurs_in(b"# @FIXME only")
+    assert not TagMatcher([]).occurs_in(b"@TODO")
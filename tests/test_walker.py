@@ -0,0 +1,115 @@
+import os
+import pytest
+from src.walker import FileWalker, IgnoreRule
+
+def relative_files(walker, root):
+    return [os.path.relpath(path, root) for path in walker.walk()]
+
+@pytest.fixture
+def walk_project(tmpdir):
+    """
+    Sets up a project with ignored directories, a .gitignore and an output directory.
+    """
+    root = tmpdir.mkdir("project")
+    root.join(".gitignore").write("*.log\nbuild/\n!keep.log\n/generated.py\n")
+    root.join("app.py").write("")
+    root.join("debug.log").write("")
+    root.join("keep.log").write("")
+    root.join("generated.py").write("")
+    root.mkdir("build").join("bundle.js").write("")
+    root.mkdir("node_modules").mkdir("lib").join("index.js").write("")
+    root.mkdir(".git").join("HEAD").write("")
+    venv = root.mkdir("env")
+    venv.join("pyvenv.cfg").write("")
+    venv.join("site.py").write("")
+    src = root.mkdir("src")
+    src.join("main.js").write("")
+    src.join("generated.py").write("")
+    src.join(".gitignore").write("*.tmp.js\n")
+    src.join("cache.tmp.js").write("")
+    root.mkdir("output").join("report.py").write("")
+    return root
+
+def test_walker_honours_ignore_rules(walk_project):
+    """
+    Test that gitignore rules, default pruned directories and prune paths are applied.
+    """
+    walker = FileWalker(walk_project.strpath, prune_paths=[walk_project.join("output").strpath])
+    assert relative_files(walker, walk_project.strpath) == [
+        ".gitignore", "app.py", "keep.log", os.path.join("src", ".gitignore"),
+        os.path.join("src", "generated.py"), os.path.join("src", "main.js"),
+    ]
+    # build, env, node_modules, .git and output are pruned before descending
+    assert walker.skipped_dirs == 5
+
+def test_walker_exclude_and_include(walk_project):
+    """
+    Test that --exclude and --include patterns filter the walked files.
+    """
+    walker = FileWalker(walk_project.strpath, exclude=["src/main.js", "output/"], include=["*.py", "*.js"])
+    assert relative_files(walker, walk_project.strpath) == ["app.py", os.path.join("src", "generated.py")]
+
+@pytest.mark.parametrize("pattern", ["src", "src/", "/src", "src/**"])
+def test_walker_include_matches_directories(walk_project, pattern):
+    """
+    Test that an include pattern naming a directory covers every file below it, as in .gitignore.
+    """
+    walker = FileWalker(walk_project.strpath, include=[pattern])
+    assert relative_files(walker, walk_project.strpath) == [
+        os.path.join("src", ".gitignore"), os.path.join("src", "generated.py"), os.path.join("src", "main.js"),
+    ]
+
+def test_walker_is_ignored_matches_walk(walk_project):
+    """
+    Test that is_ignored applies to explicit paths the same rules as the walk.
+    """
+    walker = FileWalker(walk_project.strpath, exclude=["src/main.js"],
+                        prune_paths=[walk_project.join("output").strpath])
+    walked = set(walker.walk())
+    every_file = [os.path.join(directory, name) for directory, _, names in os.walk(walk_project.strpath)
+                  for name in names]
+
+    assert {path for path in every_file if not walker.is_ignored(path)} == walked
+    assert walker.is_ignored(os.path.join(os.path.dirname(walk_project.strpath), "elsewhere.py"))
+
+def test_walker_never_prunes_root_and_skips_files(walk_project):
+    """
+    Test that a prune path naming the root is ignored, while skipped files are left out of the walk and is_ignored.
+    """
+    report = walk_project.join("report.json")
+    walker = FileWalker(walk_project.strpath, include=["*.py", "*.json"], prune_paths=[walk_project.strpath],
+                        skip_files=[report.strpath])
+    report.write("[]")
+
+    assert relative_files(walker, walk_project.strpath) == [
+        "app.py", os.path.join("output", "report.py"), os.path.join("src", "generated.py"),
+    ]
+    assert walker.is_ignored(report.strpath)
+    assert not walker.is_ignored(walk_project.join("app.py").strpath)
+
+def test_walker_skips_symlink_loops_and_hardlinks(tmpdir):
+    """
+    Test that symlink loops terminate and linked files are yielded once.
+    """
+    root = tmpdir.mkdir("links")
+    sub = root.mkdir("sub")
+    sub.join("a.py").write("")
+    os.link(sub.join("a.py").strpath, root.join("hard.py").strpath)
+    os.symlink(root.strpath, sub.join("loop").strpath)
+    os.symlink(sub.join("a.py").strpath, root.join("soft.py").strpath)
+
+    assert relative_files(FileWalker(root.strpath), root.strpath) == ["hard.py"]
+
+@pytest.mark.parametrize("pattern, path, is_dir, expected", [
+    ("*.js", "a/b/c.js", False, True),
+    ("/top.py", "sub/top.py", False, False),
+    ("docs/*.md", "docs/a.md", False, True),
+    ("docs/*.md", "docs/x/a.md", False, False),
+    ("**/fixtures", "a/b/fixtures", True, True),
+    ("a/**/z.py", "a/z.py", False, True),
+    ("a/**/z.py", "a/b/c/z.py", False, True),
+    ("cache/", "cache", False, False),
+    ("file[0-9].py", "file7.py", False, True),
+])
+def test_ignore_rule_matching(pattern, path, is_dir, expected):
+    assert IgnoreRule(pattern).matches(path, is_dir) == expected
@@ -0,0 +1,174 @@
+import os
+import threading
+import time
+import pytest
+from src.analyzer import Analyzer
+from src.report import load_report
+from src.walker import FileWalker
+from src.watcher import Watcher
+
+class RecordingPipeline:
+    def __init__(self):
+        self.submitted = []
+        self.flushes = 0
+
+    def submit(self, file_path, findings):
+        self.submitted.append((file_path, [finding["text"] for finding in findings]))
+
+    def flush(self):
+        self.flushes += 1
+
+def edit(source, content):
+    """
+    Rewrites a file with a modification time distinct from the previous one.
+    """
+    source.write(content)
+    mtime = os.stat(source.strpath).st_mtime_ns + 10 ** 9
+    os.utime(source.strpath, ns=(mtime, mtime))
+
+def make_watcher(tmpdir, pipeline=None, interval=0.5, poll=False):
+    project = tmpdir.mkdir("project")
+    project.join("a.py").write("# @TODO: first\nvalue = 1\n")
+    project.join("b.js").write("// @FIXME: second\nconst value = 2;\n")
+    project.join("notes.txt").write("# @TODO: not source code\n")
+    for source in project.listdir():
+        os.utime(source.strpath, ns=(0, 0))
+    analyzer = Analyzer(project_path=project.strpath, tags=["@TODO", "@FIXME"], walker=FileWalker(project.strpath))
+    report = tmpdir.join("report.json").strpath
+    watcher = Watcher(analyzer, report, interval=interval, pipeline=pipeline, poll=poll)
+    return project, watcher, report
+
+def test_watcher_parses_only_changed_files(tmpdir):
+    """
+    Test that a refresh re-parses only the modified and added files and drops removed ones from the report.
+    """
+    project, watcher, report = make_watcher(tmpdir)
+    assert watcher.refresh()
+    watcher.write_report()
+    assert [finding["text"] for finding in load_report(report)] == ["@TODO: first", "@FIXME: second"]
+
+    assert not watcher.refresh()
+    assert watcher.metrics.counters["watch_files_parsed"] == 2
+
+    edit(project.join("a.py"), "# @TODO: first, reworded\nvalue = 1\n")
+    edit(project.join("c.py"), "# @FIXME: third\n")
+    project.join("b.js").remove()
+    assert watcher.refresh()
+    assert watcher.metrics.counters["watch_files_parsed"] == 4
+    watcher.write_report()
+    assert [finding["text"] for finding in load_report(report)] == ["@TODO: first, reworded", "@FIXME: third"]
+
+def test_watcher_submits_files_with_new_tags(tmpdir):
+    """
+    Test that only files gaining a tagged comment after the initial scan are sent to the pipeline, followed by a flush.
+    """
+    pipeline = RecordingPipeline()
+    project, watcher, _ = make_watcher(tmpdir, pipeline=pipeline)
+    watcher.refresh()
+    assert pipeline.submitted == [] and pipeline.flushes == 0
+
+    # Code changes alone, or removed tags, send nothing
+    edit(project.join("a.py"), "# @TODO: first\nvalue = 10\n")
+    edit(project.join("b.js"), "const value = 2;\n")
+    assert watcher.refresh()
+    assert pipeline.submitted == []
+
+    edit(project.join("a.py"), "# @TODO: first\n# @FIXME: added\nvalue = 10\n")
+    watcher.refresh()
+    assert pipeline.submitted == [(os.path.join(project.strpath, "a.py"), ["@TODO: first", "@FIXME: added"])]
+    assert pipeline.flushes == 1
+
+def test_watcher_reparses_recently_modified_files(tmpdir):
+    """
+    Test that a file modified within the racy window is parsed again, so that a same-tick edit is not missed.
+    """
+    project, watcher, _ = make_watcher(tmpdir)
+    watcher.refresh()
+    source = project.join("a.py")
+    source.write("# @TODO: edited\n")
+    watcher.refresh()
+    parsed = watcher.metrics.counters["watch_files_parsed"]
+
+    # Same size and modification time, different content
+    stat = os.stat(source.strpath)
+    source.write("# @TODO: EDITED\n")
+    os.utime(source.strpath, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert watcher.refresh()
+    assert watcher.metrics.counters["watch_files_parsed"] == parsed + 1
+    assert [finding["text"] for finding in watcher.files[source.strpath].findings] == ["@TODO: EDITED"]
+
+def test_watcher_refreshes_notified_paths_only(tmpdir):
+    """
+    Test that a refresh limited to the notified paths applies ignore rules, drops removed files and keeps walk order.
+    """
+    project, watcher, _ = make_watcher(tmpdir)
+    watcher.refresh()
+    project.join(".gitignore").write("ignored.py\n")
+    watcher.walker.clear_gitignore_cache()
+
+    edit(project.join("0.py"), "# @TODO: new, first in walk order\n")
+    edit(project.join("ignored.py"), "# @TODO: ignored\n")
+    edit(project.join("notes.txt"), "# @TODO: still not source code\n")
+    project.join("b.js").remove()
+    changed = [project.join(name).strpath for name in ("0.py", "ignored.py", "notes.txt", "b.js")]
+    assert watcher.refresh(changed)
+    assert watcher.metrics.counters["watch_files_parsed"] == 3
+    assert [os.path.basename(path) for path in watcher.files] == ["0.py", "a.py"]
+
+def test_change_notifier_reports_edited_files(tmpdir):
+    """
+    Test that the notifier reports written files, and requests a rescan when a directory or .gitignore changes.
+    """
+    pytest.importorskip("watchdog")
+    from src.watcher import ChangeNotifier
+
+    notifier = ChangeNotifier(tmpdir.strpath)
+    notifier.start()
+    try:
+        def wait_for_change():
+            assert notifier.changed.wait(5)
+            time.sleep(0.1)
+            return notifier.take()
+
+        tmpdir.join("a.py").write("# @TODO\n")
+        paths, rescan = wait_for_change()
+        assert tmpdir.join("a.py").strpath in paths and not rescan
+
+        # Reading a file is not a change
+        tmpdir.join("a.py").read()
+        assert not notifier.changed.wait(0.2)
+
+        tmpdir.mkdir("sub")
+        assert wait_for_change()[1]
+        tmpdir.join(".gitignore").write("*.log\n")
+        assert wait_for_change()[1]
+    finally:
+        notifier.stop()
+
+@pytest.mark.parametrize("poll", [True, False])
+def test_watch_updates_report_within_a_second(tmpdir, poll):
+    """
+    Test that the watch loop rewrites the report shortly after a file changes, when polling or notified.
+    """
+    if not poll:
+        pytest.importorskip("watchdog")
+    project, watcher, report = make_watcher(tmpdir, interval=0.05, poll=poll)
+    stop = threading.Event()
+    thread = threading.Thread(target=watcher.watch, args=(stop,))
+    thread.start()
+    try:
+        deadline = time.monotonic() + 5
+        while not os.path.exists(report) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        edited = time.monotonic()
+        edit(project.join("a.py"), "# @TODO: changed while watching\n")
+        while time.monotonic() < deadline:
+            texts = [finding["text"] for finding in load_report(report)]
+            if "@TODO: changed while watching" in texts:
+                break
+            time.sleep(0.01)
+        assert "@TODO: changed while watching" in texts
+        assert time.monotonic() - edited < 1.0
+    finally:
+        stop.set()
+        thread.join()
@@ -0,0 +1,69 @@
+from src.tokens import estimate_tokens
+from src.windowing import Window, group_windows, merge_windows, parse_excerpts, render_excerpt, split_lines, split_windows, stitch
+
+FILE_LINES = [f"line {i}\n" for i in range(1, 101)]
+
+def test_merge_windows():
+    assert merge_windows([50, 10, 12, 30], radius=3, line_count=100) == [
+        Window(7, 15), Window(27, 33), Window(47, 53)
+    ]
+    assert merge_windows([1, 100], radius=5, line_count=100) == [Window(1, 6), Window(95, 100)]
+    # Touching windows are merged
+    assert merge_windows([10, 17], radius=3, line_count=100) == [Window(7, 20)]
+
+def test_split_and_group_respect_budget():
+    budget = 40
+    windows = split_windows(FILE_LINES, [Window(1, 100)], budget)
+    assert windows[0].start == 1 and windows[-1].end == 100
+    assert all(a.end + 1 == b.start for a, b in zip(windows, windows[1:]))
+    assert all(estimate_tokens(render_excerpt(FILE_LINES, window)) <= budget for window in windows)
+
+    groups = group_windows(FILE_LINES, [Window(1, 3), Window(10, 12), Window(50, 90)], budget)
+    for group in groups:
+        assert sum(estimate_tokens(render_excerpt(FILE_LINES, window)) for window in group) <= budget
+    assert [window for group in groups for window in group][:2] == [Window(1, 3), Window(10, 12)]
+
+def test_parse_excerpts_and_stitch():
+    content = "".join(FILE_LINES[:10])
+    response = (
+        "<<<LINES 2-3>>>\n"
+        "new two\n"
+        "<<<END>>>\n"
+        "<<<LINES 8-10>>>\n"
+        "```python\nnew eight\nnew nine\n```\n"
+        "<<<END>>>\n"
+    )
+    excerpts = parse_excerpts(response)
+    assert excerpts == {(2, 3): "new two\n", (8, 10): "new eight\nnew nine\n"}
+    assert stitch(content, excerpts) == (
+        "line 1\nnew two\nline 4\nline 5\nline 6\nline 7\nnew eight\nnew nine\n"
+    )
+
+def test_round_trip_of_unchanged_excerpts():
+    content = "".join(FILE_LINES)
+    windows = merge_windows([5, 60], radius=2, line_count=100)
+    response = "".join(render_excerpt(FILE_LINES, window) for window in windows)
+    assert stitch(content, parse_excerpts(response)) == content
+
+def test_form_feeds_do_not_shift_line_numbers(tmpdir):
+    """
+    Test that windows and stitching number lines like LineIndex, which a form feed before the tag must not shift.
+    """
+    from src.line_index import LineIndex
+    from src.prompt_generator import PromptGenerator
+
+    lines = [f"value_{i} = {i}\n" for i in range(1, 3001)]
+    lines[10] = "\x0c\n"
+    lines[20] = "page\x0cbreak = 1 \n"
+    lines[2499] = "# @TODO here\n"
+    content = "".join(lines)
+    assert len(split_lines(content)) == len(LineIndex(content)) == 3000
+
+    generator = PromptGenerator(tmpdir.join("report.json").strpath)
+    requests = generator.generate_file_requests("big.py", [2500], ["@TODO"], [], content, max_prompt_tokens=400)
+    prompt = "".join(request.prompt for request in requests)
+    assert "# @TODO here" in prompt
+
+    excerpts = parse_excerpts(prompt)
+    replaced = {window: body.replace("# @TODO here", "done = True") for window, body in excerpts.items()}
+    assert stitch(content, replaced) == content.replace("# @TODO here", "done = True")